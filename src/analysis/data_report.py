@@ -2,6 +2,30 @@ import os
 import pandas as pd
 from statistics import mean
 
+from src.config import Priority, RequestType
+from src.utils.latency_histogram import percentile_label
+
+
+def _latency_percentile_rows(metrics, by_priority):
+    """Percentili di risposta e attesa dagli istogrammi delle metriche: complessivi, per tipo e per priorità."""
+    groups = [('overall', 'ALL', None, None)]
+    groups += [('request_type', req_type.name, req_type, None) for req_type in sorted(RequestType, key=lambda e: e.name)]
+    if by_priority:
+        groups += [('priority', prio.name, None, prio) for prio in sorted(Priority)]
+
+    rows = []
+    for metric_name in ('response_time', 'wait_time'):
+        for category, group, req_type, prio in groups:
+            histogram = metrics.latency_histograms.histogram(metric_name, req_type, prio)
+            if not histogram.count:
+                continue
+            row = {'metric': metric_name, 'category': category, 'group': group, 'count': histogram.count}
+            for q, value in histogram.percentiles(metrics.latency_percentiles).items():
+                row[percentile_label(q)] = value
+            rows.append(row)
+    return rows
+
+
 def export_summary(metrics, output_dir="output", label='non_prioritized', by_priority=False):
     os.makedirs(output_dir, exist_ok=True)
     excel_path = os.path.join(output_dir, f"{label}_metrics.xlsx")
@@ -35,7 +59,7 @@ def export_summary(metrics, output_dir="output", label='non_prioritized', by_pri
 
         # Metriche per priorità
         for prio, lst in metrics.response_times_by_priority.items():
-            if lst:  # Solo se ci sono dati
+            if len(lst):  # Solo se ci sono dati
                 summary_rows.append({
                     'Metric': f"{prio.name} - Avg Response Time",
                     'Value': mean(lst)
@@ -46,7 +70,7 @@ def export_summary(metrics, output_dir="output", label='non_prioritized', by_pri
                 })
 
         for prio, lst in metrics.wait_times_by_priority.items():
-            if lst:  # Solo se ci sono dati
+            if len(lst):  # Solo se ci sono dati
                 summary_rows.append({
                     'Metric': f"{prio.name} - Avg Wait Time",
                     'Value': mean(lst)
@@ -54,14 +78,14 @@ def export_summary(metrics, output_dir="output", label='non_prioritized', by_pri
 
         # Metriche per tipo di richiesta
         for req_type, lst in metrics.response_times_by_req_type.items():
-            if lst:  # Solo se ci sono dati
+            if len(lst):  # Solo se ci sono dati
                 summary_rows.append({
                     'Metric': f"{req_type.name} - Avg Response Time (type)",
                     'Value': mean(lst)
                 })
 
         for req_type, lst in metrics.wait_times_by_req_type.items():
-            if lst:  # Solo se ci sono dati
+            if len(lst):  # Solo se ci sono dati
                 summary_rows.append({
                     'Metric': f"{req_type.name} - Avg Wait Time (type)",
                     'Value': mean(lst)
@@ -109,7 +133,7 @@ def export_summary(metrics, output_dir="output", label='non_prioritized', by_pri
 
         # Metriche per tipo di richiesta
         for req_type, lst in metrics.response_times_data.items():
-            if lst:  # Solo se ci sono dati
+            if len(lst):  # Solo se ci sono dati
                 summary_rows.append({
                     'Metric': f"{req_type.name} - Avg Response Time",
                     'Value': mean(lst)
@@ -120,7 +144,7 @@ def export_summary(metrics, output_dir="output", label='non_prioritized', by_pri
                 })
 
         for req_type, lst in metrics.wait_times_data.items():
-            if lst:  # Solo se ci sono dati
+            if len(lst):  # Solo se ci sono dati
                 summary_rows.append({
                     'Metric': f"{req_type.name} - Avg Wait Time",
                     'Value': mean(lst)
@@ -137,6 +161,17 @@ def export_summary(metrics, output_dir="output", label='non_prioritized', by_pri
                     'Value': p_loss
                 })
 
+    # Percentili del tempo di risposta (istogrammi logaritmici)
+    percentile_rows = _latency_percentile_rows(metrics, by_priority)
+    for row in percentile_rows:
+        if row['metric'] != 'response_time':
+            continue
+        for q in metrics.latency_percentiles:
+            summary_rows.append({
+                'Metric': f"{row['group']} - {percentile_label(q).upper()} Response Time",
+                'Value': row[percentile_label(q)]
+            })
+
     df_summary = pd.DataFrame(summary_rows)
 
     # -------- Sheet 2: System Snapshots --------
@@ -266,6 +301,9 @@ def export_summary(metrics, output_dir="output", label='non_prioritized', by_pri
 
     df_timeout = pd.DataFrame(timeout_data)
 
+    # -------- Sheet 7: Latency Percentiles --------
+    df_percentiles = pd.DataFrame(percentile_rows)
+
     # -------- Scrittura Excel multi-foglio --------
     with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
         df_summary.to_excel(writer, sheet_name='aggregated', index=False)
@@ -274,6 +312,7 @@ def export_summary(metrics, output_dir="output", label='non_prioritized', by_pri
         df_resp_raw.to_excel(writer, sheet_name='raw_response', index=False)
         df_wait_raw.to_excel(writer, sheet_name='raw_wait', index=False)
         df_timeout.to_excel(writer, sheet_name='timeout_analysis', index=False)
+        df_percentiles.to_excel(writer, sheet_name='latency_percentiles', index=False)
 
     # CSV di backup (solo il summary principale)
     df_summary.to_csv(csv_path, index=False)
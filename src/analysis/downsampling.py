@@ -0,0 +1,75 @@
+# src/analysis/downsampling.py - RIDUZIONE DEI PUNTI DELLE SERIE TEMPORALI PRIMA DEL PLOT
+
+import numpy as np
+
+
+def min_max_downsample(x, y, num_buckets):
+    """
+    Inviluppo per colonna (M4): l'asse x viene diviso in num_buckets intervalli della
+    stessa ampiezza e di ogni intervallo si tengono il primo, l'ultimo, il minimo e il
+    massimo punto, nell'ordine originale. Con un intervallo per colonna di pixel la linea
+    disegnata coincide con quella di tutti i punti. x deve essere ordinato.
+    """
+    n = len(x)
+    edges = np.linspace(x[0], x[-1], num_buckets + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1], side='left'))
+    ends = np.append(starts[1:], n)
+    counts = ends - starts
+    # Indice del primo minimo e del primo massimo di ogni intervallo, senza cicli Python
+    candidates = [starts, ends - 1]
+    for extreme in (np.minimum, np.maximum):
+        is_extreme = y == np.repeat(extreme.reduceat(y, starts), counts)
+        positions = np.flatnonzero(is_extreme)
+        candidates.append(positions[np.searchsorted(positions, starts)])
+    keep = np.unique(np.concatenate(candidates))
+    return x[keep], y[keep]
+
+
+def lttb_downsample(x, y, num_points):
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson): primo e ultimo punto restano, gli altri
+    sono divisi in num_points - 2 gruppi di indici consecutivi e da ogni gruppo si sceglie
+    il punto che forma il triangolo più grande con il punto scelto nel gruppo precedente e
+    con la media del gruppo successivo. Conserva la forma della curva con num_points punti.
+    """
+    n = len(x)
+    bounds = np.linspace(1, n - 1, num_points - 1).astype(np.int64)
+    keep = np.empty(num_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(num_points - 2):
+        start, end = bounds[i], bounds[i + 1]
+        if i + 2 < len(bounds):
+            next_x = x[end:bounds[i + 2]].mean()
+            next_y = y[end:bounds[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        ax, ay = x[a], y[a]
+        areas = np.abs((ax - next_x) * (y[start:end] - ay) - (ax - x[start:end]) * (next_y - ay))
+        a = start + int(np.argmax(areas))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def downsample(x, y, config):
+    """
+    Riduce la serie (x ordinato) a circa PLOT_MAX_POINTS punti con il metodo PLOT_DOWNSAMPLING
+    ("minmax" o "lttb"; None = nessuna riduzione), così il tempo di rendering non dipende
+    dalla durata del run. I punti non finiti vengono scartati; le serie già abbastanza corte
+    sono restituite invariate.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    max_points = config.PLOT_MAX_POINTS
+    if config.PLOT_DOWNSAMPLING is None or len(x) <= max_points:
+        return x, y
+    finite = np.isfinite(y)
+    if not finite.all():
+        x, y = x[finite], y[finite]
+        if len(x) <= max_points:
+            return x, y
+    if config.PLOT_DOWNSAMPLING == "minmax":
+        return min_max_downsample(x, y, max_points // 4)
+    if config.PLOT_DOWNSAMPLING == "lttb":
+        return lttb_downsample(x, y, max_points)
+    raise ValueError(f"PLOT_DOWNSAMPLING non valido: {config.PLOT_DOWNSAMPLING!r} (usare 'minmax', 'lttb' o None)")
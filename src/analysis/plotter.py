@@ -1,16 +1,19 @@
 # analysis/plotter.py - VERSIONE MERGED
 
 import os
-import matplotlib
+import functools
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import seaborn as sns
+from src.config import RequestType
 from src.utils.metrics import Metrics
 from src.utils.metrics_with_priority import MetricsWithPriority
+from src.utils.latency_histogram import percentile_label
+from src.analysis.downsampling import downsample
+from src.analysis.rendering import render_figures, save_figure
 from matplotlib.ticker import MaxNLocator
 
-matplotlib.use('Qt5Agg')
 plt.style.use('ggplot')
 
 # Funzione helper per calcolare le medie, rimane invariata
@@ -28,23 +31,18 @@ class Plotter:
 
     # --- FUNZIONE HELPER PER IL SALVATAGGIO ---
     def _save_plot(self, output_dir, filename, fig):
-        """Helper per creare la directory e salvare la figura."""
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
-        save_path = os.path.join(output_dir, filename)
-        fig.savefig(save_path, dpi=300, bbox_inches='tight')
-        plt.close(fig) # Chiude la figura per liberare memoria
+        """Helper per creare la directory e salvare la figura (formato e DPI da config)."""
+        save_figure(fig, output_dir, filename, self.config)
 
     def plot_queue_history(self, output_dir='plots', filename='queue_length_history.png'):
         print(f"Generazione storico coda -> {os.path.join(output_dir, filename)}")
         fig, ax = plt.subplots(figsize=(12, 6))
         if self.metrics.queue_length_history:
             times_no_prio, lengths_no_prio = zip(*self.metrics.queue_length_history)
-            ax.plot(times_no_prio, lengths_no_prio, color='r', linewidth=2, label='Senza Priorità', alpha=0.8)
+            ax.plot(*downsample(times_no_prio, lengths_no_prio, self.config), color='r', linewidth=2, label='Senza Priorità', alpha=0.8)
             ax.axhline(np.mean(lengths_no_prio), color='darkred', linestyle='--', linewidth=1, label=f'Media Senza Priorità: {np.mean(lengths_no_prio):.2f}')
-        if self.metrics_prio.queue_lengths:
-            ax.plot(self.metrics_prio.timestamps, self.metrics_prio.queue_lengths, color='b', linewidth=2, label='Con Priorità', alpha=0.8)
+        if len(self.metrics_prio.queue_lengths):
+            ax.plot(*downsample(self.metrics_prio.timestamps, self.metrics_prio.queue_lengths, self.config), color='b', linewidth=2, label='Con Priorità', alpha=0.8)
             ax.axhline(np.mean(self.metrics_prio.queue_lengths), color='darkblue', linestyle='--', linewidth=1, label=f'Media Con Priorità: {np.mean(self.metrics_prio.queue_lengths):.2f}')
         ax.set_title("Evoluzione della Lunghezza della Coda nel Tempo"); ax.set_xlabel("Tempo di Simulazione (s)"); ax.set_ylabel("Numero di Richieste in Coda")
         ax.legend(loc='best'); ax.grid(True, linestyle='--', alpha=0.6)
@@ -63,7 +61,7 @@ class Plotter:
             times_senza, waits_senza = zip(*all_waits_senza)
             if len(waits_senza) >= window_size:
                 moving_avg = np.convolve(waits_senza, np.ones(window_size) / window_size, mode='valid')
-                ax.plot(times_senza[window_size - 1:], moving_avg, label='Senza Priorità (Media Mobile)', color='r', alpha=0.7)
+                ax.plot(*downsample(times_senza[window_size - 1:], moving_avg, self.config), label='Senza Priorità (Media Mobile)', color='r', alpha=0.7)
             ax.axhline(np.mean(waits_senza), color='darkred', linestyle='--', linewidth=1, label=f'Media Totale Senza Priorità: {np.mean(waits_senza):.2f}')
         all_waits_prio = []
         for req_type in sorted(self.metrics_prio.wait_times_by_req_type.keys(), key=lambda e: e.name):
@@ -75,7 +73,7 @@ class Plotter:
             times_prio, waits_prio = zip(*all_waits_prio)
             if len(waits_prio) >= window_size:
                 moving_avg_prio = np.convolve(waits_prio, np.ones(window_size) / window_size, mode='valid')
-                ax.plot(times_prio[window_size - 1:], moving_avg_prio, label='Con Priorità (Media Mobile)', color='b', alpha=0.7)
+                ax.plot(*downsample(times_prio[window_size - 1:], moving_avg_prio, self.config), label='Con Priorità (Media Mobile)', color='b', alpha=0.7)
             ax.axhline(np.mean(waits_prio), color='darkblue', linestyle='--', linewidth=1, label=f'Media Totale Con Priorità: {np.mean(waits_prio):.2f}')
         ax.set_title("Andamento del Tempo di Attesa Medio (Media Mobile)")
         ax.set_xlabel("Tempo di Simulazione (s)")
@@ -95,7 +93,7 @@ class Plotter:
             all_responses_senza.sort(key=lambda x: x[0])
             times_senza, responses_senza = zip(*all_responses_senza)
             cum_avg_senza = np.cumsum(responses_senza) / np.arange(1, len(responses_senza) + 1)
-            ax.plot(times_senza, cum_avg_senza, label='Senza Priorità (Media Cumulativa)', color='r', alpha=0.8)
+            ax.plot(*downsample(times_senza, cum_avg_senza, self.config), label='Senza Priorità (Media Cumulativa)', color='r', alpha=0.8)
         all_responses_prio = []
         for req_type in sorted(self.metrics_prio.response_times_by_req_type.keys(), key=lambda e: e.name):
             times = self.metrics_prio.completion_timestamps_by_req_type.get(req_type, [])
@@ -105,7 +103,7 @@ class Plotter:
             all_responses_prio.sort(key=lambda x: x[0])
             times_prio, responses_prio = zip(*all_responses_prio)
             cum_avg_prio = np.cumsum(responses_prio) / np.arange(1, len(responses_prio) + 1)
-            ax.plot(times_prio, cum_avg_prio, label='Con Priorità (Media Cumulativa)', color='b', alpha=0.8)
+            ax.plot(*downsample(times_prio, cum_avg_prio, self.config), label='Con Priorità (Media Cumulativa)', color='b', alpha=0.8)
         ax.set_title("Andamento del Tempo di Risposta Medio Cumulativo nel Tempo")
         ax.set_xlabel("Tempo di Simulazione (s)")
         ax.set_ylabel("Tempo di Risposta Medio (s)")
@@ -129,9 +127,9 @@ class Plotter:
         plot_data = []
         all_req_types = set(self.metrics.response_times_data.keys()) | set(self.metrics_prio.response_times_by_req_type.keys())
         for req_type in sorted(list(all_req_types), key=lambda x: x.name):
-            if req_type in self.metrics.response_times_data and self.metrics.response_times_data[req_type]:
+            if req_type in self.metrics.response_times_data and len(self.metrics.response_times_data[req_type]):
                 plot_data.append({'Categoria': req_type.name.replace('_', ' ').title(), 'Tempo Medio (s)': np.mean(self.metrics.response_times_data[req_type]), 'Scenario': 'Senza Priorità'})
-            if req_type in self.metrics_prio.response_times_by_req_type and self.metrics_prio.response_times_by_req_type[req_type]:
+            if req_type in self.metrics_prio.response_times_by_req_type and len(self.metrics_prio.response_times_by_req_type[req_type]):
                 plot_data.append({'Categoria': req_type.name.replace('_', ' ').title(), 'Tempo Medio (s)': np.mean(self.metrics_prio.response_times_by_req_type[req_type]), 'Scenario': 'Con Priorità'})
 
         if plot_data:
@@ -183,9 +181,9 @@ class Plotter:
         # ... [LOGICA INTERNA IDENTICA] ...
         if self.metrics.pod_count_history:
             timestamps_no_prio, counts_no_prio = zip(*self.metrics.pod_count_history)
-            ax.plot(timestamps_no_prio, counts_no_prio, color='r', linewidth=2.5, label='Senza Priorità', alpha=0.8)
-        if self.metrics_prio.pod_counts:
-            ax.plot(self.metrics_prio.timestamps, self.metrics_prio.pod_counts, color='b', linewidth=2.5, label='Con Priorità', alpha=0.8)
+            ax.plot(*downsample(timestamps_no_prio, counts_no_prio, self.config), color='r', linewidth=2.5, label='Senza Priorità', alpha=0.8)
+        if len(self.metrics_prio.pod_counts):
+            ax.plot(*downsample(self.metrics_prio.timestamps, self.metrics_prio.pod_counts, self.config), color='b', linewidth=2.5, label='Con Priorità', alpha=0.8)
         ax.set_xlabel('Tempo di simulazione (s)'); ax.set_ylabel('Numero di Pod'); ax.set_title('Evoluzione del Numero di Pod nel Tempo')
         ax.legend(loc='best'); ax.grid(True, linestyle='--', alpha=0.6)
         ax.yaxis.set_major_locator(MaxNLocator(integer=True)); ax.set_ylim(bottom=0)
@@ -198,10 +196,10 @@ class Plotter:
         # ... [LOGICA INTERNA IDENTICA] ...
         if self.metrics.queue_length_history:
             times_no_prio, lengths_no_prio = zip(*self.metrics.queue_length_history)
-            ax.plot(times_no_prio, lengths_no_prio, color='r', linewidth=2, label='Senza Priorità', alpha=0.8)
+            ax.plot(*downsample(times_no_prio, lengths_no_prio, self.config), color='r', linewidth=2, label='Senza Priorità', alpha=0.8)
             ax.axhline(np.mean(lengths_no_prio), color='darkred', linestyle='--', linewidth=1, label=f'Media Senza Priorità: {np.mean(lengths_no_prio):.2f}')
-        if self.metrics_prio.queue_lengths:
-            ax.plot(self.metrics_prio.timestamps, self.metrics_prio.queue_lengths, color='b', linewidth=2, label='Con Priorità', alpha=0.8)
+        if len(self.metrics_prio.queue_lengths):
+            ax.plot(*downsample(self.metrics_prio.timestamps, self.metrics_prio.queue_lengths, self.config), color='b', linewidth=2, label='Con Priorità', alpha=0.8)
             ax.axhline(np.mean(self.metrics_prio.queue_lengths), color='darkblue', linestyle='--', linewidth=1, label=f'Media Con Priorità: {np.mean(self.metrics_prio.queue_lengths):.2f}')
         ax.set_title("Evoluzione della Lunghezza della Coda nel Tempo"); ax.set_xlabel("Tempo di Simulazione (s)"); ax.set_ylabel("Numero di Richieste in Coda")
         ax.legend(loc='best'); ax.grid(True, linestyle='--', alpha=0.6)
@@ -298,16 +296,52 @@ class Plotter:
         self._save_plot(output_dir, filename, fig)
 
 
+    def plot_latency_percentiles(self, output_dir='plots', filename='latency_percentiles_by_type.png'):
+        """Percentili del tempo di risposta per tipo di richiesta (un pannello per percentile), dagli istogrammi."""
+        print(f"Generazione grafico percentili per tipo -> {os.path.join(output_dir, filename)}")
+        percentiles = self.metrics.latency_percentiles
+        plot_data = []
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            for scenario, metrics in (('Senza Priorità', self.metrics), ('Con Priorità', self.metrics_prio)):
+                histogram = metrics.latency_histograms.histogram('response_time', req_type)
+                if not histogram.count:
+                    continue
+                for q, value in histogram.percentiles(percentiles).items():
+                    plot_data.append({'Categoria': req_type.name.replace('_', ' ').title(), 'Percentile': percentile_label(q),
+                                      'Tempo (s)': value, 'Scenario': scenario})
+        if not plot_data:
+            return
+
+        df_percentiles = pd.DataFrame(plot_data)
+        fig, axes = plt.subplots(1, len(percentiles), figsize=(7 * len(percentiles), 7), squeeze=False)
+        fig.suptitle("Percentili del Tempo di Risposta per Tipo di Richiesta", fontsize=20, fontweight='bold')
+        for ax, q in zip(axes[0], percentiles):
+            label = percentile_label(q)
+            sns.barplot(data=df_percentiles[df_percentiles['Percentile'] == label], x='Categoria', y='Tempo (s)',
+                        hue='Scenario', hue_order=['Senza Priorità', 'Con Priorità'], palette=['#ff0000', '#0000ff'], ax=ax)
+            ax.set_title(label.upper(), fontsize=14)
+            ax.set_xlabel('Tipo di Richiesta'); ax.set_ylabel('Tempo di Risposta (s)')
+            plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+            for container in ax.containers: ax.bar_label(container, fmt='%.2f', padding=3, fontsize=8)
+            ax.grid(True, axis='y', linestyle='--', alpha=0.6)
+        fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+        self._save_plot(output_dir, filename, fig)
+
     # --- METODO DI REPORTING AGGIORNATO ---
     def generate_comprehensive_report(self, output_dir='plots', run_prefix='run'):
         """
         Chiama tutti i metodi di plotting, passando loro i percorsi di output corretti.
+        I grafici sono indipendenti e vengono disegnati in parallelo (PLOT_WORKERS processi).
         """
         print(f"\n--- Generazione Report Completo per '{run_prefix}' in '{output_dir}' ---")
-        self.plot_comparison_dashboard(output_dir=output_dir, filename=f"{run_prefix}_1_dashboard.png")
-        self.plot_served_by_type(output_dir=output_dir, filename=f"{run_prefix}_2_served_by_type.png")
-        self.plot_loss_by_type(output_dir=output_dir, filename=f"{run_prefix}_3_loss_by_type.png")
-        self.plot_wait_time_trend(output_dir=output_dir, filename=f"{run_prefix}_4_wait_time_trend.png")
-        self.plot_response_time_trend(output_dir=output_dir, filename=f"{run_prefix}_5_response_time_trend.png")
-        self.plot_pod_history(output_dir=output_dir, filename=f"{run_prefix}_6_pod_history.png")
-        self.plot_queue_history(output_dir=output_dir, filename=f"{run_prefix}_7_queue_history.png")
\ No newline at end of file
+        jobs = [
+            functools.partial(self.plot_comparison_dashboard, output_dir=output_dir, filename=f"{run_prefix}_1_dashboard.png"),
+            functools.partial(self.plot_served_by_type, output_dir=output_dir, filename=f"{run_prefix}_2_served_by_type.png"),
+            functools.partial(self.plot_loss_by_type, output_dir=output_dir, filename=f"{run_prefix}_3_loss_by_type.png"),
+            functools.partial(self.plot_wait_time_trend, output_dir=output_dir, filename=f"{run_prefix}_4_wait_time_trend.png"),
+            functools.partial(self.plot_response_time_trend, output_dir=output_dir, filename=f"{run_prefix}_5_response_time_trend.png"),
+            functools.partial(self.plot_pod_history, output_dir=output_dir, filename=f"{run_prefix}_6_pod_history.png"),
+            functools.partial(self.plot_queue_history, output_dir=output_dir, filename=f"{run_prefix}_7_queue_history.png"),
+            functools.partial(self.plot_latency_percentiles, output_dir=output_dir, filename=f"{run_prefix}_8_latency_percentiles.png"),
+        ]
+        render_figures(jobs, self.config.PLOT_WORKERS)
@@ -0,0 +1,56 @@
+# src/analysis/rendering.py - SALVATAGGIO DEI GRAFICI SENZA INTERFACCIA E RENDERING IN PARALLELO
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')   # Rendering su file: nessuna finestra, nessuna dipendenza da Qt
+import matplotlib.pyplot as plt
+
+# Funzioni di disegno del report in corso: i processi figli le ereditano con il fork,
+# insieme alle metriche a cui fanno riferimento, senza serializzare nulla.
+_jobs = []
+
+
+def save_figure(fig, output_dir, filename, config, tight=True):
+    """
+    Salva la figura in output_dir con PLOT_DPI e nel formato PLOT_FORMAT (l'estensione
+    di 'filename' viene sostituita) e la chiude. Restituisce il percorso del file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    root, _ = os.path.splitext(filename)
+    save_path = os.path.join(output_dir, f"{root}.{config.PLOT_FORMAT}")
+    fig.savefig(save_path, dpi=config.PLOT_DPI, bbox_inches='tight' if tight else None)
+    plt.close(fig)  # Chiude la figura per liberare memoria
+    return save_path
+
+
+def _render_job(index):
+    _jobs[index]()
+
+
+def render_figures(jobs, workers=None):
+    """
+    Esegue le funzioni di disegno 'jobs' (callable senza argomenti, ognuna salva le proprie
+    figure) su un pool di 'workers' processi (None = tutti i core). I processi sono creati
+    con fork, quindi leggono le metriche del processo principale in copy-on-write. Senza
+    fork (Windows, macOS) o con un solo processo le figure vengono disegnate in serie.
+    Un errore in una figura viene rilanciato dopo che le altre sono terminate.
+    """
+    global _jobs
+    jobs = list(jobs)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        for job in jobs:
+            job()
+        return
+
+    _jobs = jobs
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+            futures = [executor.submit(_render_job, i) for i in range(len(jobs))]
+        for future in futures:
+            future.result()
+    finally:
+        _jobs = []
@@ -8,10 +8,138 @@ LEHMER_SEED = 123456789     # Seed iniziale per il nostro generatore Lehmer
 
 # --- ANALISI ORIZZONTE INFINITO ---
 WARM_UP_TO_STEADY = 300         # tempo per raggiungere il comportamento transitorio
+WARM_UP_DETECTION = None        # None: WARM_UP_TO_STEADY fisso (default); "mser5": transitorio scelto per ogni metrica con MSER-5
 STEADY_SIMULATION_TIME = 50000
 NUM_BATCHES = 20                # Un numero medio
 CONFIDENCE_LEVEL = 0.95
+# Batch Means: con BATCH_MEANS_AUTO_SIZE il numero di batch parte da BATCH_MEANS_MAX_BATCHES e viene
+# dimezzato finché l'autocorrelazione lag-1 delle medie supera BATCH_MEANS_MAX_LAG1_AUTOCORRELATION
+# (NUM_BATCHES è il minimo); con BATCH_MEANS_OVERLAPPING il CI usa gli Overlapping Batch Means.
+# Entrambi False (default): NUM_BATCHES batch disgiunti come nella versione originale. Accanto a
+# ogni CI vengono stampati lo stimatore, il numero e la dimensione dei batch e il warm-up usati.
+BATCH_MEANS_AUTO_SIZE = False
+BATCH_MEANS_OVERLAPPING = False
+BATCH_MEANS_MAX_BATCHES = 128
+BATCH_MEANS_MAX_LAG1_AUTOCORRELATION = 0.1
 STEADY_ENABLED = True            # Per comodità la attiviamo solo quando necessario perché molto lunga
+# Modalità streaming: invece delle liste complete si tengono accumulatori online (Welford) e al più
+# METRICS_STREAMING_MAX_BATCHES medie di batch per serie, quindi la memoria non cresce con la durata.
+# Warm-up e Batch Means del report vengono calcolati sulle medie dei batch. Non compatibile con
+# l'arresto sequenziale.
+METRICS_STREAMING = False
+METRICS_STREAMING_MAX_BATCHES = 1024   # Numero pari, >= 10 volte NUM_BATCHES
+
+# --- PERCENTILI DELLE LATENZE (ISTOGRAMMI LOGARITMICI) ---
+# Tempi di risposta e di attesa sono contati anche in istogrammi a bucket logaritmici per
+# tipo di richiesta e priorità: i percentili finiscono nei riepiloghi, nell'export e nei grafici.
+LATENCY_HISTOGRAM_DIGITS = 2            # Cifre significative: errore relativo dei percentili <= 1%
+LATENCY_HISTOGRAM_RESOLUTION = 1e-6     # Valore più piccolo distinguibile (secondi)
+LATENCY_PERCENTILES = [50, 95, 99]
+
+# --- RECORD PER RICHIESTA SU DISCO ---
+# Se attivo, ogni simulazione (motori simpy e native) scrive un record per ogni richiesta conclusa
+# (arrivo, inizio servizio, completamento, tipo, priorità, pod, esito) in una nuova directory dentro
+# REQUEST_RECORDS_DIR, a blocchi .npy di REQUEST_RECORDS_CHUNK_SIZE righe: la memoria resta limitata.
+# Lettura con src.utils.request_records.RequestRecords (memory-map, blocco per blocco).
+REQUEST_RECORDS_ENABLED = False
+REQUEST_RECORDS_DIR = "output/records"
+REQUEST_RECORDS_CHUNK_SIZE = 65536
+
+# --- REGOLA DI ARRESTO SEQUENZIALE (STEADY-STATE) ---
+# Se attiva, la simulazione steady-state avanza a blocchi di SEQUENTIAL_CHECK_INTERVAL secondi
+# e si ferma appena tutte le metriche di SEQUENTIAL_METRICS hanno un CI (Batch Means) con
+# semi-ampiezza relativa <= SEQUENTIAL_TARGET_RELATIVE_HALF_WIDTH. STEADY_SIMULATION_TIME
+# diventa il budget massimo di tempo simulato, SEQUENTIAL_MAX_WALL_TIME quello di tempo reale.
+SEQUENTIAL_STOPPING_ENABLED = False
+SEQUENTIAL_METRICS = ["response_time", "p_loss", "p_loss[CHECKOUT]"]   # Anche per tipo, es. "wait_time[LOGIN]"
+SEQUENTIAL_TARGET_RELATIVE_HALF_WIDTH = 0.05
+SEQUENTIAL_CHECK_INTERVAL = 1000    # Secondi simulati tra due controlli
+SEQUENTIAL_MAX_WALL_TIME = None     # Secondi reali (None = nessun limite)
+
+# --- REPLICAZIONI INDIPENDENTI ---
+REPLICATIONS_ENABLED = False    # Esegue in main anche l'esperimento a replicazioni indipendenti
+NUM_REPLICATIONS = 32
+REPLICATION_WORKERS = None      # Processi del pool (None = tutti i core disponibili)
+REPLICATION_SEED_STRIDE = 2**20 # Passi della sequenza Lehmer tra le terne di seed di due replicazioni
+
+# --- SWEEP DEI PARAMETRI (CAPACITY PLANNING) ---
+SWEEP_ENABLED = False
+SWEEP_GRID = {                  # Ogni combinazione è uno scenario; ARRIVAL_RATE è il tasso costante
+    "ARRIVAL_RATE": [70, 85, 100],
+    "TARGET_QUEUE_LENGTH_PER_POD": [1, 2, 4],
+    "MAX_SCALE_STEP": [1, 2],
+    "SCALE_UP_COOLDOWN": [30],
+    "SCALE_DOWN_COOLDOWN": [150],
+    "MAX_PODS": [8, 12],
+}
+SWEEP_REPLICATIONS = 5
+SWEEP_MAX_PENDING = None        # Simulazioni in volo contemporaneamente (None = 2 x processi)
+SWEEP_OUTPUT_FILE = "output/sweep_results.csv"
+
+# --- CACHE DEI RISULTATI ---
+# Le simulazioni già eseguite con stessa configurazione, scenario, seed e codice vengono
+# caricate dal disco. Svuotamento manuale: python -m src.utils.result_cache invalidate
+# Disattivata di default: scrive fino a RESULT_CACHE_MAX_BYTES in RESULT_CACHE_DIR (relativa
+# alla cartella di lavoro, come gli altri output).
+RESULT_CACHE_ENABLED = False
+RESULT_CACHE_DIR = "output/.cache"
+RESULT_CACHE_MAX_BYTES = 2 * 1024**3    # Oltre questa dimensione si eliminano le voci usate meno di recente
+
+# --- CHECKPOINT DEI RUN LUNGHI (solo motore nativo) ---
+# Durante le simulazioni steady-state lo stato completo del simulatore viene salvato ogni
+# CHECKPOINT_INTERVAL secondi simulati; rilanciando lo stesso run dopo un'interruzione si
+# riparte dall'ultimo salvataggio, con risultati identici a un run senza interruzioni.
+CHECKPOINT_ENABLED = False  # Opzionale: utile solo per run molto lunghi
+CHECKPOINT_DIR = "output/.checkpoints"
+CHECKPOINT_INTERVAL = 5000
+
+# --- GRAFICI ---
+# I report vengono salvati su file senza aprire finestre (backend Agg): i grafici indipendenti
+# sono disegnati in parallelo da PLOT_WORKERS processi (None = tutti i core, 1 = in serie).
+PLOT_DPI = 300
+PLOT_FORMAT = "png"         # Qualsiasi formato supportato da matplotlib, es. "pdf" o "svg"
+PLOT_WORKERS = None
+# Le serie temporali più lunghe di PLOT_MAX_POINTS punti vengono ridotte prima del plot:
+# "minmax" = primo, ultimo, minimo e massimo per colonna (picchi conservati), "lttb" =
+# Largest-Triangle-Three-Buckets (forma della curva), None = tutti i punti.
+PLOT_DOWNSAMPLING = "minmax"
+PLOT_MAX_POINTS = 10000
+
+# --- METRICHE DI SISTEMA (CODA E POD) ---
+# Medie di coda, pod occupati e pod attivi (Lq, L, utilizzo) sono integrali esatti
+# aggiornati a ogni cambio di stato. Il campionamento periodico di pod e coda serve
+# solo ai grafici e alle serie temporali: intervallo in secondi simulati.
+SYSTEM_SAMPLE_INTERVAL = 1.0
+
+# --- MOTORE DI SIMULAZIONE ---
+# "simpy": processi SimPy (implementazione di riferimento)
+# "native": calendario di eventi a heap, produce le stesse metriche a parità di seed ma è più veloce
+# "lindley": ricorsione di Kiefer-Wolfowitz, solo baseline con numero di pod fisso (HPA disabilitato)
+SIMULATION_ENGINE = "native"
+
+# --- CAMPIONAMENTO A BLOCCHI DELLE VARIABILI ALEATORIE ---
+# Numero di valori estratti per ogni chiamata a NumPy. Inter-arrivi e scelta del tipo
+# restano identici al campionamento singolo; i tempi di servizio usano un sotto-stream
+# per tipo di richiesta derivato da service_rng, quindi a parità di seed la sequenza dei
+# tempi di servizio (e i risultati) cambia rispetto al campionamento singolo.
+# 0 = campionamento singolo su stream condiviso (sequenza della versione originale, default).
+# Opzionale, per run lunghi: es. 4096 (all'avvio viene stampata una nota).
+VARIATE_BLOCK_SIZE = 0
+
+# --- LOGGING DELLA SIMULAZIONE ---
+# "DEBUG": un messaggio per ogni evento (molto lento su run lunghi)
+# "INFO": solo avvio/arresto pod, scaling e decisioni dell'HPA
+# "OFF": nessun messaggio (default, i messaggi disabilitati non vengono nemmeno formattati)
+LOG_LEVEL = "OFF"
+LOG_COMPONENTS = {          # Abilitazione per singolo componente (si applica il LOG_LEVEL globale)
+    "generator": True,
+    "pod": True,
+    "watcher": True,
+    "simulator": True,
+    "hpa": True,
+}
+LOG_FILE = None             # None = stdout, altrimenti percorso di un file (in append)
+EVENT_TRACE_FILE = None     # Percorso della traccia binaria degli eventi per il debug (None = disattivata)
 
 # --- CONFIGURAZIONE DEL WORKER E DEI POD ---
 # Concettualmente abbiamo un solo worker node.
@@ -54,6 +182,15 @@ TRAFFIC_PROFILE = {
     RequestType.ANALYTICS: 0.25,
     RequestType.ADD_TO_CART: 0.15
 }
+# Le probabilità adattate dal DynamicTrafficProfiler (salute di NAVIGATION) sono tenute in una
+# tabella cumulativa ricalcolata quando il fattore di salute cambia di più della tolleranza,
+# controllando ogni TRAFFIC_PROFILE_UPDATE_INTERVAL arrivi. Con i default (0.0 e 1) la salute è
+# letta a ogni arrivo: sequenza identica, bit per bit, a quella delle versioni precedenti.
+# Approssimazione opzionale per run lunghi: es. 0.001 e 16 ricostruiscono la tabella su meno
+# dell'1% degli arrivi (contro circa il 42%), ma la scelta del tipo segue la salute con un
+# ritardo di al più 16 arrivi e i risultati non coincidono più con quelli esatti.
+TRAFFIC_PROFILE_HEALTH_TOLERANCE = 0.0
+TRAFFIC_PROFILE_UPDATE_INTERVAL = 1
 
 
 # --- FUNZIONE HELPER PER CALCOLARE I PARAMETRI LOG-NORMALE ---
@@ -65,6 +202,14 @@ def get_lognormal_params(mean, stdev):
 
 
 # --- CONFIGURAZIONE TEMPI DI SERVIZIO ---
+# Distribuzioni supportate ("dist") e relativi "params" (validati all'avvio della simulazione):
+#   "lognormal":     (mu, sigma) del logaritmo, es. get_lognormal_params(mean, stdev)
+#   "exponential":   {"scale": media}
+#   "gamma":         {"shape": k, "scale": theta}
+#   "weibull":       {"shape": k, "scale": lambda}
+#   "deterministic": {"value": tempo}
+#   "bootstrap":     {"samples": [...]} oppure {"path": "tracce/login.csv"} (ricampionamento con reinserimento
+#                    dei tempi osservati: si estraggono solo i valori presenti nei campioni)
 SERVICE_TIME_CONFIG = {
     RequestType.LOGIN: {
         "dist": "lognormal",
@@ -96,6 +241,10 @@ REQUEST_TIMEOUTS = {
     RequestType.CHECKOUT: 10.0,  # L'utente è più paziente durante il checkout
     RequestType.ANALYTICS: 5.0   # Richiesta interna, può essere scartata
 }
+# Se True, le richieste scadute vengono rimosse dalla coda al momento del timeout.
+# Con False (comportamento storico) restano in coda, contano nella sua lunghezza
+# e vengono scartate solo quando un pod le preleva.
+EVICT_EXPIRED_REQUESTS = False
 
 # --- SOLUZIONE MIGLIORATIVA: ABSTRACT PRIORITY SCHEDULING ---
 PRIORITY_SCHEDULING_ENABLED = True  # O False, per eseguire la versione baseline
@@ -121,3 +270,19 @@ REQUEST_TYPE_TO_PRIORITY = {
     RequestType.CHECKOUT:    Priority.HIGH,      # Può aspettare qualche secondo
     RequestType.ANALYTICS:   Priority.LOW       # Background
 }
+
+# --- DISCIPLINA DI CODA (scenario con priorità, entrambi i motori) ---
+# "priority": priorità statica su heap, come il PriorityStore di SimPy (comportamento storico)
+# "fifo": First-In First-Out, per confrontare le discipline a parità di numeri casuali
+# "strict_priority": priorità stretta con una coda FIFO per classe
+# "wfq": weighted fair queuing tra le classi (Deficit Round Robin sui tempi di servizio)
+# "edf": Earliest-Deadline-First sulla scadenza arrival_time + timeout
+# "aging": priorità che migliora di un livello ogni QUEUE_AGING_INTERVAL secondi di attesa
+QUEUE_DISCIPLINE = "priority"
+QUEUE_WFQ_WEIGHTS = {           # Quota del tempo di servizio di ogni classe sotto saturazione
+    Priority.HIGH: 4,
+    Priority.MEDIUM: 2,
+    Priority.LOW: 1
+}
+QUEUE_WFQ_QUANTUM = 0.1         # Secondi di servizio accreditati per unità di peso a ogni turno
+QUEUE_AGING_INTERVAL = 2.0      # Secondi di attesa per guadagnare un livello di priorità
@@ -0,0 +1,139 @@
+# src/experiments/parameter_sweep.py - SWEEP PARALLELO SU TASSI DI ARRIVO E PARAMETRI DELL'HPA
+
+import csv
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src.experiments.replication_runner import (ConstantArrivalRate, aggregate_replications,
+                                                build_config, run_replication)
+from src.utils.lehmer_rng import LehmerRNG
+from src.utils.metrics import Metrics
+from src.utils.metrics_with_priority import MetricsWithPriority
+
+# Chiave della griglia che non corrisponde a un parametro di config ma al tasso di arrivo costante
+ARRIVAL_RATE_KEY = "ARRIVAL_RATE"
+
+POLICIES = {"baseline": False, "priority": True}
+
+
+class ParameterSweep:
+    """
+    Esegue ogni cella (scenario x politica x replicazione) di una griglia di parametri
+    su un pool di processi e scrive un'unica tabella CSV con una riga per
+    (scenario, politica): i valori dei parametri e, per ogni metrica, media e
+    semi-ampiezza dell'intervallo di confidenza tra le replicazioni.
+
+    La memoria resta limitata: i task vengono generati in modo pigro, al più
+    'max_pending' sono in volo contemporaneamente e ogni riga viene scritta (e i
+    riepiloghi liberati) appena tutte le replicazioni della sua cella sono terminate.
+    Le replicazioni con lo stesso indice usano la stessa terna di seed in tutte le
+    celle (numeri casuali comuni tra le configurazioni confrontate).
+    """
+
+    def __init__(self, config_module, grid, num_replications=None, max_workers=None, max_pending=None,
+                 policies=("baseline", "priority"), simulation_time=None):
+        self.config = config_module
+        self.grid = {name: list(values) for name, values in grid.items()}
+        self.num_replications = num_replications or config_module.SWEEP_REPLICATIONS
+        self.max_workers = max_workers or config_module.REPLICATION_WORKERS or os.cpu_count()
+        self.max_pending = max_pending or config_module.SWEEP_MAX_PENDING or 2 * self.max_workers
+        self.policies = list(policies)
+        self.simulation_time = simulation_time or config_module.SIMULATION_TIME
+
+        unknown_policies = [p for p in self.policies if p not in POLICIES]
+        if unknown_policies:
+            raise ValueError(f"Politiche sconosciute: {unknown_policies}. Valide: {list(POLICIES)}")
+        if ARRIVAL_RATE_KEY not in self.grid:
+            raise ValueError(f"La griglia deve contenere '{ARRIVAL_RATE_KEY}'")
+        # Validazione anticipata dei nomi dei parametri, prima di avviare il pool
+        build_config({name: values[0] for name, values in self.grid.items() if name != ARRIVAL_RATE_KEY})
+
+    def cells(self):
+        """Tutte le combinazioni della griglia, come dizionari {parametro: valore}."""
+        names = list(self.grid)
+        for values in itertools.product(*(self.grid[name] for name in names)):
+            yield dict(zip(names, values))
+
+    def num_cells(self):
+        total = 1
+        for values in self.grid.values():
+            total *= len(values)
+        return total
+
+    def _tasks(self, seeds):
+        """Generatore pigro dei task: (chiave della riga, valori della cella, argomenti di run_replication)."""
+        for cell_index, cell in enumerate(self.cells()):
+            overrides = {name: value for name, value in cell.items() if name != ARRIVAL_RATE_KEY}
+            lambda_function = ConstantArrivalRate(cell[ARRIVAL_RATE_KEY])
+            for policy in self.policies:
+                for replication_index, replication_seeds in enumerate(seeds):
+                    yield (cell_index, policy), cell, (replication_index, replication_seeds, lambda_function,
+                                                 self.simulation_time, POLICIES[policy], overrides)
+
+    def _fieldnames(self):
+        # Le metriche sono quelle dei riepiloghi: MetricsWithPriority le contiene tutte
+        metric_names = list(MetricsWithPriority(self.config).get_summary_statistics())
+        for name in Metrics(self.config).get_summary_statistics():
+            if name not in metric_names:
+                metric_names.append(name)
+        columns = ["cell", *self.grid, "policy", "num_replications"]
+        for name in metric_names:
+            columns += [f"{name}_mean", f"{name}_half_width"]
+        return columns
+
+    def run(self, output_path=None):
+        """Esegue lo sweep e restituisce il percorso della tabella dei risultati."""
+        output_path = output_path or self.config.SWEEP_OUTPUT_FILE
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+        lehmer_rng = LehmerRNG(seed=self.config.LEHMER_SEED)
+        seeds = [lehmer_rng.get_replication_seeds(i, count=3, stride=self.config.REPLICATION_SEED_STRIDE)
+                 for i in range(self.num_replications)]
+        open_cells = {}         # cell_index -> [valori dei parametri, righe ancora da scrivere]
+        partial = {}            # (cell_index, policy) -> riepiloghi delle replicazioni completate
+
+        total_tasks = self.num_cells() * len(self.policies) * self.num_replications
+        print(f"Sweep: {self.num_cells()} scenari x {len(self.policies)} politiche x "
+              f"{self.num_replications} replicazioni = {total_tasks} simulazioni su {self.max_workers} processi")
+
+        with open(output_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self._fieldnames(), restval="")
+            writer.writeheader()
+
+            def collect(key, output):
+                partial.setdefault(key, []).append(output["summary"])
+                if len(partial[key]) < self.num_replications:
+                    return
+                cell_index, policy = key
+                aggregate = aggregate_replications(partial.pop(key), self.config.CONFIDENCE_LEVEL)
+                row = {"cell": cell_index, **open_cells[cell_index][0], "policy": policy,
+                       "num_replications": self.num_replications}
+                for name, result in aggregate.items():
+                    row[f"{name}_mean"] = result["mean"]
+                    row[f"{name}_half_width"] = result["half_width"]
+                writer.writerow(row)
+                f.flush()
+                open_cells[cell_index][1] -= 1
+                if open_cells[cell_index][1] == 0:
+                    del open_cells[cell_index]
+
+            if self.max_workers == 1:
+                for key, cell, args in self._tasks(seeds):
+                    open_cells.setdefault(key[0], [cell, len(self.policies)])
+                    collect(key, run_replication(*args))
+            else:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                    pending = {}    # future -> chiave della riga
+                    for key, cell, args in self._tasks(seeds):
+                        open_cells.setdefault(key[0], [cell, len(self.policies)])
+                        if len(pending) >= self.max_pending:
+                            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                collect(pending.pop(future), future.result())
+                        pending[executor.submit(run_replication, *args)] = key
+                    for future in list(pending):
+                        collect(pending.pop(future), future.result())
+
+        print(f"Risultati dello sweep salvati in: {output_path}")
+        return output_path
@@ -0,0 +1,226 @@
+# src/experiments/replication_runner.py - REPLICAZIONI INDIPENDENTI IN PARALLELO
+
+import contextlib
+import os
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.config import Priority, RequestType
+from src.simulation.engine import get_simulator_class, scenario_discipline
+from src.utils.latency_histogram import LatencyHistograms, format_percentiles, latency_summary
+from src.utils.lehmer_rng import LehmerRNG
+from src.utils.metrics import Metrics
+from src.utils.metrics_with_priority import MetricsWithPriority
+from src.utils.result_cache import ResultCache
+
+
+class ConstantArrivalRate:
+    """
+    Tasso di arrivo costante. Sostituisce 'lambda t: rate' negli esperimenti paralleli:
+    le lambda non sono serializzabili con pickle e non possono essere inviate ai processi.
+    """
+    def __init__(self, rate):
+        self.rate = rate
+
+    def __call__(self, t):
+        return self.rate
+
+    def __repr__(self):
+        return f"ConstantArrivalRate({self.rate})"
+
+
+def build_config(overrides=None):
+    """
+    Restituisce il modulo di configurazione con i parametri in 'overrides' sostituiti.
+    Il modulo originale non viene modificato: si costruisce una copia, così un processo
+    del pool può eseguire in sequenza celle con configurazioni diverse.
+    """
+    from src import config
+    if not overrides:
+        return config
+
+    unknown = [name for name in overrides if not hasattr(config, name)]
+    if unknown:
+        raise ValueError(f"Parametri di configurazione sconosciuti: {unknown}")
+    config_view = types.ModuleType(config.__name__)
+    config_view.__dict__.update(vars(config))
+    config_view.__dict__.update(overrides)
+    return config_view
+
+
+def run_replication(replication_index, seeds, lambda_function, simulation_time, with_priority=False,
+                    config_overrides=None):
+    """
+    Esegue una singola replicazione e ne restituisce il riepilogo scalare e gli istogrammi
+    delle latenze (fondibili con quelli delle altre replicazioni).
+    Funzione di modulo (e non metodo) così può essere eseguita in un processo del pool.
+    Se la cache dei risultati è attiva, i risultati già calcolati vengono riutilizzati.
+    """
+    config = build_config(config_overrides)
+    Simulator = get_simulator_class(config, with_priority=with_priority)
+    queue_discipline = scenario_discipline(config, with_priority)
+
+    cache = ResultCache.from_config(config)
+    result = None
+    if cache is not None:
+        scenario = ("priority" if with_priority else "baseline", queue_discipline)
+        key = cache.make_key(config, Simulator, seeds, lambda_function, simulation_time, kind="replication",
+                             scenario=scenario)
+        result = cache.get(key)
+
+    if result is None:
+        metrics = MetricsWithPriority(config) if with_priority else Metrics(config)
+        arrival_seed, choice_seed, service_seed = seeds
+
+        simulator = Simulator(
+            config_module=config,
+            metrics=metrics,
+            arrival_rng=np.random.default_rng(arrival_seed),
+            choice_rng=np.random.default_rng(choice_seed),
+            service_rng=np.random.default_rng(service_seed),
+            lambda_function=lambda_function,
+            queue_discipline=queue_discipline
+        )
+        # I banner di avvio/fine di decine di replicazioni in parallelo sarebbero solo rumore
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            simulator.run(simulation_duration=simulation_time)
+
+        summary = metrics.get_summary_statistics()
+        latency_keys = latency_summary(metrics.latency_histograms, config.LATENCY_PERCENTILES, with_priority)
+        result = {
+            # LATENCY_PERCENTILES non fa parte della chiave: in cache vanno solo gli istogrammi,
+            # i percentili sono ricalcolati sotto con quelli configurati
+            "summary": {name: value for name, value in summary.items() if name not in latency_keys},
+            "latency_histograms": metrics.latency_histograms,
+        }
+        if cache is not None:
+            cache.put(key, result)
+
+    summary = {**result["summary"],
+               **latency_summary(result["latency_histograms"], config.LATENCY_PERCENTILES, with_priority)}
+    return {
+        "replication": replication_index,
+        "seeds": tuple(seeds),
+        "with_priority": with_priority,
+        "summary": summary,
+        "latency_histograms": result["latency_histograms"],
+    }
+
+
+def aggregate_replications(summaries, confidence_level=0.95):
+    """
+    Combina i riepiloghi di replicazioni indipendenti: per ogni metrica calcola la media
+    tra le replicazioni e l'intervallo di confidenza t di Student (le replicazioni sono
+    i.i.d., quindi non serve il Batch Means). Le replicazioni in cui la metrica vale NaN
+    (nessuna osservazione) vengono escluse dal calcolo di quella metrica.
+
+    Returns:
+        dict: {nome_metrica: {'mean', 'ci', 'half_width', 'confidence_level', 'num_replications'}}
+    """
+    results = {}
+    for name in summaries[0]:
+        values = np.array([summary[name] for summary in summaries], dtype=float)
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            continue
+
+        mean = float(np.mean(values))
+        if n > 1:
+            from scipy.stats import t    # Solo nel processo principale: i worker non caricano scipy
+            t_value = t.ppf((1 + confidence_level) / 2, df=n - 1)
+            half_width = float(t_value * np.std(values, ddof=1) / np.sqrt(n))
+        else:
+            half_width = float('nan')
+
+        results[name] = {
+            'mean': mean,
+            'ci': (mean - half_width, mean + half_width),
+            'half_width': half_width,
+            'confidence_level': confidence_level,
+            'num_replications': n
+        }
+    return results
+
+
+class ReplicationRunner:
+    """
+    Esegue N replicazioni indipendenti di uno scenario su un ProcessPoolExecutor.
+
+    La replicazione i usa la terna di seed (arrival, choice, service) derivata con
+    LehmerRNG.get_replication_seeds(i): terne diverse per replicazioni diverse, ma
+    riproducibili. Baseline e versione con priorità della stessa replicazione usano
+    la stessa terna, come in main.py (numeri casuali comuni).
+    """
+
+    def __init__(self, config_module, num_replications=None, max_workers=None, base_seed=None):
+        self.config = config_module
+        self.num_replications = num_replications or config_module.NUM_REPLICATIONS
+        self.max_workers = max_workers or config_module.REPLICATION_WORKERS or os.cpu_count()
+        self.base_seed = config_module.LEHMER_SEED if base_seed is None else base_seed
+
+    def replication_seeds(self):
+        lehmer_rng = LehmerRNG(seed=self.base_seed)
+        return [lehmer_rng.get_replication_seeds(i, count=3, stride=self.config.REPLICATION_SEED_STRIDE)
+                for i in range(self.num_replications)]
+
+    def run(self, lambda_function, simulation_time=None, variants=(False, True), config_overrides=None):
+        """
+        Esegue le replicazioni per ogni variante (False = baseline, True = priorità).
+
+        Returns:
+            dict: {'baseline'/'priority': {'replications': [...], 'aggregate': {...},
+                  'latency_histograms': LatencyHistograms}}
+                  con le replicazioni ordinate per indice, indipendentemente
+                  dall'ordine di completamento. Gli istogrammi sono la fusione di
+                  quelli di tutte le replicazioni.
+        """
+        simulation_time = simulation_time or self.config.SIMULATION_TIME
+        tasks = [(i, seeds, lambda_function, simulation_time, with_priority, config_overrides)
+                 for with_priority in variants
+                 for i, seeds in enumerate(self.replication_seeds())]
+
+        if self.max_workers == 1:
+            outputs = [run_replication(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(run_replication, *task) for task in tasks]
+                outputs = [future.result() for future in futures]
+
+        results = {}
+        for with_priority in variants:
+            replications = sorted((o for o in outputs if o["with_priority"] == with_priority),
+                                  key=lambda o: o["replication"])
+            results["priority" if with_priority else "baseline"] = {
+                "replications": replications,
+                "aggregate": aggregate_replications([r["summary"] for r in replications],
+                                                    self.config.CONFIDENCE_LEVEL),
+                "latency_histograms": LatencyHistograms.merged(r["latency_histograms"] for r in replications)
+            }
+        return results
+
+
+def print_replication_results(aggregate, label, metric_names=None):
+    """Stampa media e intervallo di confidenza tra le replicazioni delle metriche richieste."""
+    print(f"\n--- Risultati su replicazioni indipendenti: {label} ---")
+    for name in metric_names or aggregate:
+        if name not in aggregate:
+            continue
+        result = aggregate[name]
+        print(f"- {name:32}: {result['mean']:.4f} ± {result['half_width']:.4f} "
+              f"(CI al {result['confidence_level']:.0%}, n={result['num_replications']})")
+
+
+def print_pooled_percentiles(histograms, label, percentiles, with_priority=False):
+    """Stampa i percentili del tempo di risposta calcolati sugli istogrammi fusi di tutte le replicazioni."""
+    print(f"\n--- Percentili del tempo di risposta (tutte le replicazioni): {label} ---")
+    print(f"- {'Complessivo':12}: {format_percentiles(histograms.percentiles('response_time', percentiles))}")
+    groups = [(req_type, None) for req_type in sorted(RequestType, key=lambda e: e.name)]
+    if with_priority:
+        groups += [(None, priority) for priority in sorted(Priority)]
+    for req_type, priority in groups:
+        histogram = histograms.histogram("response_time", req_type, priority)
+        if histogram.count:
+            print(f"- {(req_type or priority).name:12}: {format_percentiles(histogram.percentiles(percentiles))}")
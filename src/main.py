@@ -1,18 +1,23 @@
 import numpy as np
 from src import config
 
-from src.steady_state_analysis.steady_state_analyzer import SteadyStateAnalyzer
-from src.simulation.simulator_with_priority import SimulatorWithPriority
-from src.steady_state_analysis.steady_state_plotter import SteadyStatePlotter
+from src.simulation.engine import get_simulator_class, scenario_discipline
+from src.simulation.checkpoint import SimulationCheckpointer
+from src.simulation.native_simulator import NativeSimulator
+from src.experiments.replication_runner import (ReplicationRunner, ConstantArrivalRate, print_pooled_percentiles,
+                                              print_replication_results)
+from src.experiments.parameter_sweep import ParameterSweep
+from src.steady_state_analysis.warmup_detection import configured_warmup
 from src.utils.lehmer_rng import LehmerRNG
 from src.utils.metrics import Metrics
-from analysis.data_report import export_summary
-from analysis.data_report import *
-from analysis.plotter import Plotter
-from src.simulation.simulator import Simulator
 from src.utils.metrics_with_priority import MetricsWithPriority
+from src.utils.result_cache import ResultCache
+from src.utils.streaming_metrics import make_metrics
 import os # Importa il modulo os per creare le directory
 
+# Analisi e grafici (pandas, matplotlib, seaborn, scipy) sono importati solo dove servono,
+# così la simulazione e i processi worker non ne pagano il caricamento.
+
 csv1 = "output/non_prioritized_summary.csv",
 csv2 = "output/prioritized_summary.csv",
 label1 = "Senza Priorità",
@@ -21,11 +26,83 @@ label2 = "Con Priorità"
 #tassi di arrivo dinamici
 tassi_costanti=[70,85,89] # stabile, vicino l'instabilità e instabile si posso modificare
 
+def build_simulator(simulator_class, metrics, seeds, lambda_fn, queue_discipline="fifo"):
+    arrival_seed, choice_seed, service_seed = seeds
+    return simulator_class(
+        config_module=config,
+        metrics=metrics,
+        arrival_rng=np.random.default_rng(seed=arrival_seed),
+        choice_rng=np.random.default_rng(seed=choice_seed),
+        service_rng=np.random.default_rng(seed=service_seed),
+        lambda_function=lambda_fn,
+        queue_discipline=queue_discipline
+    )
+
+
+def simulate_sequential(simulator_class, metrics, seeds, lambda_fn, queue_discipline="fifo"):
+    """
+    Esegue una simulazione steady-state con la regola di arresto sequenziale.
+    La durata non è nota in anticipo, quindi cache e checkpoint non vengono usati.
+    """
+    from src.steady_state_analysis.sequential_stopping import SequentialStoppingRule
+
+    simulator = build_simulator(simulator_class, metrics, seeds, lambda_fn, queue_discipline)
+    SequentialStoppingRule(config).run(simulator)
+    return metrics
+
+
+def simulate(simulator_class, metrics, seeds, lambda_fn, simulation_duration, cache=None, checkpoint=False,
+             queue_discipline="fifo"):
+    """
+    Esegue una simulazione e restituisce le sue metriche. Se la stessa simulazione
+    (config, scenario, seed, codice) è già in cache, le metriche vengono caricate dal disco.
+    Con checkpoint=True (solo motore nativo) lo stato viene salvato periodicamente e un
+    run interrotto riprende dall'ultimo checkpoint.
+    """
+    scenario = (metrics.SCENARIO, queue_discipline)
+    if cache is not None:
+        key = cache.make_key(config, simulator_class, seeds, lambda_fn, simulation_duration, scenario=scenario)
+        cached_metrics = cache.get(key)
+        if cached_metrics is not None:
+            print(f"Risultati caricati dalla cache ({simulator_class.__name__}, durata {simulation_duration}).")
+            # LATENCY_PERCENTILES non fa parte della chiave: si usano quelli configurati ora
+            cached_metrics.latency_percentiles = tuple(config.LATENCY_PERCENTILES)
+            return cached_metrics
+
+    checkpointer = None
+    if checkpoint and issubclass(simulator_class, NativeSimulator):
+        # Il checkpoint è identificato come la voce di cache: stesso run, stesso file
+        checkpoint_key = ResultCache.make_key(config, simulator_class, seeds, lambda_fn, simulation_duration,
+                                              kind="checkpoint", scenario=scenario)
+        checkpointer = SimulationCheckpointer(os.path.join(config.CHECKPOINT_DIR, f"{checkpoint_key}.ckpt"),
+                                              config.CHECKPOINT_INTERVAL)
+
+    if checkpointer is not None and checkpointer.exists():
+        simulator = checkpointer.load(config, lambda_fn)
+        metrics = simulator.metrics
+        print(f"Ripresa dal checkpoint a t = {simulator.env.now:.0f}s ({simulator_class.__name__}).")
+    else:
+        simulator = build_simulator(simulator_class, metrics, seeds, lambda_fn, queue_discipline)
+
+    if checkpointer is not None:
+        simulator.run(simulation_duration=simulation_duration, checkpointer=checkpointer)
+        checkpointer.remove()
+    else:
+        simulator.run(simulation_duration=simulation_duration)
+
+    if cache is not None:
+        cache.put(key, metrics)
+    return metrics
+
+
 def main():
     """
     Funzione principale che orchestra l'intero processo,
     eseguendo le simulazioni per diversi tassi di arrivo.
     """
+    from src.analysis.data_report import export_summary
+    from src.analysis.plotter import Plotter
+
     print("--- Inizio Progetto di Simulazione E-commerce ---")
 
     # Definiamo i tassi di arrivo da testare
@@ -42,6 +119,11 @@ def main():
     # Il generatore Lehmer ci fornisce una base di seed riproducibile
     lehmer_rng = LehmerRNG(seed=config.LEHMER_SEED)
 
+    # Classe del motore scelto in config (SimPy o nativo): lo scenario è dato da disciplina e metriche
+    Simulator = get_simulator_class(config, with_priority=True)
+    priority_discipline = scenario_discipline(config, with_priority=True)
+    cache = ResultCache.from_config(config)
+
     # Eseguiamo un ciclo per ogni scenario di tasso di arrivo
     for scenario_name, lambda_fn in arrival_scenarios.items():
         print(f"\n{'='*20} ESECUZIONE SCENARIO: {scenario_name.upper()} {'='*20}")
@@ -59,41 +141,16 @@ def main():
 
         # --- ESECUZIONE BASELINE (per questo tasso di arrivo) ---
         print(f"\n--- {scenario_name}: SCENARIO BASELINE (FIFO) ---")
-        metrics = Metrics()
-
-        arrival_rng_base = np.random.default_rng(seed=arrival_seed)
-        choice_rng_base = np.random.default_rng(seed=choice_seed)
-        service_rng_base = np.random.default_rng(seed=service_seed)
-
-        simulator = Simulator(
-            config_module=config,
-            metrics=metrics,
-            arrival_rng=arrival_rng_base,
-            choice_rng=choice_rng_base,
-            service_rng=service_rng_base,
-            lambda_function=lambda_fn  # Passiamo la funzione lambda
-        )
-        simulator.run(simulation_duration=config.SIMULATION_TIME)
+        metrics = simulate(Simulator, Metrics(config), (arrival_seed, choice_seed, service_seed),
+                           lambda_fn, config.SIMULATION_TIME, cache)
         metrics.print_summary()
         print("\n--- Esecuzione baseline terminata ---")
 
         # --- ESECUZIONE MIGLIORATA (per questo tasso di arrivo) ---
         print(f"\n--- {scenario_name}: SCENARIO MIGLIORATO (PRIORITY) ---")
-        metrics_prio = MetricsWithPriority(config)
-
-        arrival_rng_prio = np.random.default_rng(seed=arrival_seed)
-        choice_rng_prio = np.random.default_rng(seed=choice_seed)
-        service_rng_prio = np.random.default_rng(seed=service_seed)
-
-        simulator_prio = SimulatorWithPriority(
-            config_module=config,
-            metrics=metrics_prio,
-            arrival_rng=arrival_rng_prio,
-            choice_rng=choice_rng_prio,
-            service_rng=service_rng_prio,
-            lambda_function=lambda_fn # Passiamo la stessa funzione lambda
-        )
-        simulator_prio.run(simulation_duration=config.SIMULATION_TIME)
+        # Stessi seed e stessa funzione lambda della baseline (numeri casuali comuni)
+        metrics_prio = simulate(Simulator, MetricsWithPriority(config), (arrival_seed, choice_seed, service_seed),
+                                lambda_fn, config.SIMULATION_TIME, cache, queue_discipline=priority_discipline)
         metrics_prio.print_summary()
         print("\n--- Esecuzione migliorativa terminata ---")
 
@@ -112,6 +169,16 @@ def main():
         plotter = Plotter(metrics, metrics_prio, config)
         plotter.generate_comprehensive_report(output_dir=output_folder, run_prefix=scenario_name)
 
+    if config.REPLICATIONS_ENABLED:
+        print("--- Inizio Esperimento a Replicazioni Indipendenti ---")
+        run_replication_experiment()
+        print("--- Fine Esperimento a Replicazioni Indipendenti ---")
+
+    if config.SWEEP_ENABLED:
+        print("--- Inizio Sweep dei Parametri ---")
+        ParameterSweep(config, config.SWEEP_GRID).run()
+        print("--- Fine Sweep dei Parametri ---")
+
     # Modificare il flag nel file di configurazione per attivare/disattivare simulazione a orizzonte infinito
     if config.STEADY_ENABLED:
         print("--- Inizio Simulazione Steady-State ---")
@@ -121,11 +188,42 @@ def main():
     print("\nTutte le simulazioni sono terminate.")
 
 
+def run_replication_experiment():
+    """
+    Esegue NUM_REPLICATIONS replicazioni indipendenti di ogni scenario a tasso costante,
+    in parallelo su più processi, e stampa medie e intervalli di confidenza.
+    """
+    runner = ReplicationRunner(config)
+    print(f"Replicazioni per scenario: {runner.num_replications}, processi: {runner.max_workers}")
+
+    # Stessi tassi degli scenari di main(), come oggetti serializzabili per il pool
+    replication_scenarios = {
+        "tasso_70": ConstantArrivalRate(70),
+        "tasso_85": ConstantArrivalRate(85),
+        "tasso_89": ConstantArrivalRate(100),
+    }
+    key_metrics = ["response_time_mean", "response_time_p95", "response_time_p99", "wait_time_mean", "p_loss",
+                   "queue_length_mean", "system_length_mean", "pod_count_mean", "utilization"]
+
+    for scenario_name, lambda_fn in replication_scenarios.items():
+        print(f"\n{'='*20} REPLICAZIONI SCENARIO: {scenario_name.upper()} {'='*20}")
+        results = runner.run(lambda_fn, simulation_time=config.SIMULATION_TIME)
+        print_replication_results(results["baseline"]["aggregate"], f"{scenario_name} - Senza Priorità", key_metrics)
+        print_replication_results(results["priority"]["aggregate"], f"{scenario_name} - Con Priorità", key_metrics)
+        print_pooled_percentiles(results["baseline"]["latency_histograms"], f"{scenario_name} - Senza Priorità",
+                                 config.LATENCY_PERCENTILES)
+        print_pooled_percentiles(results["priority"]["latency_histograms"], f"{scenario_name} - Con Priorità",
+                                 config.LATENCY_PERCENTILES, with_priority=True)
+
+
 def run_steady_state_experiment():
     """
     Esegue entrambe le simulazioni a orizzonte infinito e genera i grafici di
     confronto steady-state.
     """
+    from src.steady_state_analysis.steady_state_analyzer import SteadyStateAnalyzer
+    from src.steady_state_analysis.steady_state_plotter import SteadyStatePlotter
+
     print("\n--- AVVIO ESPERIMENTO STEADY-STATE A ORIZZONTE INFINITO ---")
 
     output_dir = "plots/steady_state"
@@ -139,31 +237,30 @@ def run_steady_state_experiment():
     seeds = lehmer_rng.get_numpy_seeds(count=3)
     arrival_seed, choice_seed, service_seed = seeds[0], seeds[1], seeds[2]
 
+    Simulator = get_simulator_class(config, with_priority=True)
+    priority_discipline = scenario_discipline(config, with_priority=True)
+    cache = ResultCache.from_config(config)
+
     # --- ESECUZIONE BASELINE ---
     print("\n--- Esecuzione Scenario Baseline (Steady-State) ---")
-    metrics_baseline = Metrics()
-    simulator_baseline = Simulator(
-        config_module=config,
-        metrics=metrics_baseline,
-        arrival_rng=np.random.default_rng(arrival_seed),
-        choice_rng=np.random.default_rng(choice_seed),
-        service_rng=np.random.default_rng(service_seed),
-        lambda_function=steady_lambda_fn
-    )
-    simulator_baseline.run(simulation_duration=config.STEADY_SIMULATION_TIME)
+    if config.SEQUENTIAL_STOPPING_ENABLED:
+        metrics_baseline = simulate_sequential(Simulator, make_metrics(config), (arrival_seed, choice_seed, service_seed),
+                                               steady_lambda_fn)
+    else:
+        metrics_baseline = simulate(Simulator, make_metrics(config), (arrival_seed, choice_seed, service_seed),
+                                    steady_lambda_fn, config.STEADY_SIMULATION_TIME, cache,
+                                    checkpoint=config.CHECKPOINT_ENABLED)
 
     # --- ESECUZIONE PRIORITÀ ---
     print("\n--- Esecuzione Scenario con Priorità (Steady-State) ---")
-    metrics_prio = MetricsWithPriority(config)
-    simulator_prio = SimulatorWithPriority(
-        config_module=config,
-        metrics=metrics_prio,
-        arrival_rng=np.random.default_rng(arrival_seed),
-        choice_rng=np.random.default_rng(choice_seed),
-        service_rng=np.random.default_rng(service_seed),
-        lambda_function=steady_lambda_fn
-    )
-    simulator_prio.run(simulation_duration=config.STEADY_SIMULATION_TIME)
+    if config.SEQUENTIAL_STOPPING_ENABLED:
+        metrics_prio = simulate_sequential(Simulator, make_metrics(config, with_priority=True),
+                                           (arrival_seed, choice_seed, service_seed), steady_lambda_fn,
+                                           priority_discipline)
+    else:
+        metrics_prio = simulate(Simulator, make_metrics(config, with_priority=True),
+                                (arrival_seed, choice_seed, service_seed), steady_lambda_fn, config.STEADY_SIMULATION_TIME, cache,
+                                checkpoint=config.CHECKPOINT_ENABLED, queue_discipline=priority_discipline)
 
     # --- ANALISI E PLOTTING FINALE ---
     print("\n--- Generazione Report Steady-State ---")
@@ -177,7 +274,7 @@ def run_steady_state_experiment():
     steady_plotter.generate_steady_state_report(
         analyzer_baseline=analyzer_baseline,
         analyzer_prio=analyzer_prio,
-        warmup=config.WARM_UP_TO_STEADY,
+        warmup=configured_warmup(config),
         batches=config.NUM_BATCHES,
         output_dir=output_dir
     )
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from src.config import RequestType, Priority
 
 
@@ -13,6 +13,8 @@ class Request:
         req_type (RequestType, optional): Tipo di richiesta (es. checkout, ricerca).
         arrival_time (float): Tempo di simulazione in cui la richiesta arriva.
         timeout (float): Tempo dopo il quale la richiesta viene automaticamente scartata se non servita
+        type_code (int): Codice intero del tipo (REQ_TYPE_CODES), usato come indice al posto
+                         dell'enum nei contatori aggiornati a ogni richiesta
         is_serviced, is_timeout: Flag per la corretta gestione della richiesta successivamente alla generazione
     """
     request_id: int
@@ -22,6 +24,7 @@ class Request:
     is_serviced = False  # Flag per sapere se un pod l'ha presa in carico
     timed_out = False    # Flag che verrà attivato dal watcher
     service_time: float
+    type_code: int = field(kw_only=True)
 
 # --- CLASSE DERIVATA (PER IL MIGLIORAMENTO) ---
 # Usiamo l'ereditarietà. PriorityRequest ha tutti i campi di Request più i suoi campi specifici.
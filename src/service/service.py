@@ -1,3 +1,9 @@
+import numpy as np
+
+from src.service.service_distributions import compile_service_distribution
+from src.utils.variate_streams import BlockStream
+
+
 class PodService:
     """
     Contiene la logica di business per processare le richieste.
@@ -7,21 +13,72 @@ class PodService:
     def __init__(self, rng, config):
         self.rng = rng # Questo ora è il "service_rng"
         self.config = config
+        # Un campionatore per tipo di richiesta, compilato e validato una sola volta: con il
+        # campionamento a blocchi ogni tipo ha un proprio sotto-stream bufferizzato derivato
+        # da service_rng, altrimenti si campiona un valore alla volta dallo stream condiviso
+        if config.VARIATE_BLOCK_SIZE > 0:
+            print(f"Nota: campionamento a blocchi attivo (VARIATE_BLOCK_SIZE = {config.VARIATE_BLOCK_SIZE}): "
+                  "i tempi di servizio non seguono la sequenza del campionamento singolo.")
+            self._block_streams = self._build_block_streams(config.VARIATE_BLOCK_SIZE)
+            self._samplers = {req_type: stream.next for req_type, stream in self._block_streams.items()}
+        else:
+            self._block_streams = None
+            self._samplers = {req_type: compile_service_distribution(rng, service_config)
+                              for req_type, service_config in config.SERVICE_TIME_CONFIG.items()}
+        self._undo = None   # Stato da ripristinare con undo_service_times
+
+    def _build_block_streams(self, block_size):
+        """
+        Crea un BlockStream per tipo di richiesta. I sotto-stream sono ottenuti con
+        rng.spawn nell'ordine di SERVICE_TIME_CONFIG, quindi sono riproducibili a
+        partire dal solo seed di service_rng: la k-esima richiesta di un tipo riceve
+        lo stesso tempo di servizio sia nella baseline sia nella versione con priorità.
+        """
+        streams = {}
+        child_rngs = self.rng.spawn(len(self.config.SERVICE_TIME_CONFIG))
+        for child_rng, (req_type, service_config) in zip(child_rngs, self.config.SERVICE_TIME_CONFIG.items()):
+            draw = compile_service_distribution(child_rng, service_config)
+            streams[req_type] = BlockStream(draw, block_size)
+        return streams
 
     def get_service_time(self, req_type):
         """
         Restituisce un tempo di servizio campionato dalla distribuzione
         corretta per il tipo di richiesta specificato.
         """
-        service_config = self.config.SERVICE_TIME_CONFIG[req_type]
-        dist_type = service_config["dist"]
-        params = service_config["params"]
-
-        if dist_type == "lognormal":
-            return self.rng.lognormal(*params)
-        elif dist_type == "exponential":
-            return self.rng.exponential(**params)
+        return self._samplers[req_type]()
+
+    def sampler(self, req_type):
+        """Funzione senza argomenti che campiona il tempo di servizio del tipo (come get_service_time)."""
+        return self._samplers[req_type]
+
+    def service_times(self, req_types, type_indices):
+        """
+        Tempi di servizio di una sequenza di richieste (type_indices: indici in req_types,
+        in ordine di arrivo), identici a quelli di get_service_time chiamato richiesta per
+        richiesta. Con i sotto-stream a blocchi ogni tipo è campionato in blocco; con lo
+        stream condiviso i tipi si alternano sullo stesso generatore e si campiona un
+        valore alla volta. undo_service_times annulla l'ultima chiamata.
+        """
+        if self._block_streams is None:
+            self._undo = self.rng.bit_generator.state
+            samplers = [self._samplers[req_type] for req_type in req_types]
+            return np.array([samplers[index]() for index in type_indices.tolist()], dtype=float)
+
+        service_times = np.empty(len(type_indices))
+        self._undo = {}
+        for index, req_type in enumerate(req_types):
+            selected = type_indices == index
+            values = self._block_streams[req_type].take(int(np.count_nonzero(selected)))
+            service_times[selected] = values
+            self._undo[req_type] = values
+        return service_times
+
+    def undo_service_times(self):
+        """Riporta i campionatori allo stato precedente l'ultima chiamata a service_times."""
+        if self._block_streams is None:
+            self.rng.bit_generator.state = self._undo
         else:
-            # Ritorna un valore di default o lancia un errore se la distribuzione non è supportata
-            print(f"ATTENZIONE: Distribuzione '{dist_type}' non riconosciuta. Uso 0.1s di default.")
-            return 0.1
+            for req_type, values in self._undo.items():
+                self._block_streams[req_type].unread(values)
+        self._undo = None
@@ -0,0 +1,116 @@
+# src/service/service_distributions.py - DISTRIBUZIONI DEI TEMPI DI SERVIZIO (COMPILATE E VALIDATE)
+
+import math
+import numbers
+from functools import partial
+
+import numpy as np
+
+
+class _ScaledDraw:
+    """Campionamento di una distribuzione standard moltiplicato per 'scale' (serializzabile con pickle)."""
+    __slots__ = ('draw', 'scale')
+
+    def __init__(self, draw, scale):
+        self.draw = draw
+        self.scale = scale
+
+    def __call__(self, size=None):
+        return self.scale * self.draw(size=size)
+
+
+class _ConstantDraw:
+    """Tempo di servizio deterministico."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, size=None):
+        return self.value if size is None else np.full(size, self.value)
+
+
+def _require(condition, dist_type, message):
+    if not condition:
+        raise ValueError(f"Parametri non validi per la distribuzione '{dist_type}': {message}")
+
+
+def _is_number(value):
+    # numbers.Real accetta anche gli scalari NumPy; bool è un int ma non un parametro valido
+    return isinstance(value, numbers.Real) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _positive(params, name, dist_type):
+    value = params.get(name)
+    _require(_is_number(value) and value > 0, dist_type,
+             f"'{name}' deve essere un numero positivo (trovato {value!r})")
+    return float(value)
+
+
+def _lognormal(rng, params):
+    # Parametri come tupla (mean, sigma) del logaritmo, es. da get_lognormal_params, o dizionario
+    mean, sigma = params if isinstance(params, (tuple, list)) else (params.get("mean"), params.get("sigma"))
+    _require(_is_number(mean), "lognormal", f"'mean' non valido ({mean!r})")
+    _require(_is_number(sigma) and sigma >= 0, "lognormal",
+             f"'sigma' deve essere >= 0 (trovato {sigma!r})")
+    return partial(rng.lognormal, mean, sigma)
+
+
+def _exponential(rng, params):
+    return partial(rng.exponential, scale=_positive(params, "scale", "exponential"))
+
+
+def _gamma(rng, params):
+    return partial(rng.gamma, _positive(params, "shape", "gamma"), _positive(params, "scale", "gamma"))
+
+
+def _weibull(rng, params):
+    # NumPy campiona la Weibull con scala 1: la scala si applica moltiplicando
+    return _ScaledDraw(partial(rng.weibull, _positive(params, "shape", "weibull")), _positive(params, "scale", "weibull"))
+
+
+def _deterministic(rng, params):
+    value = params.get("value")
+    _require(_is_number(value) and value >= 0, "deterministic",
+             f"'value' deve essere un numero >= 0 (trovato {value!r})")
+    return _ConstantDraw(float(value))
+
+
+def _bootstrap(rng, params):
+    # Ricampionamento con reinserimento (bootstrap) dei tempi di servizio osservati: ogni valore
+    # campionato è uno dei campioni, senza interpolazione. Lista "samples" o file "path"
+    # (.npy, oppure testo/CSV con un valore per riga)
+    if "path" in params:
+        path = params["path"]
+        samples = np.load(path) if path.endswith(".npy") else np.loadtxt(path, delimiter=",", ndmin=1)
+    else:
+        samples = params.get("samples")
+    samples = np.asarray(samples if samples is not None else [], dtype=float).ravel()
+    _require(len(samples) > 0, "bootstrap", "servono almeno un campione ('samples' o 'path')")
+    _require(bool(np.all(np.isfinite(samples)) and np.all(samples >= 0)), "bootstrap",
+             "i campioni devono essere finiti e >= 0")
+    return partial(rng.choice, samples)
+
+
+SERVICE_DISTRIBUTIONS = {
+    "lognormal": _lognormal,
+    "exponential": _exponential,
+    "gamma": _gamma,
+    "weibull": _weibull,
+    "deterministic": _deterministic,
+    "bootstrap": _bootstrap,
+}
+
+
+def compile_service_distribution(rng, service_config):
+    """
+    Restituisce il campionatore 'draw(size=None)' della distribuzione descritta da
+    service_config ({"dist": nome, "params": ...}) sul generatore rng, con i parametri
+    già validati. Solleva ValueError per distribuzioni sconosciute o parametri non validi.
+    """
+    dist_type = service_config.get("dist")
+    builder = SERVICE_DISTRIBUTIONS.get(dist_type)
+    if builder is None:
+        raise ValueError(f"Distribuzione del tempo di servizio '{dist_type}' non supportata. "
+                         f"Valori ammessi: {list(SERVICE_DISTRIBUTIONS)}")
+    return builder(rng, service_config.get("params", {}))
@@ -2,6 +2,8 @@ import numpy as np
 from src.config import TRAFFIC_PROFILE, RequestType, Priority
 from src.utils.metrics import Metrics
 from src.utils.metrics_with_priority import MetricsWithPriority
+from src.utils.columnar_store import REQ_TYPE_CODES
+from src.utils.variate_streams import cumulative_table
 
 class DynamicTrafficProfiler:
     """
@@ -12,6 +14,9 @@ class DynamicTrafficProfiler:
         self.metrics = metrics
         self.config = config_module
         self.base_profile = self.config.TRAFFIC_PROFILE.copy()
+        # Ordine fisso dei tipi: le tabelle restituite e gli indici scelti su di esse
+        # (ChoiceStream.index_from_table) si riferiscono sempre a questa lista
+        self.req_types = list(self.base_profile)
 
         # Le dipendenze del funnel: una richiesta del tipo "chiave"
         # dipende dalla salute della richiesta del tipo "valore".
@@ -24,18 +29,67 @@ class DynamicTrafficProfiler:
         # per evitare fluttuazioni estreme all'inizio della simulazione.
         self.min_data_threshold = 50
 
+        # Tabella cumulativa in cache: viene ricalcolata solo quando un fattore di salute
+        # si sposta di più di TRAFFIC_PROFILE_HEALTH_TOLERANCE dal valore con cui è stata
+        # costruita, controllando ogni TRAFFIC_PROFILE_UPDATE_INTERVAL arrivi.
+        self.health_tolerance = config_module.TRAFFIC_PROFILE_HEALTH_TOLERANCE
+        self.update_interval = max(1, config_module.TRAFFIC_PROFILE_UPDATE_INTERVAL)
+        self._health_sources = list(dict.fromkeys(self.funnel_dependencies.values()))
+        self.health_source_codes = [REQ_TYPE_CODES[source_req] for source_req in self._health_sources]
+        self._req_types = None
+        self._cdf = None
+        self._table_health = None
+        self._arrivals_until_check = 0
+
     def get_current_probabilities(self):
         """
         Restituisce la lista dei tipi di richiesta e la lista delle loro
         probabilità di arrivo, adattate in base alle performance attuali.
         """
+        return self._probabilities(self._current_health_factors())
+
+    def get_cumulative_table(self):
+        """
+        Restituisce i tipi di richiesta e la tabella cumulativa delle probabilità correnti
+        (da usare con ChoiceStream.choice_from_table), aggiornata ogni update_interval
+        arrivi se la salute del funnel si è spostata di più di health_tolerance. Con
+        tolleranza 0 e intervallo 1 la scelta è identica a quella fatta con
+        get_current_probabilities, ma la tabella viene ricostruita solo quando la salute
+        cambia davvero.
+        """
+        self._arrivals_until_check -= 1
+        if self._arrivals_until_check > 0:
+            return self._req_types, self._cdf
+        self._arrivals_until_check = self.update_interval
+
+        health_factors = self._current_health_factors()
+        cached = self._table_health
+        if cached is None or any(abs(h - c) > self.health_tolerance for h, c in zip(health_factors, cached)):
+            req_types, req_probs = self._probabilities(health_factors)
+            self._req_types, self._cdf = req_types, cumulative_table(req_probs)
+            self._table_health = health_factors
+        return self._req_types, self._cdf
+
+    def full_health_table(self):
+        """
+        Tipi e tabella cumulativa con tutte le sorgenti del funnel in piena salute: è la
+        tabella restituita da get_cumulative_table finché nessuna sorgente
+        (health_source_codes) ha registrato timeout, per ogni tolleranza e intervallo.
+        """
+        req_types, req_probs = self._probabilities(tuple(1.0 for _ in self._health_sources))
+        return req_types, cumulative_table(req_probs)
+
+    def _current_health_factors(self):
+        """Fattori di salute delle sorgenti del funnel (una volta per sorgente, anche se condivisa)."""
+        return tuple([self._calculate_health_factor(code) for code in self.health_source_codes])
+
+    def _probabilities(self, health_factors):
         adjusted_profile = self.base_profile.copy()
+        health_by_source = dict(zip(self._health_sources, health_factors))
 
         # Itera sulle dipendenze che abbiamo definito
         for dependent_req, source_req in self.funnel_dependencies.items():
-
-            # Calcola la "salute" della fase sorgente del funnel
-            health_factor = self._calculate_health_factor(source_req)
+            health_factor = health_by_source[source_req]
 
             # Applica il fattore di salute alla richiesta dipendente.
             # Se la navigazione fallisce (health < 1), la probabilità di
@@ -56,14 +110,10 @@ class DynamicTrafficProfiler:
 
     # ... (altre parti della classe) ...
 
-    def _calculate_health_factor(self, req_type: RequestType) -> float:
-        # Ora possiamo usare una logica unificata
-        if isinstance(self.metrics, MetricsWithPriority):
-            generated_count = self.metrics.requests_generated_by_req_type.get(req_type, 0)
-            timed_out_count = self.metrics.requests_timed_out_by_req_type.get(req_type, 0)
-        else: # Metrics
-            generated_count = self.metrics.requests_generated_data.get(req_type, 0)
-            timed_out_count = self.metrics.requests_timed_out_data.get(req_type, 0)
+    def _calculate_health_factor(self, type_code: int) -> float:
+        # Ora possiamo usare una logica unificata: entrambe le metriche contano per codice di tipo
+        generated_count = self.metrics.generated_by_type.counts[type_code]
+        timed_out_count = self.metrics.timed_out_by_type.counts[type_code]
 
         # --- DE-INDENTA QUESTA PARTE ---
         # Questa logica deve essere eseguita per entrambi gli scenari,
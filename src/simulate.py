@@ -0,0 +1,71 @@
+# src/simulate.py - PUNTO DI INGRESSO DI SOLA SIMULAZIONE (NIENTE ANALISI NÉ GRAFICI)
+#
+# Importa solo numpy, il simulatore e le metriche: adatto a worker, sweep e benchmark.
+# Esempio: python -m src.simulate --rate 85 --time 3600 --priority
+
+import time
+
+_start = time.perf_counter()
+
+import argparse
+import sys
+
+import numpy as np
+
+from src import config
+from src.simulation.engine import get_simulator_class, scenario_discipline
+from src.utils.lehmer_rng import LehmerRNG
+from src.utils.streaming_metrics import make_metrics
+
+_import_time = time.perf_counter() - _start
+
+# Moduli di analisi che questo punto di ingresso non deve caricare
+HEAVY_MODULES = ("pandas", "matplotlib", "seaborn", "scipy")
+
+
+def run(rate, simulation_time, with_priority=False, seed=None):
+    """
+    Esegue una simulazione a tasso di arrivo costante 'rate' con il motore di config e
+    restituisce le metriche. I seed dei tre generatori derivano da 'seed' (default
+    LEHMER_SEED) come nell'esperimento steady-state di main.py.
+    """
+    lehmer_rng = LehmerRNG(seed=config.LEHMER_SEED if seed is None else seed)
+    arrival_seed, choice_seed, service_seed = lehmer_rng.get_numpy_seeds(count=3)
+    metrics = make_metrics(config, with_priority=with_priority)
+    simulator_class = get_simulator_class(config, with_priority=with_priority)
+    simulator = simulator_class(
+        config_module=config,
+        metrics=metrics,
+        arrival_rng=np.random.default_rng(seed=arrival_seed),
+        choice_rng=np.random.default_rng(seed=choice_seed),
+        service_rng=np.random.default_rng(seed=service_seed),
+        lambda_function=lambda t: rate,
+        queue_discipline=scenario_discipline(config, with_priority)
+    )
+    simulator.run(simulation_duration=simulation_time)
+    return metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Esegue una sola simulazione, senza analisi né grafici.")
+    parser.add_argument("--rate", type=float, default=70, help="Tasso di arrivo costante (richieste/s)")
+    parser.add_argument("--time", type=float, default=config.SIMULATION_TIME, help="Tempo simulato (s)")
+    parser.add_argument("--priority", action="store_true", help="Scenario con scheduling a priorità")
+    parser.add_argument("--seed", type=int, default=None, help="Seed Lehmer di base (default LEHMER_SEED)")
+    parser.add_argument("--quiet", action="store_true", help="Non stampa il riepilogo delle metriche")
+    args = parser.parse_args(argv)
+
+    run_start = time.perf_counter()
+    metrics = run(args.rate, args.time, with_priority=args.priority, seed=args.seed)
+    run_time = time.perf_counter() - run_start
+    if not args.quiet:
+        metrics.print_summary()
+
+    print(f"\nAvvio (import): {_import_time * 1000:.0f} ms - simulazione ({config.SIMULATION_ENGINE}): {run_time:.2f} s")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    if loaded:
+        print(f"Attenzione: moduli di analisi caricati durante la simulazione: {', '.join(loaded)}")
+
+
+if __name__ == "__main__":
+    main()
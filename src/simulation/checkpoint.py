@@ -0,0 +1,173 @@
+# src/simulation/checkpoint.py - CHECKPOINT E RIPRESA DELLE SIMULAZIONI DEL MOTORE NATIVO
+
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.columnar_store import ColumnarStore
+from src.utils.sim_logger import ComponentLogger, EventTrace, SimLogger
+
+# Riferimenti esterni: non vengono copiati nel checkpoint ma forniti di nuovo alla ripresa
+_CONFIG = "config"
+_LAMBDA_FUNCTION = "lambda_function"
+_LOGGER = "log"
+_TRACE = "trace"
+_COLUMNAR = "columnar"
+
+
+class _CheckpointPickler(pickle.Pickler):
+    """
+    Serializza l'intero stato del simulatore (calendario, coda, pod, HPA, stato dei
+    Generator NumPy, metriche) tranne gli oggetti legati al processo corrente:
+    modulo di config, funzione lambda dello scenario (spesso una lambda, non
+    serializzabile) e logger con i loro file aperti. Gli archivi colonnari delle
+    metriche non entrano nel pickle: le loro righe sono nei segmenti del
+    checkpointer e nel pickle resta solo il numero di righe valide.
+    """
+
+    def __init__(self, file, simulator, checkpointer):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._checkpointer = checkpointer
+        self._external = {
+            id(simulator.config): _CONFIG,
+            id(simulator.lambda_function): _LAMBDA_FUNCTION,
+            id(simulator.log): _LOGGER,
+        }
+
+    def persistent_id(self, obj):
+        external = self._external.get(id(obj))
+        if external is not None:
+            return external
+        if isinstance(obj, ComponentLogger):
+            return (_LOGGER, obj.name)
+        if isinstance(obj, EventTrace):
+            return _TRACE
+        if isinstance(obj, ColumnarStore):
+            return (_COLUMNAR, *self._checkpointer.write_segments(obj))
+        return None
+
+
+class _CheckpointUnpickler(pickle.Unpickler):
+    def __init__(self, file, config_module, lambda_function, checkpointer):
+        super().__init__(file)
+        self._config = config_module
+        self._lambda_function = lambda_function
+        self._checkpointer = checkpointer
+        self._stores = {}   # Un archivio referenziato più volte (es. da OutcomeLog) è un solo oggetto
+        self._log = None
+
+    def _logger(self):
+        # I messaggi e la traccia della parte ripresa vengono accodati agli stessi file
+        if self._log is None:
+            self._log = SimLogger.from_config(self._config)
+        return self._log
+
+    def persistent_load(self, pid):
+        if pid == _CONFIG:
+            return self._config
+        if pid == _LAMBDA_FUNCTION:
+            return self._lambda_function
+        if pid == _LOGGER:
+            return self._logger()
+        if pid == _TRACE:
+            return self._logger().trace
+        if isinstance(pid, tuple) and pid[0] == _LOGGER:
+            return self._logger().component(pid[1])
+        if isinstance(pid, tuple) and pid[0] == _COLUMNAR:
+            name = pid[1]
+            if name not in self._stores:
+                self._stores[name] = self._checkpointer.read_segments(*pid[1:])
+            return self._stores[name]
+        raise pickle.UnpicklingError(f"Riferimento esterno sconosciuto nel checkpoint: {pid!r}")
+
+
+class SimulationCheckpointer:
+    """
+    Salva periodicamente lo stato completo di un NativeSimulator in un unico file e
+    permette di riprendere la simulazione dall'ultimo salvataggio.
+
+    Il simulatore avanza a segmenti di 'interval' secondi simulati e dopo ogni
+    segmento lo stato viene scritto in modo atomico (file temporaneo + rename),
+    quindi un'interruzione durante il salvataggio lascia intatto il checkpoint
+    precedente. Poiché lo stato include anche i buffer dei campionamenti a blocchi,
+    una simulazione ripresa produce esattamente le stesse metriche di una eseguita
+    senza interruzioni.
+
+    Gli archivi colonnari delle metriche (la parte che cresce con la durata) sono
+    salvati come segmenti: un file binario per colonna nella cartella accanto al
+    checkpoint, a cui ogni salvataggio accoda solo le righe aggiunte dal precedente.
+    I segmenti sono scritti prima del pickle, che registra quante righe sono valide:
+    le righe accodate da un salvataggio interrotto vengono troncate alla ripresa.
+    """
+
+    def __init__(self, path, interval):
+        if interval <= 0:
+            raise ValueError(f"L'intervallo tra i checkpoint deve essere positivo, ricevuto {interval}")
+        self.path = Path(path)
+        self.segments_dir = self.path.with_suffix(".segments")
+        self.interval = interval
+        self._store_names = {}   # id(archivio) -> (nome del segmento, archivio)
+        self._written = {}       # nome del segmento -> righe già nei file
+        self._saved_now = set()  # Segmenti già aggiornati dal salvataggio in corso
+
+    def exists(self):
+        return self.path.exists()
+
+    def save(self, simulator):
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        self._saved_now = set()
+        tmp_path = self.path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "wb") as f:
+            _CheckpointPickler(f, simulator, self).dump(simulator)
+        os.replace(tmp_path, self.path)
+
+    def load(self, config_module, lambda_function):
+        """Ricostruisce il simulatore salvato; config e funzione lambda devono essere quelli del run originale."""
+        with open(self.path, "rb") as f:
+            return _CheckpointUnpickler(f, config_module, lambda_function, self).load()
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+        shutil.rmtree(self.segments_dir, ignore_errors=True)
+        self._store_names.clear()
+        self._written.clear()
+
+    def _segment_path(self, name, column):
+        return self.segments_dir / f"{name}.{column}.bin"
+
+    def write_segments(self, store):
+        """
+        Accoda ai file dell'archivio le righe non ancora salvate e restituisce quanto
+        serve a ricostruirlo: (nome, righe valide, colonne, chunk_size).
+        """
+        entry = self._store_names.get(id(store))
+        if entry is None:
+            entry = self._store_names[id(store)] = (f"store{len(self._store_names)}", store)
+        name = entry[0]
+        size = len(store)
+        if name not in self._saved_now:
+            self._saved_now.add(name)
+            written = self._written.get(name)
+            # Primo salvataggio di questo run: eventuali segmenti di un run precedente vengono sovrascritti
+            mode = "wb" if written is None else "ab"
+            start = written or 0
+            for column in store.dtypes:
+                with open(self._segment_path(name, column), mode) as f:
+                    store.column(column)[start:size].tofile(f)
+            self._written[name] = size
+        return name, size, store.dtypes, store.chunk_size
+
+    def read_segments(self, name, size, dtypes, chunk_size):
+        """Ricostruisce un archivio dalle prime 'size' righe dei suoi segmenti."""
+        arrays = []
+        for column, dtype in dtypes.items():
+            path = self._segment_path(name, column)
+            os.truncate(path, size * np.dtype(dtype).itemsize)
+            arrays.append(np.fromfile(path, dtype=dtype, count=size))
+        store = ColumnarStore.from_arrays(dtypes, arrays, chunk_size)
+        self._store_names[id(store)] = (name, store)
+        self._written[name] = size
+        return store
@@ -0,0 +1,60 @@
+# src/simulation/deadline_index.py - INDICE DELLE SCADENZE DELLE RICHIESTE
+
+import math
+from collections import deque
+from operator import itemgetter
+
+
+class DeadlineIndex:
+    """
+    Indice unico delle scadenze (arrival_time + timeout) delle richieste generate.
+
+    Sostituisce un processo timeout_watcher per ogni richiesta. Le richieste sono
+    divise in "corsie", una per valore di timeout: poiché gli arrivi sono in ordine
+    cronologico e il timeout è lo stesso per tutta la corsia, ogni corsia è già
+    ordinata per scadenza (inserimento O(1), come in una timer wheel) e la scadenza
+    più vicina è sempre in testa a una delle corsie.
+    """
+
+    def __init__(self):
+        self._lanes = {}    # timeout -> deque di tuple (scadenza, richiesta)
+        self.next_deadline = math.inf
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, request):
+        """Registra la scadenza di una richiesta appena generata."""
+        deadline = request.arrival_time + request.timeout
+        lane = self._lanes.get(request.timeout)
+        if lane is None:
+            lane = self._lanes[request.timeout] = deque()
+        lane.append((deadline, request))
+        self._size += 1
+        if deadline < self.next_deadline:
+            self.next_deadline = deadline
+
+    def pop_expired(self, now, inclusive=True):
+        """
+        Rimuove e restituisce, in ordine di scadenza, le tuple (scadenza, richiesta)
+        con scadenza <= now (oppure < now se inclusive=False).
+        """
+        expired = []
+        next_deadline = math.inf
+        # Un solo passaggio sulle corsie: si svuota la testa scaduta e si legge la nuova testa
+        for lane in self._lanes.values():
+            if inclusive:
+                while lane and lane[0][0] <= now:
+                    expired.append(lane.popleft())
+            else:
+                while lane and lane[0][0] < now:
+                    expired.append(lane.popleft())
+            if lane and lane[0][0] < next_deadline:
+                next_deadline = lane[0][0]
+
+        if len(expired) > 1:
+            expired.sort(key=itemgetter(0))
+        self._size -= len(expired)
+        self.next_deadline = next_deadline
+        return expired
@@ -0,0 +1,36 @@
+# src/simulation/engine.py - SELEZIONE DEL MOTORE DI SIMULAZIONE
+
+import importlib
+
+# Classe del simulatore ("modulo:Classe", si importa solo il motore scelto: SimPy non viene
+# caricato se si usa il motore nativo) e supporto dello scenario con priorità
+SIMULATOR_CLASSES = {
+    "simpy": ("src.simulation.simulator:Simulator", True),
+    "native": ("src.simulation.native_simulator:NativeSimulator", True),
+    "lindley": ("src.simulation.lindley_simulator:LindleySimulator", False),    # Solo baseline a numero di pod fisso
+}
+
+
+def _load_class(path):
+    module_name, class_name = path.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def get_simulator_class(config_module, with_priority=False):
+    """
+    Restituisce la classe del simulatore per il motore scelto in config.SIMULATION_ENGINE.
+    Tutte le classi hanno lo stesso costruttore e lo stesso metodo run(); lo scenario
+    è dato dalla disciplina di coda (vedi scenario_discipline) e dall'oggetto metriche.
+    """
+    engine = getattr(config_module, "SIMULATION_ENGINE", "simpy")
+    if engine not in SIMULATOR_CLASSES:
+        raise ValueError(f"Motore di simulazione '{engine}' non supportato. Valori ammessi: {list(SIMULATOR_CLASSES)}")
+    class_path, supports_priority = SIMULATOR_CLASSES[engine]
+    if with_priority and not supports_priority:
+        raise ValueError(f"Il motore '{engine}' non supporta lo scheduling a priorità")
+    return _load_class(class_path)
+
+
+def scenario_discipline(config_module, with_priority=False):
+    """Disciplina di coda dello scenario: FIFO per la baseline, QUEUE_DISCIPLINE con priorità."""
+    return config_module.QUEUE_DISCIPLINE if with_priority else "fifo"
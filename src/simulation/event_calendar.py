@@ -0,0 +1,105 @@
+# src/simulation/event_calendar.py - CALENDARIO DEGLI EVENTI PER IL MOTORE NATIVO
+
+import heapq
+from collections import deque
+from enum import IntEnum
+from itertools import count
+
+# Priorità degli eventi allo stesso istante, con la stessa semantica di SimPy:
+# gli eventi URGENT vengono processati prima degli eventi NORMAL.
+URGENT = 0
+NORMAL = 1
+
+
+class EventType(IntEnum):
+    """
+    Tipi di evento gestiti dal motore nativo.
+    Ogni tipo corrisponde a un punto di ripresa di un processo del modello SimPy.
+    """
+    GENERATOR_WAKEUP = 0    # Il generatore rivaluta il tasso di arrivo (tasso <= 0)
+    ARRIVAL = 1             # Arrivo di una nuova richiesta
+    PUT_PROCESSED = 2       # L'inserimento in coda viene processato (assegna la richiesta a un pod in attesa)
+    GET_PROCESSED = 3       # Un pod riceve la richiesta prelevata dalla coda
+    SERVICE_COMPLETED = 4   # Un pod termina il servizio di una richiesta
+    METRICS_SAMPLE = 5      # Campionamento periodico delle metriche di sistema
+    HPA_SYNC = 6            # Ciclo di controllo periodico dell'HPA
+
+
+class EventCalendar:
+    """
+    Calendario degli eventi basato su un heap binario.
+
+    Ogni voce è una tupla (tempo, priorità, sequenza, tipo, payload): l'ordinamento
+    è identico a quello di simpy.Environment (tempo, poi priorità, poi ordine di
+    schedulazione), ma senza oggetti Event, callback o frame di generatori.
+    Espone 'now' come l'Environment di SimPy, così HPA e metriche restano invariati.
+
+    Gli eventi a ritardo nullo e priorità NORMAL (put e get della coda, due per
+    richiesta) non passano dall'heap: sono accodati in una deque FIFO con un numero
+    di sequenza dello stesso contatore. Hanno tutti tempo 'now' e sequenza crescente,
+    quindi la deque è già ordinata e run() li alterna agli eventi dell'heap con lo
+    stesso confronto di tuple: l'ordine di esecuzione non cambia.
+    """
+
+    def __init__(self, initial_time=0.0):
+        self.now = initial_time
+        self._queue = []
+        self._immediate = deque()   # Eventi (now, NORMAL, sequenza, tipo, payload) in ordine
+        self._eid = count()
+
+    def __getstate__(self):
+        # Un itertools.count non è serializzabile: si salva il prossimo numero di sequenza
+        state = self.__dict__.copy()
+        next_eid = next(self._eid)
+        self._eid = count(next_eid)
+        state["_eid"] = next_eid
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._eid = count(state["_eid"])
+
+    def schedule(self, delay, event_type, payload=None, priority=NORMAL):
+        """Schedula un evento dopo 'delay' secondi dall'istante corrente."""
+        heapq.heappush(self._queue, (self.now + delay, priority, next(self._eid), event_type, payload))
+
+    def schedule_now(self, event_type, payload=None):
+        """Equivale a schedule(0, event_type, payload), senza inserimento nell'heap."""
+        self._immediate.append((self.now, NORMAL, next(self._eid), event_type, payload))
+
+    def peek(self):
+        """Restituisce il tempo del prossimo evento, o infinito se il calendario è vuoto."""
+        if self._immediate:
+            return self.now
+        return self._queue[0][0] if self._queue else float('inf')
+
+    def __len__(self):
+        return len(self._queue) + len(self._immediate)
+
+    def run(self, until, handlers):
+        """
+        Processa gli eventi in ordine fino all'istante 'until' (escluso), come
+        env.run(until=...) di SimPy: gli eventi schedulati esattamente a 'until'
+        restano nel calendario. 'handlers' è una sequenza indicizzata per EventType.
+        """
+        if until <= self.now:
+            raise ValueError(f"until ({until}) deve essere maggiore del tempo corrente ({self.now})")
+
+        queue = self._queue
+        immediate = self._immediate
+        heappop = heapq.heappop
+        popleft = immediate.popleft
+        while True:
+            if immediate:
+                # Un evento dell'heap precede solo se è allo stesso istante, URGENT o schedulato prima
+                if queue and queue[0] < immediate[0]:
+                    event_time, _, _, event_type, payload = heappop(queue)
+                else:
+                    event_time, _, _, event_type, payload = popleft()
+            elif queue and queue[0][0] < until:
+                event_time, _, _, event_type, payload = heappop(queue)
+            else:
+                break
+            self.now = event_time
+            handlers[event_type](payload)
+        self.now = until
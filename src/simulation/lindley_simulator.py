@@ -0,0 +1,266 @@
+# src/simulation/lindley_simulator.py - PERCORSO VELOCE A CAPACITÀ FISSA (RICORSIONE DI KIEFER-WOLFOWITZ)
+
+import heapq
+
+import numpy as np
+
+from src.service.service import PodService
+from src.service.traffic_profiler import DynamicTrafficProfiler
+from src.utils.columnar_store import REQ_TYPE_CODES
+from src.utils.time_averages import system_sample_interval
+from src.utils.variate_streams import ChoiceStream, ExponentialStream
+
+
+class LindleySimulator:
+    """
+    Valuta la baseline (FIFO) a numero di pod fisso come coda G/G/c con abbandono,
+    tramite la ricorsione di Kiefer-Wolfowitz (Lindley a più server), senza eventi.
+
+    Con c pod fissi e disciplina FIFO, la richiesta n inizia il servizio all'istante
+    max(a_n, primo pod libero) e questo dipende solo dalle richieste precedenti: basta
+    un heap dei c istanti di liberazione dei pod. Se la scadenza a_n + timeout non è
+    successiva all'inizio, la richiesta va in timeout e non occupa alcun pod (nel
+    Simulator viene scartata a costo zero da chi la preleva).
+
+    Il profiler di traffico legge i timeout già avvenuti all'arrivo di ogni richiesta.
+    Finché le sorgenti del funnel non vanno in timeout il profilo non cambia e, a tasso
+    costante, arrivi, tipi e tempi di servizio vengono campionati in blocco (_run_static);
+    altrimenti la scelta del tipo resta sequenziale e i timeout vengono registrati in
+    ordine di scadenza prima di ogni arrivo, come nel motore ad eventi. Con gli stessi seed,
+    config e HPA disabilitato le metriche coincidono con quelle del Simulator.
+    Gli integrali di coda e pod occupati e la lunghezza della coda campionata per i
+    grafici sono calcolati in blocco con NumPy.
+
+    Costruttore e run() hanno la stessa interfaccia del Simulator; il log per evento
+    e i record per richiesta (REQUEST_RECORDS_ENABLED) non sono disponibili.
+    """
+
+    def __init__(self, config_module, metrics, arrival_rng, choice_rng, service_rng, lambda_function,
+                 queue_discipline="fifo"):
+        if queue_discipline != "fifo":
+            raise ValueError(f"LindleySimulator supporta solo la disciplina 'fifo', ricevuta '{queue_discipline}'")
+        pods_pinned = config_module.MIN_PODS == config_module.MAX_PODS == config_module.INITIAL_PODS
+        if config_module.HPA_ENABLED and not pods_pinned:
+            raise ValueError("LindleySimulator richiede un numero di pod fisso: HPA_ENABLED = False "
+                             "oppure MIN_PODS == MAX_PODS == INITIAL_PODS")
+
+        self.config = config_module
+        self.metrics = metrics
+        self.lambda_function = lambda_function
+        self.arrival_stream = ExponentialStream(arrival_rng, config_module.VARIATE_BLOCK_SIZE)
+        self.choice_stream = ChoiceStream(choice_rng, config_module.VARIATE_BLOCK_SIZE)
+        self.service = PodService(service_rng, config_module)
+        self.traffic_profiler = DynamicTrafficProfiler(metrics, config_module)
+        # Codice, timeout e campionatore del servizio per indice di tipo (ordine delle tabelle del profiler)
+        self._type_table = [(REQ_TYPE_CODES[req_type], config_module.REQUEST_TIMEOUTS[req_type],
+                             self.service.sampler(req_type))
+                            for req_type in self.traffic_profiler.req_types]
+        self.num_pods = config_module.INITIAL_PODS
+        self.sample_interval = system_sample_interval(config_module)
+
+    def run(self, simulation_duration: float):
+        print("--- Avvio Simulatore (Baseline - FIFO, ricorsione di Kiefer-Wolfowitz) ---")
+        outcome = self._run_static(simulation_duration)
+        if outcome is None:
+            outcome = self._run_sequential(simulation_duration)
+        arrival_times, leave_queue_times, busy_time = outcome
+        self._record_time_averages(simulation_duration, arrival_times, leave_queue_times, busy_time)
+        self._record_system_metrics(simulation_duration, arrival_times, leave_queue_times)
+        print("--- Simulazione Baseline Terminata ---")
+
+    def _run_static(self, simulation_duration):
+        """
+        Percorso vettoriale, valido quando il tasso di arrivo è costante e il profilo di
+        traffico non cambia: inter-arrivi, tipi e tempi di servizio sono campionati in
+        blocco con NumPy dagli stessi stream e nel ciclo resta solo l'heap dei pod.
+
+        Il profilo resta quello iniziale finché nessuna sorgente del funnel va in timeout,
+        cosa che si sa solo durante la ricorsione: se una sua scadenza cade entro l'ultimo
+        arrivo (o se il tasso non è costante) gli stream vengono riportati allo stato
+        iniziale e restituisce None, e la simulazione si ripete con _run_sequential.
+        """
+        rate = self.lambda_function(0.0)
+        if rate <= 0:
+            return None
+        arrival_times, exponentials = self._draw_arrival_times(1.0 / rate, simulation_duration)
+        if any(self.lambda_function(t) != rate for t in arrival_times.tolist()):
+            self.arrival_stream.unread(exponentials)
+            return None
+
+        profiler = self.traffic_profiler
+        uniforms = self.choice_stream.take(len(arrival_times))
+        _, cdf = profiler.full_health_table()
+        type_indices = np.searchsorted(np.asarray(cdf), uniforms, side='right')
+        service_times = self.service.service_times(profiler.req_types, type_indices)
+        type_codes = np.array([code for code, _, _ in self._type_table], dtype=np.int64)[type_indices]
+        deadlines = arrival_times + np.array([timeout for _, timeout, _ in self._type_table],
+                                             dtype=float)[type_indices]
+
+        starts = self._start_times(arrival_times.tolist(), deadlines.tolist(), service_times.tolist(),
+                                   np.isin(type_codes, profiler.health_source_codes).tolist())
+        if starts is None:
+            self.service.undo_service_times()
+            self.choice_stream.unread(uniforms)
+            self.arrival_stream.unread(exponentials)
+            return None
+        served = deadlines > starts
+
+        metrics = self.metrics
+        for timestamp, type_code in zip(arrival_times.tolist(), type_codes.tolist()):
+            metrics.record_request_generation(timestamp, type_code)
+
+        # Timeout scaduti prima della fine, in ordine di scadenza (a pari scadenza, di arrivo)
+        timed_out = np.flatnonzero(~served & (deadlines < simulation_duration))
+        timed_out = timed_out[np.argsort(deadlines[timed_out], kind='stable')]
+        for deadline, type_code in zip(deadlines[timed_out].tolist(), type_codes[timed_out].tolist()):
+            metrics.record_timeout(deadline, type_code)
+
+        completion_times = starts + service_times
+        completed = np.flatnonzero(served & (completion_times < simulation_duration))
+        completed = completed[np.argsort(completion_times[completed], kind='stable')]
+        for completion_time, type_code, response_time, wait_time in zip(
+                completion_times[completed].tolist(), type_codes[completed].tolist(),
+                (completion_times - arrival_times)[completed].tolist(), (starts - arrival_times)[completed].tolist()):
+            metrics.record_request_metrics(completion_time, type_code, None, response_time, wait_time)
+
+        busy = served & (starts < simulation_duration)
+        busy_intervals = np.minimum(completion_times[busy], simulation_duration) - starts[busy]
+        # Somma cumulativa: stesso ordine di accumulo (e stesso arrotondamento) del ciclo sequenziale
+        busy_time = float(np.cumsum(busy_intervals)[-1]) if len(busy_intervals) else 0.0
+        leave_queue_times = np.where(served, starts, deadlines) if self.config.EVICT_EXPIRED_REQUESTS else starts
+        return arrival_times, leave_queue_times, busy_time
+
+    def _draw_arrival_times(self, scale, simulation_duration):
+        """
+        Istanti di arrivo prima della fine a tasso costante (scale = 1 / tasso), accumulati
+        nello stesso ordine del ciclo sequenziale, e le esponenziali prelevate dallo stream.
+        """
+        chunks = []
+        exponentials = []
+        now = 0.0
+        block = int(simulation_duration / scale * 1.05) + 64
+        while True:
+            drawn = self.arrival_stream.take(block)
+            exponentials.append(drawn)
+            times = np.cumsum(np.concatenate(([now], scale * drawn)))[1:]
+            end = int(np.searchsorted(times, simulation_duration, side='left'))
+            chunks.append(times[:end])
+            if end < len(times):
+                return np.concatenate(chunks), np.concatenate(exponentials)
+            now = float(times[-1])
+            block = block // 4 + 64
+
+    def _start_times(self, arrival_times, deadlines, service_times, is_health_source):
+        """
+        Ricorsione di Kiefer-Wolfowitz: inizio del servizio (o dell'abbandono) di ogni
+        richiesta. Restituisce None appena una sorgente del funnel va in timeout entro
+        l'ultimo arrivo, cioè quando il profilo di traffico non sarebbe più quello iniziale.
+        """
+        heapreplace = heapq.heapreplace
+        last_arrival = arrival_times[-1] if arrival_times else 0.0
+        pod_free_at = [0.0] * self.num_pods     # Heap degli istanti in cui i pod si liberano
+        starts = []
+        append = starts.append
+        for now, deadline, service_time, source in zip(arrival_times, deadlines, service_times, is_health_source):
+            first_free = pod_free_at[0]
+            start = first_free if first_free > now else now
+            append(start)
+            if deadline > start:
+                heapreplace(pod_free_at, start + service_time)
+            elif source and deadline <= last_arrival:
+                return None
+        return np.array(starts)
+
+    def _run_sequential(self, simulation_duration):
+        """Ciclo per arrivo: il profilo di traffico viene riletto a ogni richiesta."""
+        metrics = self.metrics
+        type_table = self._type_table
+        evict_expired = self.config.EVICT_EXPIRED_REQUESTS
+        heappush, heappop, heapreplace = heapq.heappush, heapq.heappop, heapq.heapreplace
+        pod_free_at = [0.0] * self.num_pods     # Heap degli istanti in cui i pod si liberano
+        pending_timeouts = []                   # Heap di (scadenza, sequenza, codice del tipo) non ancora registrati
+        arrival_times = []
+        leave_queue_times = []                  # Istante in cui ogni richiesta esce dalla coda
+        completions = []                        # (completamento, codice del tipo, risposta, attesa)
+        busy_time = 0.0                         # Area sotto la curva dei pod occupati
+
+        now = 0.0
+        seq = 0
+        while True:
+            # Stessa sequenza di request_generator: tasso nullo -> riprova dopo 1 secondo
+            current_arrival_rate = self.lambda_function(now)
+            if current_arrival_rate <= 0:
+                now = now + 1
+                if now >= simulation_duration:
+                    break
+                continue
+            now = now + self.arrival_stream.exponential(1.0 / current_arrival_rate)
+            if now >= simulation_duration:
+                break
+
+            # Il profiler deve vedere tutti i timeout con scadenza <= now
+            while pending_timeouts and pending_timeouts[0][0] <= now:
+                deadline, _, timed_out_type = heappop(pending_timeouts)
+                metrics.record_timeout(deadline, timed_out_type)
+
+            _, cdf = self.traffic_profiler.get_cumulative_table()
+            type_code, type_timeout, sample_service_time = type_table[self.choice_stream.index_from_table(cdf)]
+            service_time = sample_service_time()
+            metrics.record_request_generation(now, type_code)
+
+            # --- RICORSIONE DI KIEFER-WOLFOWITZ ---
+            first_free = pod_free_at[0]
+            start = first_free if first_free > now else now
+            deadline = now + type_timeout
+            arrival_times.append(now)
+            if deadline <= start:
+                # Abbandono: nessun pod viene occupato
+                seq += 1
+                heappush(pending_timeouts, (deadline, seq, type_code))
+                leave_queue_times.append(deadline if evict_expired else start)
+            else:
+                completion_time = start + service_time
+                heapreplace(pod_free_at, completion_time)
+                leave_queue_times.append(start)
+                if start < simulation_duration:
+                    busy_time += min(completion_time, simulation_duration) - start
+                if completion_time < simulation_duration:
+                    completions.append((completion_time, type_code, completion_time - now, start - now))
+
+        # Timeout scaduti prima della fine della simulazione
+        while pending_timeouts and pending_timeouts[0][0] < simulation_duration:
+            deadline, _, timed_out_type = heappop(pending_timeouts)
+            metrics.record_timeout(deadline, timed_out_type)
+
+        # Le richieste completate vengono registrate in ordine di completamento, come nel Simulator
+        completions.sort(key=lambda c: c[0])
+        for completion_time, type_code, response_time, wait_time in completions:
+            metrics.record_request_metrics(completion_time, type_code, None, response_time, wait_time)
+
+        return arrival_times, leave_queue_times, busy_time
+
+    def _record_time_averages(self, simulation_duration, arrival_times, leave_queue_times, busy_time):
+        """
+        Integrali esatti come quelli aggiornati dal motore ad eventi: ogni richiesta resta
+        in coda da a_n fino all'uscita dalla coda (troncata alla fine della simulazione).
+        """
+        time_averages = self.metrics.time_averages
+        queue_time = np.minimum(np.asarray(leave_queue_times), simulation_duration).sum() - np.sum(arrival_times)
+        time_averages.queue.add_area(float(queue_time))
+        time_averages.busy.add_area(busy_time)
+        time_averages.pods.update(0.0, self.num_pods)
+        time_averages.close(simulation_duration)
+
+    def _record_system_metrics(self, simulation_duration, arrival_times, leave_queue_times):
+        """
+        Campioni ogni SYSTEM_SAMPLE_INTERVAL secondi come il metrics_recorder: in coda ci
+        sono le richieste arrivate e non ancora uscite dalla coda (comprese quelle
+        scadute, a meno di EVICT_EXPIRED_REQUESTS).
+        """
+        sample_times = np.arange(0, simulation_duration, self.sample_interval)
+        arrivals = np.asarray(arrival_times)
+        leaves = np.sort(np.asarray(leave_queue_times))
+        queue_lengths = (np.searchsorted(arrivals, sample_times, side='right')
+                         - np.searchsorted(leaves, sample_times, side='right'))
+        for timestamp, queue_length in zip(sample_times.tolist(), queue_lengths.tolist()):
+            self.metrics.record_system_metrics(float(timestamp), self.num_pods, queue_length)
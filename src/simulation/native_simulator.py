@@ -0,0 +1,390 @@
+# src/simulation/native_simulator.py - MOTORE NATIVO A HEAP (ALTERNATIVA A SIMPY)
+
+from collections import deque
+
+from src.model.request import PriorityRequest
+from src.controller.hpa import HPA
+from src.service.service import PodService
+from src.service.traffic_profiler import DynamicTrafficProfiler
+from src.simulation.deadline_index import DeadlineIndex
+from src.simulation.event_calendar import EventCalendar, EventType
+from src.simulation.queue_disciplines import make_queue_discipline
+from src.simulation.queue_occupancy import QueueOccupancy
+from src.utils.columnar_store import REQ_TYPE_CODES
+from src.utils.request_records import RequestRecordSink
+from src.utils.sim_logger import SimLogger, TraceEvent
+from src.utils.time_averages import system_sample_interval
+from src.utils.variate_streams import ChoiceStream, ExponentialStream
+
+
+class NativeSimulator:
+    """
+    Versione del Simulator eseguita su un calendario di eventi tipizzati invece che
+    su processi SimPy; come il Simulator è costruito da una disciplina di coda e da
+    un oggetto metriche (baseline o con priorità).
+
+    Ogni processo del modello SimPy (generatore, pod, recorder, HPA) è
+    tradotto nei suoi punti di ripresa: l'ordine degli eventi, le chiamate agli RNG
+    e le chiamate alle metriche sono gli stessi, quindi a parità di seed le
+    metriche prodotte sono identiche a quelle del Simulator.
+    """
+
+    class _Pod:
+        def __init__(self, pod_id):
+            self.id = pod_id
+            # Un pod rimosso non riprende più: le sue richieste pendenti vanno perse,
+            # come accade con l'interrupt del processo SimPy.
+            self.is_alive = True
+            self.in_service = False     # Sta servendo una richiesta (pod occupato)
+
+    class _RequestQueue:
+        """Stato della coda, con gli stessi attributi di simpy.Store letti dall'HPA."""
+        def __init__(self, items):
+            self.items = items          # Richieste in attesa (disciplina di coda)
+            self.get_queue = deque()    # Pod in attesa di una richiesta
+            self.occupancy = QueueOccupancy()   # Richieste in coda per priorità e tipo
+
+    def __init__(self, config_module, metrics, arrival_rng, choice_rng, service_rng, lambda_function,
+                 queue_discipline="fifo"):
+        self.config = config_module
+        self.metrics = metrics
+        self.queue_discipline = queue_discipline
+        self.env = EventCalendar()
+        self.arrival_rng = arrival_rng
+        self.choice_rng = choice_rng
+        # Inter-arrivi e scelta del tipo estratti a blocchi, stessa sequenza delle chiamate singole
+        self.arrival_stream = ExponentialStream(arrival_rng, config_module.VARIATE_BLOCK_SIZE)
+        self.choice_stream = ChoiceStream(choice_rng, config_module.VARIATE_BLOCK_SIZE)
+        self.lambda_function = lambda_function
+        self.service = PodService(service_rng, config_module)
+        self.traffic_profiler = DynamicTrafficProfiler(metrics, config_module)
+        # Tipo, codice, priorità, timeout e campionatore del servizio per indice di tipo (ordine
+        # delle tabelle del profiler): a ogni arrivo basta un accesso per indice
+        self._type_table = [(req_type, REQ_TYPE_CODES[req_type], config_module.REQUEST_TYPE_TO_PRIORITY[req_type],
+                             config_module.REQUEST_TIMEOUTS[req_type], self.service.sampler(req_type))
+                            for req_type in self.traffic_profiler.req_types]
+        self.request_queue = self._RequestQueue(make_queue_discipline(queue_discipline, config_module))
+        self.time_averages = metrics.time_averages  # Integrali esatti di coda e pod
+        self.sample_interval = system_sample_interval(config_module)
+        self.active_pods = []
+        self.next_pod_id = 0
+        self.available_pod_ids = set()
+        self.req_id_counter = 0
+        self.hpa = None
+        self.deadline_index = DeadlineIndex()
+        self.log = SimLogger.from_config(config_module)
+        self.trace = self.log.trace
+        self.records = RequestRecordSink.from_config(config_module, metrics.SCENARIO)
+        self._log_generator = self.log.component("generator")
+        self._log_pod = self.log.component("pod")
+        self._log_watcher = self.log.component("watcher")
+        self._log_simulator = self.log.component("simulator")
+
+        self.started = False
+        self._handlers = self._build_handlers()
+
+    def _build_handlers(self):
+        """Tabella di dispatch indicizzata per EventType."""
+        handlers = [None] * len(EventType)
+        handlers[EventType.GENERATOR_WAKEUP] = self._on_generator_wakeup
+        handlers[EventType.ARRIVAL] = self._on_arrival
+        handlers[EventType.PUT_PROCESSED] = self._on_put_processed
+        handlers[EventType.GET_PROCESSED] = self._on_get_processed
+        handlers[EventType.SERVICE_COMPLETED] = self._on_service_completed
+        handlers[EventType.METRICS_SAMPLE] = self._on_metrics_sample
+        handlers[EventType.HPA_SYNC] = self._on_hpa_sync
+        return handlers
+
+    # --- CHECKPOINT (vedi src/simulation/checkpoint.py) ---
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_handlers"]   # Metodi legati all'istanza: vengono ricostruiti alla ripresa
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._handlers = self._build_handlers()
+
+    # --- GENERATORE DI RICHIESTE ---
+    def _schedule_next_arrival(self):
+        """Equivalente a un'iterazione del ciclo di request_generator fino al prossimo yield."""
+        current_arrival_rate = self.lambda_function(self.env.now)
+        if current_arrival_rate <= 0:
+            self.env.schedule(1, EventType.GENERATOR_WAKEUP)
+            return
+
+        time_to_next = self.arrival_stream.exponential(1.0 / current_arrival_rate)
+        self.env.schedule(time_to_next, EventType.ARRIVAL)
+
+    def _on_generator_wakeup(self, _):
+        self._schedule_next_arrival()
+
+    def _on_arrival(self, _):
+        now = self.env.now
+        # Il profiler legge i contatori dei timeout: vanno aggiornati fino all'istante corrente
+        if self.deadline_index.next_deadline <= now:
+            self.expire_timed_out_requests()
+        _, cdf = self.traffic_profiler.get_cumulative_table()
+        chosen_type, type_code, assigned_priority, type_timeout, sample_service_time = \
+            self._type_table[self.choice_stream.index_from_table(cdf)]
+
+        # Il tempo di servizio viene cristallizzato alla generazione, come nel Simulator
+        service_time = sample_service_time()
+        self.req_id_counter += 1
+
+        new_request = PriorityRequest(
+            request_id=self.req_id_counter,
+            req_type=chosen_type,
+            arrival_time=now,
+            priority=assigned_priority,
+            service_time=service_time,
+            timeout=type_timeout,
+            type_code=type_code
+        )
+        self.metrics.record_request_generation(now, type_code, assigned_priority)
+
+        if self._log_generator.is_debug:
+            self._log_generator.emit(f"{now:.2f} [Generator]: Richiesta {new_request.request_id} ({new_request.req_type.name} -> Priorità: {new_request.priority.name}) generata.")
+        if self.trace is not None:
+            self.trace.record(now, TraceEvent.GENERATED, new_request.request_id, value=chosen_type.value)
+
+        self.deadline_index.add(new_request)
+        self._put(new_request)
+
+    # --- CODA (semantica di simpy.Store, disciplina configurabile) ---
+    # Gli eventi di put e get processati hanno ritardo nullo: passano da schedule_now
+    @property
+    def queue_occupancy(self):
+        return self.request_queue.occupancy
+
+    def _put(self, request):
+        request_queue = self.request_queue
+        request_queue.items.put(request)
+        occupancy = request_queue.occupancy
+        occupancy.add(request)
+        self.time_averages.queue.update(self.env.now, occupancy.total)
+        self.env.schedule_now(EventType.PUT_PROCESSED)
+
+    def _trigger_get(self):
+        """Come Store._trigger_get: serve al più il primo pod in attesa."""
+        request_queue = self.request_queue
+        if request_queue.get_queue and request_queue.items:
+            env = self.env
+            pod = request_queue.get_queue.popleft()
+            request = request_queue.items.get(env.now)
+            occupancy = request_queue.occupancy
+            occupancy.remove(request)
+            env.schedule_now(EventType.GET_PROCESSED, (pod, request))
+            self.time_averages.queue.update(env.now, occupancy.total)
+
+    def _request_next(self, pod):
+        """Equivalente a 'yield self.request_queue.get()' nel pod_worker."""
+        self.request_queue.get_queue.append(pod)
+        self._trigger_get()
+
+    def _on_put_processed(self, _):
+        self._trigger_get()
+        # Il generatore fa 'yield put': riprende solo dopo che il put è stato processato
+        self._schedule_next_arrival()
+
+    # --- POD ---
+    def _start_pod(self, pod):
+        if self._log_pod.is_info:
+            self._log_pod.emit(f"{self.env.now:.2f} [Pod {pod.id}]: Avviato.")
+        if self.trace is not None:
+            self.trace.record(self.env.now, TraceEvent.POD_START, pod_id=pod.id)
+        self._request_next(pod)
+
+    def _on_get_processed(self, payload):
+        pod, request = payload
+        if not pod.is_alive:
+            return
+
+        now = self.env.now
+        if self.deadline_index.next_deadline <= now:
+            self.expire_timed_out_requests()
+        request.is_serviced = True
+
+        if request.timed_out:
+            self._discard_expired(pod, request)
+            return
+
+        wait_time = now - request.arrival_time
+        if self._log_pod.is_debug:
+            self._log_pod.emit(f"{now:.2f} [Pod {pod.id}]: Inizio processamento rich. {request.request_id} (Priorità: {request.priority.name}). Attesa: {wait_time:.4f}s")
+        if self.trace is not None:
+            self.trace.record(now, TraceEvent.SERVICE_START, request.request_id, pod.id, wait_time)
+
+        pod.in_service = True
+        busy = self.time_averages.busy
+        busy.update(now, busy.value + 1)
+        self.env.schedule(request.service_time, EventType.SERVICE_COMPLETED, (pod, request, wait_time))
+
+    def _set_in_service(self, pod, in_service):
+        pod.in_service = in_service
+        busy = self.time_averages.busy
+        busy.update(self.env.now, busy.value + (1 if in_service else -1))
+
+    def _discard_expired(self, pod, request):
+        if self._log_pod.is_debug:
+            self._log_pod.emit(f"{self.env.now:.2f} [Pod {pod.id}]: Scartata richiesta {request.request_id} perché già scaduta.")
+        if self.trace is not None:
+            self.trace.record(self.env.now, TraceEvent.DISCARDED, request.request_id, pod.id)
+        self._request_next(pod)
+
+    def _on_service_completed(self, payload):
+        pod, request, wait_time = payload
+        if not pod.is_alive:
+            return
+
+        completion_time = self.env.now
+        pod.in_service = False
+        busy = self.time_averages.busy
+        busy.update(completion_time, busy.value - 1)
+        response_time = completion_time - request.arrival_time
+        if self.deadline_index.next_deadline <= completion_time:
+            self.expire_timed_out_requests()
+        if self._log_pod.is_debug:
+            self._log_pod.emit(f"{completion_time:.2f} [Pod {pod.id}]: Fine processamento rich. {request.request_id}. Tempo di risposta: {response_time:.4f}s")
+        if self.trace is not None:
+            self.trace.record(completion_time, TraceEvent.SERVICE_END, request.request_id, pod.id, response_time)
+
+        self.metrics.record_request_metrics(completion_time, request.type_code, request.priority,
+                                            response_time, wait_time)
+        if self.records is not None:
+            self.records.record_completion(request, request.arrival_time + wait_time, completion_time, pod.id)
+        self.request_queue.get_queue.append(pod)
+        self._trigger_get()
+
+    # --- TIMEOUT ---
+    def expire_timed_out_requests(self, inclusive=True):
+        """
+        Registra i timeout di tutte le richieste scadute fino all'istante corrente,
+        ciascuno con la sua scadenza esatta (equivalente dei timeout_watcher).
+        I gestori chiamati per ogni richiesta controllano prima next_deadline, così nel
+        caso comune (nessuna scadenza passata) non pagano la chiamata.
+        """
+        if self.deadline_index.next_deadline > self.env.now:
+            return
+        any_expired = False
+        for deadline, request in self.deadline_index.pop_expired(self.env.now, inclusive):
+            if not request.is_serviced:
+                request.timed_out = True
+                any_expired = True
+                self.metrics.record_timeout(deadline, request.type_code, request.priority)
+                if self._log_watcher.is_debug:
+                    self._log_watcher.emit(f"{deadline:.2f} [Watcher]: Richiesta {request.request_id} TIMED OUT in coda.")
+                if self.trace is not None:
+                    self.trace.record(deadline, TraceEvent.TIMEOUT, request.request_id)
+                if self.records is not None:
+                    self.records.record_timeout(request, deadline)
+        if any_expired and self.config.EVICT_EXPIRED_REQUESTS:
+            occupancy = self.request_queue.occupancy
+            removed = self.request_queue.items.evict_timed_out()
+            for request in removed:
+                occupancy.remove(request)
+            self.time_averages.record_eviction(self.env.now, occupancy.total, removed)
+
+    # --- METRICHE DI SISTEMA E HPA ---
+    def _on_metrics_sample(self, _):
+        self.expire_timed_out_requests()
+        occupancy = self.request_queue.occupancy
+        pod_count = len(self.active_pods)
+        self.metrics.record_system_metrics(self.env.now, pod_count, occupancy.total, occupancy.priority_lengths())
+        self.env.schedule(self.sample_interval, EventType.METRICS_SAMPLE)
+
+    def _on_hpa_sync(self, _):
+        self.hpa.reconcile()
+        self.env.schedule(self.config.HPA_SYNC_PERIOD, EventType.HPA_SYNC)
+
+    def get_busy_pods_count(self):
+        num_pods_waiting_for_request = len(self.request_queue.get_queue)
+        num_active_pods = len(self.active_pods)
+        return max(0, num_active_pods - num_pods_waiting_for_request)
+
+    def scale_to(self, desired_replicas):
+        current_replicas = len(self.active_pods)
+        if desired_replicas > current_replicas:
+            num_to_add = desired_replicas - current_replicas
+            if self._log_simulator.is_info:
+                self._log_simulator.emit(f"{self.env.now:.2f} [Simulator]: Aggiungo {num_to_add} Pods...")
+            new_pods = []
+            # Si riusa l'id libero più piccolo: l'ordine di set.pop() non sopravvive a un checkpoint
+            for _ in range(num_to_add):
+                if self.available_pod_ids: pod_id = min(self.available_pod_ids); self.available_pod_ids.remove(pod_id)
+                else: pod_id = self.next_pod_id; self.next_pod_id += 1
+                pod = self._Pod(pod_id)
+                self.active_pods.append(pod)
+                new_pods.append(pod)
+            self.time_averages.pods.update(self.env.now, len(self.active_pods))
+            # L'avvio dei processi SimPy è URGENT: avviene prima di ogni altro evento dello stesso istante
+            for pod in new_pods:
+                self._start_pod(pod)
+        elif desired_replicas < current_replicas:
+            num_to_remove = current_replicas - desired_replicas
+            if self._log_simulator.is_info:
+                self._log_simulator.emit(f"{self.env.now:.2f} [Simulator]: Rimuovo {num_to_remove} Pods...")
+            pods_to_remove = self.active_pods[-num_to_remove:]
+            for pod in pods_to_remove:
+                pod.is_alive = False
+                self.available_pod_ids.add(pod.id)
+                if pod.in_service:
+                    # La richiesta in servizio va persa con il pod
+                    self._set_in_service(pod, False)
+            self.active_pods = self.active_pods[:-num_to_remove]
+            self.time_averages.pods.update(self.env.now, len(self.active_pods))
+            for pod in pods_to_remove:
+                if self._log_pod.is_info:
+                    self._log_pod.emit(f"{self.env.now:.2f} [Pod {pod.id}]: Ricevuto segnale di stop, terminazione.")
+                if self.trace is not None:
+                    self.trace.record(self.env.now, TraceEvent.POD_STOP, pod_id=pod.id)
+
+    def run(self, simulation_duration: float, checkpointer=None):
+        """
+        Esegue la simulazione fino a simulation_duration. Con un SimulationCheckpointer
+        lo stato viene salvato periodicamente; un simulatore ricaricato da checkpoint
+        riprende dall'istante in cui era stato salvato.
+        """
+        print(f"--- Avvio Simulatore ({self.metrics.SCENARIO}, coda {self.queue_discipline}, motore nativo) ---")
+        self.advance(simulation_duration, checkpointer)
+        self.finish()
+        print(f"--- Simulazione {self.metrics.SCENARIO} Terminata ---")
+
+    def advance(self, until, checkpointer=None):
+        """
+        Esegue la simulazione fino all'istante 'until' (escluso), avviandola se necessario.
+        Può essere chiamato più volte con istanti crescenti: dividere il run in segmenti
+        non cambia l'ordine degli eventi.
+        """
+        if not self.started:
+            self.start()
+
+        if checkpointer is None:
+            self.env.run(until=until, handlers=self._handlers)
+        else:
+            while self.env.now < until:
+                segment_end = min(self.env.now + checkpointer.interval, until)
+                self.env.run(until=segment_end, handlers=self._handlers)
+                if segment_end < until:
+                    checkpointer.save(self)
+
+    def finish(self):
+        """Chiude la simulazione all'istante corrente."""
+        # Le scadenze precedenti la fine della simulazione non ancora registrate
+        self.expire_timed_out_requests(inclusive=False)
+        self.time_averages.close(self.env.now)
+        if self.records is not None:
+            self.records.close()
+        self.log.close()
+
+    def start(self):
+        """Prepara lo stato iniziale nello stesso ordine dei processi avviati da Simulator.start()."""
+        self.started = True
+        if self.trace is not None:
+            self.trace.record(self.env.now, TraceEvent.RUN_START)
+        self.scale_to(self.config.INITIAL_PODS)
+        self._schedule_next_arrival()
+        self._on_metrics_sample(None)
+        if self.config.HPA_ENABLED:
+            self.hpa = HPA(self.env, self, start_process=False)
+            self.env.schedule(self.config.HPA_SYNC_PERIOD, EventType.HPA_SYNC)
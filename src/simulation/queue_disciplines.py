@@ -0,0 +1,233 @@
+# src/simulation/queue_disciplines.py - DISCIPLINE DI CODA INTERCAMBIABILI (COMUNI AI DUE MOTORI)
+
+import heapq
+from collections import deque
+
+from src.config import Priority
+
+
+class _PriorityItem:
+    """
+    Equivalente leggero di simpy.PriorityItem: il confronto considera solo la priorità,
+    quindi l'heap ordina le richieste esattamente come il PriorityStore di SimPy.
+    """
+    __slots__ = ('priority', 'item')
+
+    def __init__(self, priority, item):
+        self.priority = priority
+        self.item = item
+
+    def __lt__(self, other):
+        return self.priority < other.priority
+
+
+# Tutte le discipline offrono la stessa interfaccia:
+#   put(request)            inserisce una richiesta
+#   get(now)                estrae la prossima richiesta da servire (coda non vuota)
+#   len(queue)              richieste in coda, comprese le scadute non ancora eliminate
+#   evict_timed_out()       elimina le richieste scadute e le restituisce
+
+
+class FifoQueue(deque):
+    """First-In First-Out: la disciplina della baseline (semantica di simpy.Store)."""
+    put = deque.append
+
+    def get(self, now=None):
+        return self.popleft()
+
+    def evict_timed_out(self):
+        removed = [r for r in self if r.timed_out]
+        if removed:
+            kept = [r for r in self if not r.timed_out]
+            self.clear()
+            self.extend(kept)
+        return removed
+
+
+class HeapPriorityQueue(list):
+    """
+    Priorità statica su heap, identica al PriorityStore di SimPy (anche nell'ordine, non
+    FIFO, delle richieste con la stessa priorità): la disciplina storica dello scenario
+    con priorità, che riproduce bit per bit i risultati del motore SimPy.
+    """
+    def put(self, request):
+        heapq.heappush(self, _PriorityItem(request.priority.value, request))
+
+    def get(self, now=None):
+        return heapq.heappop(self).item
+
+    def evict_timed_out(self):
+        # Heap ricostruito anche senza rimozioni: heapify può riordinare le richieste con la
+        # stessa priorità, e saltarlo cambierebbe l'ordine di servizio storico
+        removed = [p_item.item for p_item in self if p_item.item.timed_out]
+        self[:] = [p_item for p_item in self if not p_item.item.timed_out]
+        heapq.heapify(self)
+        return removed
+
+
+class _PerClassQueue:
+    """Base delle discipline con una deque FIFO per classe di priorità."""
+
+    def __init__(self):
+        self.queues = {priority: deque() for priority in sorted(Priority, key=lambda p: p.value)}
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def put(self, request):
+        self.queues[request.priority].append(request)
+        self._len += 1
+
+    def evict_timed_out(self):
+        removed = []
+        for priority, queue in self.queues.items():
+            if any(r.timed_out for r in queue):
+                removed.extend(r for r in queue if r.timed_out)
+                self.queues[priority] = deque(r for r in queue if not r.timed_out)
+        self._len -= len(removed)
+        return removed
+
+
+class StrictPriorityQueue(_PerClassQueue):
+    """Priorità stretta: si serve la classe più alta non vuota, FIFO al suo interno. O(1)."""
+
+    def get(self, now=None):
+        for queue in self.queues.values():
+            if queue:
+                self._len -= 1
+                return queue.popleft()
+        raise IndexError("get da una coda vuota")
+
+
+class AgingPriorityQueue(_PerClassQueue):
+    """
+    Priorità con invecchiamento: la priorità effettiva di una richiesta migliora di un
+    livello ogni 'aging_interval' secondi di attesa, così le classi basse non restano
+    senza servizio. In ogni classe la più vecchia è in testa, quindi basta confrontare le
+    teste (O(numero di classi)); a parità vince la classe di priorità più alta.
+    """
+
+    def __init__(self, aging_interval):
+        super().__init__()
+        if not aging_interval > 0:
+            raise ValueError(f"QUEUE_AGING_INTERVAL deve essere positivo (trovato {aging_interval!r})")
+        self.aging_interval = aging_interval
+
+    def get(self, now):
+        best_queue, best_priority = None, None
+        for priority, queue in self.queues.items():
+            if queue:
+                effective = priority.value - (now - queue[0].arrival_time) / self.aging_interval
+                if best_queue is None or effective < best_priority:
+                    best_queue, best_priority = queue, effective
+        if best_queue is None:
+            raise IndexError("get da una coda vuota")
+        self._len -= 1
+        return best_queue.popleft()
+
+
+class WeightedFairQueue(_PerClassQueue):
+    """
+    Weighted fair queuing tra classi di priorità, realizzato con Deficit Round Robin sui
+    tempi di servizio (noti alla generazione): a ogni turno una classe riceve
+    quantum * peso secondi di credito e serve le richieste di testa finché il credito
+    basta, quindi a lungo termine il tempo di servizio si divide in proporzione ai pesi.
+    """
+
+    def __init__(self, weights, quantum):
+        super().__init__()
+        missing = [p.name for p in self.queues if not weights.get(p, 0) > 0]
+        if missing:
+            raise ValueError(f"QUEUE_WFQ_WEIGHTS: servono pesi positivi per le priorità {missing}")
+        if not quantum > 0:
+            raise ValueError(f"QUEUE_WFQ_QUANTUM deve essere positivo (trovato {quantum!r})")
+        self.credit_per_round = {p: quantum * weights[p] for p in self.queues}
+        self.deficits = dict.fromkeys(self.queues, 0.0)
+        self.active = deque()           # Classi non vuote, in ordine di turno
+        self._credited = False          # La classe di turno ha già ricevuto il credito
+
+    def put(self, request):
+        queue = self.queues[request.priority]
+        if not queue:
+            self.active.append(request.priority)
+        queue.append(request)
+        self._len += 1
+
+    def get(self, now=None):
+        if not self.active:
+            raise IndexError("get da una coda vuota")
+        while True:
+            priority = self.active[0]
+            if not self._credited:
+                self.deficits[priority] += self.credit_per_round[priority]
+                self._credited = True
+            queue = self.queues[priority]
+            if queue[0].service_time <= self.deficits[priority]:
+                request = queue.popleft()
+                self.deficits[priority] -= request.service_time
+                if not queue:
+                    self._deactivate(priority)
+                self._len -= 1
+                return request
+            self.active.rotate(-1)
+            self._credited = False
+
+    def _deactivate(self, priority):
+        if self.active[0] == priority:
+            self._credited = False
+        self.active.remove(priority)
+        self.deficits[priority] = 0.0
+
+    def evict_timed_out(self):
+        removed = super().evict_timed_out()
+        for priority in list(self.active):
+            if not self.queues[priority]:
+                self._deactivate(priority)
+        return removed
+
+
+class EarliestDeadlineFirstQueue:
+    """Earliest-Deadline-First: si serve la richiesta con scadenza (arrival_time + timeout) più vicina."""
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = 0      # A parità di scadenza, ordine di arrivo
+
+    def __len__(self):
+        return len(self._heap)
+
+    def put(self, request):
+        self._sequence += 1
+        heapq.heappush(self._heap, (request.arrival_time + request.timeout, self._sequence, request))
+
+    def get(self, now=None):
+        return heapq.heappop(self._heap)[2]
+
+    def evict_timed_out(self):
+        removed = [entry[2] for entry in self._heap if entry[2].timed_out]
+        if removed:
+            self._heap = [entry for entry in self._heap if not entry[2].timed_out]
+            heapq.heapify(self._heap)
+        return removed
+
+
+QUEUE_DISCIPLINES = {
+    "fifo": lambda config: FifoQueue(),
+    "priority": lambda config: HeapPriorityQueue(),
+    "strict_priority": lambda config: StrictPriorityQueue(),
+    "wfq": lambda config: WeightedFairQueue(config.QUEUE_WFQ_WEIGHTS, config.QUEUE_WFQ_QUANTUM),
+    "edf": lambda config: EarliestDeadlineFirstQueue(),
+    "aging": lambda config: AgingPriorityQueue(config.QUEUE_AGING_INTERVAL),
+}
+
+
+def make_queue_discipline(name, config):
+    """
+    Crea la coda della disciplina 'name' (vedi QUEUE_DISCIPLINE in config), con i
+    parametri già validati. Solleva ValueError per discipline sconosciute.
+    """
+    builder = QUEUE_DISCIPLINES.get(name)
+    if builder is None:
+        raise ValueError(f"Disciplina di coda '{name}' non supportata. Valori ammessi: {list(QUEUE_DISCIPLINES)}")
+    return builder(config)
@@ -0,0 +1,40 @@
+# src/simulation/queue_occupancy.py - CONTATORI INCREMENTALI DELLA CODA PER PRIORITÀ E TIPO
+
+from src.config import Priority
+from src.utils.columnar_store import REQ_TYPES
+
+
+class QueueOccupancy:
+    """
+    Numero di richieste presenti nella coda, per priorità e per tipo di richiesta,
+    aggiornato a ogni inserimento, estrazione ed eliminazione delle richieste scadute:
+    il campionamento delle metriche non deve più scorrere la coda.
+    Conta le richieste fisicamente in coda, comprese quelle già scadute ma non ancora
+    eliminate (EVICT_EXPIRED_REQUESTS = False), come la scansione che sostituisce.
+    I conteggi per tipo sono indicizzati per codice (Request.type_code); req_type_lengths()
+    ne dà la vista per RequestType.
+    """
+    __slots__ = ('total', 'by_priority', 'by_req_type')
+
+    def __init__(self):
+        self.total = 0
+        self.by_priority = dict.fromkeys(sorted(Priority, key=lambda p: p.value), 0)
+        self.by_req_type = [0] * len(REQ_TYPES)
+
+    def add(self, request):
+        self.total += 1
+        self.by_priority[request.priority] += 1
+        self.by_req_type[request.type_code] += 1
+
+    def remove(self, request):
+        self.total -= 1
+        self.by_priority[request.priority] -= 1
+        self.by_req_type[request.type_code] -= 1
+
+    def priority_lengths(self):
+        """Lunghezze per priorità delle sole priorità presenti in coda, in ordine di priorità."""
+        return {priority: length for priority, length in self.by_priority.items() if length}
+
+    def req_type_lengths(self):
+        """Lunghezze per tipo di richiesta {RequestType: richieste in coda}."""
+        return dict(zip(REQ_TYPES, self.by_req_type))
@@ -1,30 +1,97 @@
 # src/simulation/simulator.py - VERSIONE FINALE CON CRISTALLIZZAZIONE
 
 import simpy
-from src.model.request import Request
+from simpy.resources.store import Store
+
+from src.model.request import PriorityRequest
 from src.controller.hpa import HPA
 from src.service.service import PodService
 from src.service.traffic_profiler import DynamicTrafficProfiler
+from src.simulation.deadline_index import DeadlineIndex
+from src.simulation.queue_disciplines import make_queue_discipline
+from src.simulation.queue_occupancy import QueueOccupancy
+from src.utils.columnar_store import REQ_TYPE_CODES
+from src.utils.request_records import RequestRecordSink
+from src.utils.sim_logger import SimLogger, TraceEvent
+from src.utils.time_averages import system_sample_interval
+from src.utils.variate_streams import ChoiceStream, ExponentialStream
+
+
+class _DisciplineStore(Store):
+    """
+    Store SimPy le cui richieste sono ordinate dalla disciplina di coda 'items' (vedi
+    queue_disciplines) e che aggiorna i contatori di occupazione e l'integrale della
+    lunghezza della coda a ogni inserimento ed estrazione. Con la disciplina "fifo" si
+    comporta come uno Store, con "priority" come il PriorityStore di SimPy.
+    """
+    def __init__(self, env, items, occupancy, queue_integral):
+        super().__init__(env)
+        self.items = items
+        self.occupancy = occupancy
+        self.queue_integral = queue_integral
+
+    def _do_put(self, event):
+        self.items.put(event.item)
+        self.occupancy.add(event.item)
+        self.queue_integral.update(self._env.now, self.occupancy.total)
+        event.succeed()
+
+    def _do_get(self, event):
+        if self.items:
+            request = self.items.get(self._env.now)
+            self.occupancy.remove(request)
+            self.queue_integral.update(self._env.now, self.occupancy.total)
+            event.succeed(request)
+
 
 class Simulator:
+    """
+    Simulatore SimPy del cluster. Lo scenario è definito da due componenti:
+    - queue_discipline: disciplina della coda (vedi queue_disciplines), "fifo" per la baseline;
+    - metrics: Metrics (baseline) o MetricsWithPriority, che registrano le stesse chiamate
+      con o senza la disaggregazione per priorità.
+    """
     class _Pod:
         def __init__(self, pod_id, process):
             self.id = pod_id
             self.process = process
 
-    def __init__(self, config_module, metrics, arrival_rng, choice_rng, service_rng, lambda_function):
+    def __init__(self, config_module, metrics, arrival_rng, choice_rng, service_rng, lambda_function,
+                 queue_discipline="fifo"):
         self.config = config_module
         self.metrics = metrics
+        self.queue_discipline = queue_discipline
         self.env = simpy.Environment()
         self.arrival_rng = arrival_rng
         self.choice_rng = choice_rng
+        # Inter-arrivi e scelta del tipo estratti a blocchi, stessa sequenza delle chiamate singole
+        self.arrival_stream = ExponentialStream(arrival_rng, config_module.VARIATE_BLOCK_SIZE)
+        self.choice_stream = ChoiceStream(choice_rng, config_module.VARIATE_BLOCK_SIZE)
         self.lambda_function = lambda_function
         self.service = PodService(service_rng, config_module)
         self.traffic_profiler = DynamicTrafficProfiler(metrics, config_module)
-        self.request_queue = simpy.Store(self.env)
+        # Tipo, codice, priorità, timeout e campionatore del servizio per indice di tipo (ordine
+        # delle tabelle del profiler): a ogni arrivo basta un accesso per indice
+        self._type_table = [(req_type, REQ_TYPE_CODES[req_type], config_module.REQUEST_TYPE_TO_PRIORITY[req_type],
+                             config_module.REQUEST_TIMEOUTS[req_type], self.service.sampler(req_type))
+                            for req_type in self.traffic_profiler.req_types]
+        self.time_averages = metrics.time_averages  # Integrali esatti di coda e pod
+        self.sample_interval = system_sample_interval(config_module)
+        self.queue_occupancy = QueueOccupancy()
+        self.request_queue = _DisciplineStore(self.env, make_queue_discipline(queue_discipline, config_module),
+                                              self.queue_occupancy, self.time_averages.queue)
         self.active_pods = []
         self.next_pod_id = 0
         self.available_pod_ids = set()
+        self.deadline_index = DeadlineIndex()
+        self.started = False
+        self.log = SimLogger.from_config(config_module)
+        self.trace = self.log.trace
+        self.records = RequestRecordSink.from_config(config_module, metrics.SCENARIO)
+        self._log_generator = self.log.component("generator")
+        self._log_pod = self.log.component("pod")
+        self._log_watcher = self.log.component("watcher")
+        self._log_simulator = self.log.component("simulator")
 
     def request_generator(self):
         req_id_counter = 0
@@ -34,73 +101,104 @@ class Simulator:
                 yield self.env.timeout(1)
                 continue
 
-            time_to_next = self.arrival_rng.exponential(1.0 / current_arrival_rate)
+            time_to_next = self.arrival_stream.exponential(1.0 / current_arrival_rate)
             yield self.env.timeout(time_to_next)
 
-            req_types, req_probs = self.traffic_profiler.get_current_probabilities()
-            chosen_type = self.choice_rng.choice(req_types, p=req_probs)
+            # Il profiler legge i contatori dei timeout: vanno aggiornati fino all'istante corrente
+            self.expire_timed_out_requests()
+            _, cdf = self.traffic_profiler.get_cumulative_table()
+            chosen_type, type_code, assigned_priority, type_timeout, sample_service_time = \
+                self._type_table[self.choice_stream.index_from_table(cdf)]
 
             # --- MODIFICA CHIAVE: CRISTALLIZZAZIONE DEL TEMPO DI SERVIZIO ---
             # Il tempo di servizio viene calcolato QUI e salvato nella richiesta.
             # Questa è l'unica chiamata a service_rng, isolandola.
-            service_time = self.service.get_service_time(chosen_type)
-
-            type_timeout = self.config.REQUEST_TIMEOUTS[chosen_type]
+            service_time = sample_service_time()
             req_id_counter += 1
 
-            new_request = Request(
+            new_request = PriorityRequest(
                 request_id=req_id_counter,
                 req_type=chosen_type,
                 arrival_time=self.env.now,
+                priority=assigned_priority,
+                service_time=service_time,  # Passiamo il valore cristallizzato
                 timeout=type_timeout,
-                service_time=service_time  # Passiamo il valore cristallizzato
+                type_code=type_code
             )
-            self.metrics.record_request_generation(chosen_type)
+            self.metrics.record_request_generation(self.env.now, type_code, assigned_priority)
 
-            print(
-                f"{self.env.now:.2f} [Generator]: Richiesta {new_request.request_id} ({new_request.req_type.name}) generata.")
+            if self._log_generator.is_debug:
+                self._log_generator.emit(f"{self.env.now:.2f} [Generator]: Richiesta {new_request.request_id} ({new_request.req_type.name} -> Priorità: {new_request.priority.name}) generata.")
+            if self.trace is not None:
+                self.trace.record(self.env.now, TraceEvent.GENERATED, new_request.request_id, value=chosen_type.value)
 
-            self.env.process(self.timeout_watcher(new_request))
-            self.request_queue.put(new_request)
+            self.deadline_index.add(new_request)
+            yield self.request_queue.put(new_request)
 
     def pod_worker(self, pod_id):
-        print(f"{self.env.now:.2f} [Pod {pod_id}]: Avviato.")
+        if self._log_pod.is_info:
+            self._log_pod.emit(f"{self.env.now:.2f} [Pod {pod_id}]: Avviato.")
+        if self.trace is not None:
+            self.trace.record(self.env.now, TraceEvent.POD_START, pod_id=pod_id)
+        in_service = False
         while True:
             try:
                 request = yield self.request_queue.get()
+                self.expire_timed_out_requests()
                 request.is_serviced = True
 
                 if request.timed_out:
-                    print(f"{self.env.now:.2f} [Pod {pod_id}]: Scartata richiesta {request.request_id} perché già scaduta.")
+                    if self._log_pod.is_debug:
+                        self._log_pod.emit(f"{self.env.now:.2f} [Pod {pod_id}]: Scartata richiesta {request.request_id} perché già scaduta.")
+                    if self.trace is not None:
+                        self.trace.record(self.env.now, TraceEvent.DISCARDED, request.request_id, pod_id)
                     continue
 
                 arrival_in_service = self.env.now
                 wait_time = arrival_in_service - request.arrival_time
-                print(
-                    f"{self.env.now:.2f} [Pod {pod_id}]: Inizio processamento richiesta {request.request_id}. Attesa: {wait_time:.4f}s")
+                if self._log_pod.is_debug:
+                    self._log_pod.emit(f"{self.env.now:.2f} [Pod {pod_id}]: Inizio processamento rich. {request.request_id} (Priorità: {request.priority.name}). Attesa: {wait_time:.4f}s")
+                if self.trace is not None:
+                    self.trace.record(self.env.now, TraceEvent.SERVICE_START, request.request_id, pod_id, wait_time)
 
+                self._set_in_service(True)
+                in_service = True
                 # --- MODIFICA CHIAVE: USARE IL VALORE CRISTALLIZZATO ---
                 # Il pod_worker non calcola più nulla, legge solo il valore.
                 yield self.env.timeout(request.service_time)
+                in_service = False
+                self._set_in_service(False)
 
                 completion_time = self.env.now
                 response_time = completion_time - request.arrival_time
-                print(
-                    f"{self.env.now:.2f} [Pod {pod_id}]: Fine processamento richiesta {request.request_id}. Tempo di risposta: {response_time:.4f}s")
+                self.expire_timed_out_requests()
+                if self._log_pod.is_debug:
+                    self._log_pod.emit(f"{self.env.now:.2f} [Pod {pod_id}]: Fine processamento rich. {request.request_id}. Tempo di risposta: {response_time:.4f}s")
+                if self.trace is not None:
+                    self.trace.record(self.env.now, TraceEvent.SERVICE_END, request.request_id, pod_id, response_time)
 
-                self.metrics.record_request_metrics(completion_time, request.req_type, response_time, wait_time)
+                self.metrics.record_request_metrics(completion_time, request.type_code, request.priority,
+                                                    response_time, wait_time)
+                if self.records is not None:
+                    self.records.record_completion(request, arrival_in_service, completion_time, pod_id)
 
             except simpy.Interrupt:
+                if in_service:
+                    # La richiesta in servizio va persa con il pod
+                    self._set_in_service(False)
                 break
-        print(f"{self.env.now:.2f} [Pod {pod_id}]: Rilevato segnale di stop, terminazione.")
+        if self._log_pod.is_info:
+            self._log_pod.emit(f"{self.env.now:.2f} [Pod {pod_id}]: Ricevuto segnale di stop, terminazione.")
+        if self.trace is not None:
+            self.trace.record(self.env.now, TraceEvent.POD_STOP, pod_id=pod_id)
 
-    # ... [Il resto della classe (metrics_recorder, scale_to, etc.) rimane invariato] ...
     def metrics_recorder(self):
         while True:
-            queue_len = len(self.request_queue.items)
+            self.expire_timed_out_requests()
             pod_count = len(self.active_pods)
-            self.metrics.record_system_metrics(self.env.now, pod_count, queue_len)
-            yield self.env.timeout(1)
+            self.metrics.record_system_metrics(self.env.now, pod_count, self.queue_occupancy.total,
+                                               self.queue_occupancy.priority_lengths())
+            yield self.env.timeout(self.sample_interval)
 
     def get_busy_pods_count(self):
         num_pods_waiting_for_request = len(self.request_queue.get_queue)
@@ -111,33 +209,86 @@ class Simulator:
         current_replicas = len(self.active_pods)
         if desired_replicas > current_replicas:
             num_to_add = desired_replicas - current_replicas
-            print(f"{self.env.now:.2f} [Simulator]: Aggiungo {num_to_add} Pods...")
+            if self._log_simulator.is_info:
+                self._log_simulator.emit(f"{self.env.now:.2f} [Simulator]: Aggiungo {num_to_add} Pods...")
             for _ in range(num_to_add):
-                if self.available_pod_ids: pod_id = self.available_pod_ids.pop()
+                if self.available_pod_ids: pod_id = min(self.available_pod_ids); self.available_pod_ids.remove(pod_id)
                 else: pod_id = self.next_pod_id; self.next_pod_id += 1
                 process = self.env.process(self.pod_worker(pod_id))
                 self.active_pods.append(self._Pod(pod_id, process))
+            self.time_averages.pods.update(self.env.now, len(self.active_pods))
         elif desired_replicas < current_replicas:
             num_to_remove = current_replicas - desired_replicas
-            print(f"{self.env.now:.2f} [Simulator]: Rimuovo {num_to_remove} Pods...")
+            if self._log_simulator.is_info:
+                self._log_simulator.emit(f"{self.env.now:.2f} [Simulator]: Rimuovo {num_to_remove} Pods...")
             pods_to_remove = self.active_pods[-num_to_remove:]
             for pod in pods_to_remove:
                 if pod.process.is_alive and not pod.process.triggered: pod.process.interrupt()
                 self.available_pod_ids.add(pod.id)
             self.active_pods = self.active_pods[:-num_to_remove]
+            self.time_averages.pods.update(self.env.now, len(self.active_pods))
+
+    def _set_in_service(self, in_service):
+        busy = self.time_averages.busy
+        busy.update(self.env.now, busy.value + (1 if in_service else -1))
 
-    def timeout_watcher(self, request: Request):
-        yield self.env.timeout(request.timeout)
-        if not request.is_serviced:
-            request.timed_out = True
-            self.metrics.record_timeout(request.req_type, self.env.now)
-            print(f"{self.env.now:.2f} [Watcher]: Richiesta {request.request_id} TIMED OUT in coda.")
+    def expire_timed_out_requests(self, inclusive=True):
+        """
+        Registra i timeout di tutte le richieste scadute fino all'istante corrente.
+        Sostituisce i processi timeout_watcher: ogni timeout viene registrato con la
+        sua scadenza esatta (arrival_time + timeout), come faceva il watcher.
+        """
+        if self.deadline_index.next_deadline > self.env.now:
+            return
+        any_expired = False
+        for deadline, request in self.deadline_index.pop_expired(self.env.now, inclusive):
+            if not request.is_serviced:
+                request.timed_out = True
+                any_expired = True
+                self.metrics.record_timeout(deadline, request.type_code, request.priority)
+                if self._log_watcher.is_debug:
+                    self._log_watcher.emit(f"{deadline:.2f} [Watcher]: Richiesta {request.request_id} TIMED OUT in coda.")
+                if self.trace is not None:
+                    self.trace.record(deadline, TraceEvent.TIMEOUT, request.request_id)
+                if self.records is not None:
+                    self.records.record_timeout(request, deadline)
+        if any_expired and self.config.EVICT_EXPIRED_REQUESTS:
+            removed = self.request_queue.items.evict_timed_out()
+            for request in removed:
+                self.queue_occupancy.remove(request)
+            self.time_averages.record_eviction(self.env.now, self.queue_occupancy.total, removed)
 
     def run(self, simulation_duration: float):
-        print("--- Avvio Simulatore (Baseline - FIFO) ---")
+        print(f"--- Avvio Simulatore ({self.metrics.SCENARIO}, coda {self.queue_discipline}) ---")
+        self.advance(simulation_duration)
+        self.finish()
+        print(f"--- Simulazione {self.metrics.SCENARIO} Terminata ---")
+
+    def start(self):
+        """Avvia i processi del modello: generatore, recorder, pod iniziali e HPA."""
+        self.started = True
+        if self.trace is not None:
+            self.trace.record(self.env.now, TraceEvent.RUN_START)
         self.env.process(self.request_generator())
         self.env.process(self.metrics_recorder())
         self.scale_to(self.config.INITIAL_PODS)
         if self.config.HPA_ENABLED: HPA(self.env, self)
-        self.env.run(until=simulation_duration)
-        print("--- Simulazione Baseline Terminata ---")
\ No newline at end of file
+
+    def advance(self, until):
+        """
+        Esegue la simulazione fino all'istante 'until' (escluso), avviandola se necessario.
+        Può essere chiamato più volte con istanti crescenti: il risultato è lo stesso
+        di un'unica chiamata a env.run().
+        """
+        if not self.started:
+            self.start()
+        self.env.run(until=until)
+
+    def finish(self):
+        """Chiude la simulazione all'istante corrente."""
+        # Le scadenze precedenti la fine della simulazione non ancora registrate
+        self.expire_timed_out_requests(inclusive=False)
+        self.time_averages.close(self.env.now)
+        if self.records is not None:
+            self.records.close()
+        self.log.close()
@@ -0,0 +1,150 @@
+# src/steady_state_analysis/sequential_stopping.py - REGOLA DI ARRESTO SEQUENZIALE PER LO STEADY-STATE
+
+import time
+
+import numpy as np
+
+from src.config import RequestType
+from src.steady_state_analysis.steady_state_analyzer import BatchMeansAccumulator, SteadyStateAnalyzer
+from src.steady_state_analysis.warmup_detection import configured_warmup
+from src.utils.columnar_store import REQ_TYPE_CODES, TimeSeries
+from src.utils.streaming_metrics import StreamingMetrics, StreamingMetricsWithPriority
+
+# Metriche monitorabili: ognuna anche per singolo tipo di richiesta, es. "p_loss[CHECKOUT]"
+SEQUENTIAL_METRIC_KINDS = ("response_time", "wait_time", "p_loss")
+
+
+class _MetricSeries:
+    """
+    Legge dagli archivi colonnari di una simulazione in corso solo le righe registrate
+    dopo l'ultima lettura e le aggiunge a un BatchMeansAccumulator.
+    Per 'p_loss' ogni richiesta conclusa è un'osservazione: 0 se servita, 1 se persa.
+    """
+
+    def __init__(self, metrics, name):
+        kind, _, type_name = name.partition("[")
+        if kind not in SEQUENTIAL_METRIC_KINDS:
+            raise ValueError(f"Metrica '{name}' non supportata. Valide: {list(SEQUENTIAL_METRIC_KINDS)}, "
+                             f"anche per tipo, es. 'p_loss[CHECKOUT]'")
+        self.metrics = metrics
+        self.kind = kind
+        self.req_type_code = REQ_TYPE_CODES[RequestType[type_name.rstrip("]")]] if type_name else None
+        self.accumulator = BatchMeansAccumulator()
+        self._completions_read = 0
+        self._timeouts_read = 0
+
+    def _new_rows(self, store, start, value_column=None):
+        """Timestamp (e valori) delle righe dopo 'start', filtrate per tipo; viste senza copia se non filtrate."""
+        timestamps = store.column("timestamp")[start:]
+        values = store.column(value_column)[start:] if value_column else None
+        if self.req_type_code is not None:
+            mask = store.column("req_type")[start:] == self.req_type_code
+            timestamps = timestamps[mask]
+            values = values[mask] if value_column else None
+        return timestamps, values
+
+    def update(self):
+        completions, timeouts = self.metrics.completions, self.metrics.timeouts
+        start, self._completions_read = self._completions_read, len(completions)
+        if self.kind == "p_loss":
+            served, _ = self._new_rows(completions, start)
+            timeouts_start, self._timeouts_read = self._timeouts_read, len(timeouts)
+            timed_out, _ = self._new_rows(timeouts, timeouts_start)
+            new_data = TimeSeries.concatenate([TimeSeries(served, np.zeros(len(served), dtype=np.int8)),
+                                               TimeSeries(timed_out, np.ones(len(timed_out), dtype=np.int8))])
+        else:
+            new_data = TimeSeries(*self._new_rows(completions, start, self.kind)).sorted()
+        self.accumulator.extend(new_data)
+
+
+def relative_half_width(result):
+    """
+    Semi-ampiezza relativa alla media. Con media nulla la precisione relativa non è
+    definita: la metrica non è considerata a convergenza (es. P_loss di un tipo raro,
+    i cui pochi timeout possono finire tutti nel warm-up tagliato da MSER).
+    """
+    if result['mean'] != 0:
+        return result['half_width'] / abs(result['mean'])
+    return float('inf')
+
+
+class SequentialStoppingRule:
+    """
+    Esegue una simulazione a orizzonte infinito a blocchi di 'check_interval' secondi
+    simulati. Dopo ogni blocco ricalcola, solo sui nuovi dati, il CI Batch Means delle
+    metriche monitorate e si ferma appena tutte hanno semi-ampiezza relativa
+    <= target_relative_half_width, oppure quando si esaurisce il budget di tempo
+    simulato o di tempo reale.
+    """
+
+    def __init__(self, config_module, metric_names=None, target_relative_half_width=None, check_interval=None,
+                 max_simulation_time=None, max_wall_time=None):
+        self.config = config_module
+        self.metric_names = list(metric_names or config_module.SEQUENTIAL_METRICS)
+        self.target_relative_half_width = target_relative_half_width or config_module.SEQUENTIAL_TARGET_RELATIVE_HALF_WIDTH
+        self.check_interval = check_interval or config_module.SEQUENTIAL_CHECK_INTERVAL
+        self.max_simulation_time = max_simulation_time or config_module.STEADY_SIMULATION_TIME
+        self.max_wall_time = max_wall_time or config_module.SEQUENTIAL_MAX_WALL_TIME
+        self.warmup = configured_warmup(config_module)     # None = MSER-5 su ogni metrica
+        self.num_batches = config_module.NUM_BATCHES
+        self.confidence_level = config_module.CONFIDENCE_LEVEL
+
+    def run(self, simulator):
+        """
+        Esegue la simulazione fino alla convergenza (o all'esaurimento del budget).
+
+        Returns:
+            dict: 'simulation_time', 'wall_time', 'converged', 'stop_reason' e 'results'
+                  ({metrica: risultato di calculate_batch_means_ci, o None}).
+        """
+        if not hasattr(simulator, "advance"):
+            raise ValueError(f"{type(simulator).__name__} non può essere eseguito a blocchi")
+        if isinstance(simulator.metrics, (StreamingMetrics, StreamingMetricsWithPriority)):
+            # Le serie in streaming vengono ricompattate: non si possono leggere solo le code nuove
+            raise ValueError("L'arresto sequenziale richiede le metriche complete (METRICS_STREAMING = False)")
+
+        analyzer = SteadyStateAnalyzer(simulator.metrics, self.config)
+        series = {name: _MetricSeries(simulator.metrics, name) for name in self.metric_names}
+        wall_start = time.perf_counter()
+        print(f"--- Arresto sequenziale: semi-ampiezza relativa <= {self.target_relative_half_width:.1%} "
+              f"per {', '.join(self.metric_names)} ---")
+
+        while True:
+            until = min(simulator.env.now + self.check_interval, self.max_simulation_time)
+            simulator.advance(until)
+
+            results = {}
+            for name, metric_series in series.items():
+                metric_series.update()
+                results[name] = analyzer.calculate_incremental_batch_means_ci(
+                    metric_series.accumulator, self.warmup, self.num_batches, self.confidence_level)
+            widths = {name: relative_half_width(r) if r else float('inf') for name, r in results.items()}
+            # Un CI con medie dei batch ancora correlate non è valido, qualunque sia la sua ampiezza
+            correlated = {name for name, r in results.items() if r and r.get('autocorrelation_exceeded')}
+            wall_time = time.perf_counter() - wall_start
+            print(f"t = {until:.0f}s: " + ", ".join(f"{name} {width:.2%}" + (" (batch correlati)" if name in correlated else "")
+                                                   for name, width in widths.items()))
+
+            if not correlated and all(width <= self.target_relative_half_width for width in widths.values()):
+                converged, stop_reason = True, "precisione raggiunta"
+            elif until >= self.max_simulation_time:
+                converged, stop_reason = False, "budget di tempo simulato esaurito"
+            elif self.max_wall_time is not None and wall_time >= self.max_wall_time:
+                converged, stop_reason = False, "budget di tempo reale esaurito"
+            else:
+                continue
+            break
+
+        simulator.finish()
+        print(f"--- Arresto sequenziale a t = {until:.0f}s dopo {wall_time:.1f}s: {stop_reason} ---")
+        for name, result in results.items():
+            if result:
+                print(f"  - {name}: {result['mean']:.4f} ± {result['half_width']:.4f} "
+                      f"[{SteadyStateAnalyzer.describe_ci(result)}]")
+        return {
+            'simulation_time': until,
+            'wall_time': wall_time,
+            'converged': converged,
+            'stop_reason': stop_reason,
+            'results': results,
+        }
@@ -1,10 +1,97 @@
 # src/analysis/steady_state_analyzer.py
-import os
-
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.stats import t
 
+from src.steady_state_analysis.batch_means import (batch_means, batch_means_from_prefix_sums, lag1_autocorrelation,
+                                                   overlapping_batch_means_ci,
+                                                   overlapping_batch_means_ci_from_prefix_sums, select_num_batches,
+                                                   select_num_batches_from_prefix_sums)
+from src.steady_state_analysis.warmup_detection import mser_truncation_index
+from src.utils.columnar_store import ColumnarStore, TimeSeries
+
+class BatchMeansAccumulator:
+    """
+    Raccoglie incrementalmente le osservazioni di una serie in un ColumnarStore di array
+    NumPy: timestamp e somme prefisse dei valori, così la media di un batch qualsiasi si
+    ottiene con due letture, qualunque sia la dimensione del batch o il troncamento.
+    Per MSER-5 tiene anche le somme prefisse delle medie dei gruppi di 5 osservazioni (e
+    dei loro quadrati), aggiornate solo per i gruppi nuovi: il punto di troncamento si
+    ricava con un passaggio vettoriale su n/5 valori, senza rileggere le osservazioni.
+    """
+    MSER_BATCH_SIZE = 5
+
+    def __init__(self):
+        # Prima riga sentinella: somma prefissa 0 prima della prima osservazione
+        self._observations = ColumnarStore({"timestamp": np.float64, "prefix_sum": np.float64})
+        self._observations.append((-np.inf, 0.0))
+        self._mser_groups = ColumnarStore({"sum": np.float64, "sum_sq": np.float64})
+        self._mser_groups.append((0.0, 0.0))
+        self._mser_shift = None     # Media del primo gruppo: le medie sono salvate centrate su di essa
+
+    def __len__(self):
+        return len(self._observations) - 1
+
+    @property
+    def timestamps(self):
+        return self._observations.column("timestamp")[1:]
+
+    @property
+    def prefix_sums(self):
+        """Somme prefisse (n + 1 valori, da 0): vista sull'archivio, senza copie."""
+        return self._observations.column("prefix_sum")
+
+    def extend(self, metric_data):
+        """Aggiunge le nuove osservazioni, tuple (timestamp, valore) o TimeSeries in ordine cronologico."""
+        series = TimeSeries.from_pairs(metric_data)
+        if not series:
+            return
+        old_size = len(self)
+        total = self.prefix_sums[-1]
+        # Somma in sequenza a partire dal totale precedente, come un accumulo elemento per elemento
+        prefix_sums = np.cumsum(np.concatenate(([total], np.asarray(series.values, dtype=float))))[1:]
+        self._observations.extend(series.timestamps, prefix_sums)
+        self._extend_mser_groups(old_size // self.MSER_BATCH_SIZE)
+
+    def _extend_mser_groups(self, complete_before):
+        size = self.MSER_BATCH_SIZE
+        complete = len(self) // size
+        if complete == complete_before:
+            return
+        means = batch_means_from_prefix_sums(self.prefix_sums[complete_before * size:complete * size + 1],
+                                             complete - complete_before)
+        if self._mser_shift is None:
+            self._mser_shift = means[0]
+        # Centrate sulla prima media: SSE non cambia, ma si limita la cancellazione numerica
+        means = means - self._mser_shift
+        groups = self._mser_groups
+        last_sum, last_sum_sq = groups.column("sum")[-1], groups.column("sum_sq")[-1]
+        groups.extend(np.cumsum(np.concatenate(([last_sum], means)))[1:],
+                      np.cumsum(np.concatenate(([last_sum_sq], means ** 2)))[1:])
+
+    def mser_truncation_index(self, max_fraction=0.5):
+        """Come warmup_detection.mser_truncation_index (MSER-5) sulle osservazioni raccolte."""
+        num_groups = len(self._mser_groups) - 1
+        if num_groups < 2:
+            return 0
+        max_truncation = int(num_groups * max_fraction)
+        sums, sums_sq = self._mser_groups.column("sum"), self._mser_groups.column("sum_sq")
+        remaining = np.arange(num_groups, num_groups - max_truncation - 1, -1, dtype=float)
+        suffix_sum = sums[-1] - sums[:max_truncation + 1]
+        suffix_sum_sq = sums_sq[-1] - sums_sq[:max_truncation + 1]
+        mser = (suffix_sum_sq - suffix_sum ** 2 / remaining) / remaining ** 2
+        return int(np.argmin(mser)) * self.MSER_BATCH_SIZE
+
+    def first_index_at(self, warmup_period):
+        """Indice della prima osservazione con timestamp >= warmup_period."""
+        return int(np.searchsorted(self.timestamps, warmup_period, side='left'))
+
+    def batch_means(self, num_batches, start_index=0):
+        """Medie dei num_batches batch consecutivi da start_index (None se le osservazioni non bastano)."""
+        if (len(self) - start_index) // num_batches == 0:
+            return None
+        return batch_means_from_prefix_sums(self.prefix_sums[start_index:], num_batches)
+
+
 class SteadyStateAnalyzer:
     """
     Una classe dedicata all'analisi di regime permanente (steady-state)
@@ -20,31 +107,113 @@ class SteadyStateAnalyzer:
         utilizzando il metodo Batch Means.
 
         Args:
-            metric_data (list): Lista di tuple (timestamp, valore).
-            warmup_period (float): Durata del transitorio da scartare.
+            metric_data (TimeSeries | list): Serie (timestamp, valore), anche come lista di tuple.
+            warmup_period (float): Durata del transitorio da scartare; None per sceglierla
+                                   su questa serie con MSER-5.
             num_batches (int): Numero di batch in cui dividere i dati.
             confidence_level (float): Livello di confidenza desiderato (es. 0.95 per 95%).
 
         Returns:
-            dict: Un dizionario con media, intervallo di confidenza e semi-ampiezza, o None se i dati non sono sufficienti.
+            dict: Un dizionario con media, intervallo di confidenza, semi-ampiezza e warm-up
+                  scartato, o None se i dati non sono sufficienti.
         """
-        # 1. Rimozione del transitorio (Warm-up)
-        steady_state_values = [value for timestamp, value in metric_data if timestamp >= warmup_period]
+        # 1. Rimozione del transitorio (Warm-up): ricerca binaria sui timestamp ordinati
+        series = TimeSeries.from_pairs(metric_data).sorted()
+        warmup_method = "MSER-5" if warmup_period is None else "fisso"
+        if warmup_period is None:
+            start_index = mser_truncation_index(series.values)
+            warmup_period = float(series.timestamps[start_index]) if start_index < len(series) else 0.0
+        else:
+            start_index = int(np.searchsorted(series.timestamps, warmup_period, side='left'))
+        steady_state_values = series.values[start_index:]
 
         n = len(steady_state_values)
         if n < num_batches:
             print(f"Errore: Dati insufficienti per creare {num_batches} batch. Osservazioni disponibili: {n}")
             return None
 
-        # 2. Creazione dei Batch e calcolo delle medie dei batch
-        batch_size = n // num_batches
-        batch_means = []
-        for i in range(num_batches):
-            start_index = i * batch_size
-            end_index = start_index + batch_size
-            batch = steady_state_values[start_index:end_index]
-            batch_means.append(np.mean(batch))
+        # 2. Creazione dei Batch e calcolo dell'intervallo di confidenza
+        results = self._steady_state_ci(steady_state_values, num_batches, confidence_level, warmup_period)
+        results['warmup_method'] = warmup_method
+        return results
+
+    def calculate_incremental_batch_means_ci(self, accumulator, warmup_period, num_batches, confidence_level=0.95):
+        """
+        Come calculate_batch_means_ci, ma sui dati già raccolti da un BatchMeansAccumulator,
+        così può essere chiamato a ogni blocco di una simulazione ancora in corso. Tutto
+        si ricava dalle somme prefisse dell'accumulatore, senza copiare i valori: i batch
+        non sovrapposti (anche con dimensione automatica) costano O(numero di batch), mentre
+        MSER-5 (warmup_period None) e gli Overlapping Batch Means restano un passaggio
+        vettoriale su n/5 e n somme prefisse, perché la dimensione del batch cresce con n.
+
+        Returns:
+            dict: Come calculate_batch_means_ci, o None se i dati non sono ancora sufficienti.
+        """
+        warmup_method = "MSER-5" if warmup_period is None else "fisso"
+        if warmup_period is None:
+            start_index = accumulator.mser_truncation_index()
+            warmup_period = float(accumulator.timestamps[start_index]) if start_index < len(accumulator) else 0.0
+        else:
+            start_index = accumulator.first_index_at(warmup_period)
+        if self._uses_batch_selection():
+            if len(accumulator) - start_index < num_batches:
+                return None
+            results = self._steady_state_ci(accumulator.prefix_sums[start_index:], num_batches, confidence_level,
+                                            warmup_period, from_prefix_sums=True)
+        else:
+            batch_means = accumulator.batch_means(num_batches, start_index)
+            if batch_means is None:
+                return None
+            results = self._batch_means_ci(batch_means, num_batches, confidence_level, warmup_period,
+                                           (len(accumulator) - start_index) // num_batches)
+        results['warmup_method'] = warmup_method
+        return results
+
+    def calculate_records_batch_means_ci(self, records, value, warmup_period, num_batches, confidence_level=0.95,
+                                         req_type=None, priority=None):
+        """
+        Come calculate_batch_means_ci, ma sui record per richiesta scritti su disco
+        (RequestRecords): 'value' è 'response_time', 'wait_time' o 'outcome' (frazione
+        di richieste scadute), eventualmente filtrati per tipo e/o priorità. Dai blocchi
+        viene caricata solo la serie richiesta.
+        """
+        series = records.series(value, req_type=req_type, priority=priority)
+        return self.calculate_batch_means_ci(series, warmup_period, num_batches, confidence_level)
 
+    def _uses_batch_selection(self):
+        return self.config.BATCH_MEANS_OVERLAPPING or self.config.BATCH_MEANS_AUTO_SIZE
+
+    def _steady_state_ci(self, values, num_batches, confidence_level, warmup_period, from_prefix_sums=False):
+        """
+        CI della media dei valori già privati del transitorio (almeno num_batches).
+        Con BATCH_MEANS_AUTO_SIZE il numero di batch è scelto dall'autocorrelazione
+        lag-1 delle medie (num_batches diventa il minimo); con BATCH_MEANS_OVERLAPPING
+        il CI usa gli Overlapping Batch Means con la stessa dimensione del batch.
+        Con from_prefix_sums 'values' sono le somme prefisse dei valori (n + 1).
+        """
+        if from_prefix_sums:
+            select, means_of, overlapping_ci = (select_num_batches_from_prefix_sums, batch_means_from_prefix_sums,
+                                                overlapping_batch_means_ci_from_prefix_sums)
+        else:
+            select, means_of, overlapping_ci = select_num_batches, batch_means, overlapping_batch_means_ci
+        if self.config.BATCH_MEANS_AUTO_SIZE:
+            num_batches = select(values, num_batches, self.config.BATCH_MEANS_MAX_BATCHES,
+                                 self.config.BATCH_MEANS_MAX_LAG1_AUTOCORRELATION)
+        means = means_of(values, num_batches)
+        batch_size = (len(values) - from_prefix_sums) // num_batches
+        if self.config.BATCH_MEANS_OVERLAPPING:
+            grand_mean, half_width, _ = overlapping_ci(values, batch_size, confidence_level)
+            results = self._ci_result(grand_mean, half_width, confidence_level, num_batches, warmup_period,
+                                      batch_size, overlapping=True)
+        else:
+            results = self._batch_means_ci(means, num_batches, confidence_level, warmup_period, batch_size)
+        results['lag1_autocorrelation'] = lag1_autocorrelation(means)
+        # Anche al numero minimo di batch le medie restano correlate: il CI sottostima la varianza
+        results['autocorrelation_exceeded'] = bool(self.config.BATCH_MEANS_AUTO_SIZE and
+                                                   results['lag1_autocorrelation'] > self.config.BATCH_MEANS_MAX_LAG1_AUTOCORRELATION)
+        return results
+
+    def _batch_means_ci(self, batch_means, num_batches, confidence_level, warmup_period, batch_size):
         # 3. Calcolo della media generale e della varianza campionaria delle medie dei batch
         grand_mean = np.mean(batch_means)
         sample_variance = np.var(batch_means, ddof=1) # ddof=1 per varianza campionaria (diviso per k-1)
@@ -54,7 +223,10 @@ class SteadyStateAnalyzer:
         t_value = t.ppf((1 + confidence_level) / 2, df=degrees_freedom)
 
         half_width = t_value * np.sqrt(sample_variance / num_batches)
+        return self._ci_result(grand_mean, half_width, confidence_level, num_batches, warmup_period, batch_size)
 
+    def _ci_result(self, grand_mean, half_width, confidence_level, num_batches, warmup_period, batch_size,
+                   overlapping=False):
         ci_lower = grand_mean - half_width
         ci_upper = grand_mean + half_width
 
@@ -63,18 +235,41 @@ class SteadyStateAnalyzer:
             'ci': (ci_lower, ci_upper),
             'half_width': half_width,
             'confidence_level': confidence_level,
-            'num_batches': num_batches
+            'num_batches': num_batches,
+            'warmup_period': warmup_period,
+            'batch_size': batch_size,
+            'overlapping': overlapping,
+            'estimator': "Overlapping Batch Means" if overlapping else "batch disgiunti",
+            'auto_size': bool(self.config.BATCH_MEANS_AUTO_SIZE),
         }
 
+    @staticmethod
+    def describe_ci(results):
+        """Stimatore, batch e warm-up (con il metodo che l'ha scelto) effettivamente usati per un CI, su una riga."""
+        sizing = " (numero scelto dall'autocorrelazione)" if results.get('auto_size') else ""
+        warmup_method = f" ({results['warmup_method']})" if 'warmup_method' in results else ""
+        return (f"{results['estimator']}, {results['num_batches']} batch da {results['batch_size']} oss.{sizing}, "
+                f"warm-up {results['warmup_period']:.1f}s{warmup_method}")
+
     def print_ci_results(self, results, metric_name):
         """Stampa i risultati dell'analisi CI in modo leggibile."""
         print(f"Risultati Batch Means per '{metric_name}':")
         print(f"  - Stima Puntuale della Media: {results['mean']:.4f}")
         print(f"  - Intervallo di Confidenza al {results['confidence_level']:.0%}: ({results['ci'][0]:.4f}, {results['ci'][1]:.4f})")
         print(f"  - Semi-Ampiezza (Half-Width): {results['half_width']:.4f}")
+        print(f"  - Warm-up Scartato: {results['warmup_period']:.1f}s")
+        print(f"  - Stimatore: {self.describe_ci(results)}")
+        if 'lag1_autocorrelation' in results:
+            print(f"  - Autocorrelazione lag-1 delle medie dei batch: {results['lag1_autocorrelation']:.3f}")
+        if results.get('autocorrelation_exceeded'):
+            print(f"  - ATTENZIONE: autocorrelazione lag-1 sopra la soglia "
+                  f"{self.config.BATCH_MEANS_MAX_LAG1_AUTOCORRELATION} anche con {results['num_batches']} batch: "
+                  f"il CI non è affidabile (servono più dati)")
 
     def plot_confidence_interval(self, results, title, output_dir, filename):
         """Crea un grafico che visualizza la media e il suo intervallo di confidenza."""
+        import matplotlib.pyplot as plt
+        from src.analysis.rendering import save_figure
         mean = results['mean']
         half_width = results['half_width']
 
@@ -91,12 +286,10 @@ class SteadyStateAnalyzer:
         ax.grid(True, axis='y', linestyle='--', alpha=0.7)
 
         # Aggiungi testo per chiarezza
-        ci_text = f"Media: {mean:.3f}\nCI al {results['confidence_level']:.0%}: [{results['ci'][0]:.3f}, {results['ci'][1]:.3f}]"
+        ci_text = (f"Media: {mean:.3f}\nCI al {results['confidence_level']:.0%}: [{results['ci'][0]:.3f}, {results['ci'][1]:.3f}]"
+                   f"\n{self.describe_ci(results)}")
         ax.text(0.05, 0.95, ci_text, transform=ax.transAxes, fontsize=10,
                 verticalalignment='top', bbox=dict(boxstyle='round,pad=0.5', fc='wheat', alpha=0.5))
 
         plt.tight_layout()
-        plt.show()
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, filename)
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+        save_figure(fig, output_dir, filename, self.config)
@@ -3,16 +3,20 @@
 
 
 import os
-import matplotlib
+import functools
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import seaborn as sns
 from src.utils.metrics import Metrics
 from src.utils.metrics_with_priority import MetricsWithPriority
+from src.steady_state_analysis.steady_state_analyzer import SteadyStateAnalyzer
+from src.steady_state_analysis.warmup_detection import configured_warmup, detect_warmup
+from src.config import RequestType
+from src.utils.latency_histogram import percentile_label
+from src.analysis.downsampling import downsample
+from src.analysis.rendering import render_figures, save_figure
 
-
-matplotlib.use('Qt5Agg')
 plt.style.use('ggplot')
 
 class SteadyStatePlotter:
@@ -21,6 +25,32 @@ class SteadyStatePlotter:
         self.metrics_prio = metrics_prio
         self.config = config
 
+    @staticmethod
+    def _log_ci(label, scenario, results):
+        """Stampa un CI dei grafici steady-state con stimatore, batch e warm-up usati."""
+        print(f"  - {label} ({scenario}): {results['mean']:.4f} ± {results['half_width']:.4f} "
+              f"[{SteadyStateAnalyzer.describe_ci(results)}]")
+
+    def _save_plot(self, output_dir, filename):
+        """Salva la figura corrente (formato e DPI da config) e la chiude, senza mostrarla."""
+        save_figure(plt.gcf(), output_dir, filename, self.config, tight=False)
+
+    def _warmup_of(self, metric_data):
+        """Fine del transitorio per una serie (timestamp, valore): fissa o rilevata con MSER-5."""
+        warmup = configured_warmup(self.config)
+        return warmup if warmup is not None else detect_warmup(metric_data)
+
+    def _plot_warmup_lines(self, ax, warmups):
+        """Linee di fine warm-up: una sola se coincidono (warm-up fisso), altrimenti una per scenario."""
+        if len(set(warmups.values())) == 1:
+            warmup = next(iter(warmups.values()))
+            ax.axvline(x=warmup, color='k', linestyle=':', linewidth=2.5, label=f'Fine Warm-up ({warmup:.0f}s)')
+            return
+        colors = {'Senza Priorità': 'darkred', 'Con Priorità': 'darkblue'}
+        for scenario, warmup in warmups.items():
+            ax.axvline(x=warmup, color=colors[scenario], linestyle=':', linewidth=2.5,
+                       label=f'Fine Warm-up {scenario} ({warmup:.0f}s)')
+
     def plot_steady_state_loss_ci(self, baseline_results, prio_results, output_dir, filename):
         """
         Crea un grafico a barre che confronta la probabilità di perdita steady-state
@@ -45,10 +75,7 @@ class SteadyStatePlotter:
         ax.bar_label(bars, fmt='%.4f', padding=3)
 
         plt.tight_layout()
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, filename)
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, filename)
 
     def plot_steady_state_times_by_type(self, analyzer_baseline, analyzer_prio, warmup, batches, output_dir):
         """
@@ -66,22 +93,22 @@ class SteadyStatePlotter:
         for metric_name, ax in zip(['response', 'wait'], axes):
             plot_data = []
             for req_type in all_req_types:
+                column = 'response_time' if metric_name == 'response' else 'wait_time'
                 # Dati e analisi per il modello Baseline
-                raw_data_baseline = self.metrics.response_times_history[req_type] if metric_name == 'response' else self.metrics.wait_times_history[req_type]
+                raw_data_baseline = self.metrics.get_completion_series(column, req_type=req_type)
                 ci_baseline = analyzer_baseline.calculate_batch_means_ci(raw_data_baseline, warmup, batches)
                 if ci_baseline:
+                    self._log_ci(f"{column} {req_type.name}", 'Senza Priorità', ci_baseline)
                     plot_data.append({'Categoria': req_type.name.replace('_', ' ').title(), 'Tempo Medio (s)': ci_baseline['mean'],
                                       'Errore': ci_baseline['half_width'], 'Scenario': 'Senza Priorità'})
 
                 # Dati e analisi per il modello con Priorità
-                raw_data_prio = self.metrics_prio.response_times_by_req_type[req_type] if metric_name == 'response' else self.metrics_prio.wait_times_by_req_type[req_type]
-                timestamps_prio = self.metrics_prio.completion_timestamps_by_req_type.get(req_type, [])
-                if len(timestamps_prio) == len(raw_data_prio):
-                    data_with_ts_prio = sorted(zip(timestamps_prio, raw_data_prio), key=lambda x: x[0])
-                    ci_prio = analyzer_prio.calculate_batch_means_ci(data_with_ts_prio, warmup, batches)
-                    if ci_prio:
-                        plot_data.append({'Categoria': req_type.name.replace('_', ' ').title(), 'Tempo Medio (s)': ci_prio['mean'],
-                                          'Errore': ci_prio['half_width'], 'Scenario': 'Con Priorità'})
+                data_with_ts_prio = self.metrics_prio.get_completion_series(column, req_type=req_type)
+                ci_prio = analyzer_prio.calculate_batch_means_ci(data_with_ts_prio, warmup, batches)
+                if ci_prio:
+                    self._log_ci(f"{column} {req_type.name}", 'Con Priorità', ci_prio)
+                    plot_data.append({'Categoria': req_type.name.replace('_', ' ').title(), 'Tempo Medio (s)': ci_prio['mean'],
+                                      'Errore': ci_prio['half_width'], 'Scenario': 'Con Priorità'})
 
             if not plot_data: continue
 
@@ -118,10 +145,7 @@ class SteadyStatePlotter:
         fig.legend(handles, labels, loc='upper right', title='Scenario')
 
         plt.tight_layout(rect=(0, 0, 1, 0.96))
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, "steady_state_times_comparison.png")
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, "steady_state_times_comparison.png")
 
     def plot_steady_state_loss_by_type_ci(self, analyzer_baseline, analyzer_prio, warmup, batches, output_dir):
         """
@@ -142,6 +166,7 @@ class SteadyStatePlotter:
             stream_baseline = self.metrics.get_outcomes_by_type_as_binary_stream(req_type)
             ci_baseline = analyzer_baseline.calculate_batch_means_ci(stream_baseline, warmup, batches)
             if ci_baseline:
+                self._log_ci(f"p_loss {req_type.name}", 'Senza Priorità', ci_baseline)
                 plot_data.append({'Categoria': req_type.name.replace('_', ' ').title(), 'Probabilità di Perdita': ci_baseline['mean'],
                                   'Errore': ci_baseline['half_width'], 'Scenario': 'Senza Priorità'})
 
@@ -149,6 +174,7 @@ class SteadyStatePlotter:
             stream_prio = self.metrics_prio.get_outcomes_by_type_as_binary_stream(req_type)
             ci_prio = analyzer_prio.calculate_batch_means_ci(stream_prio, warmup, batches)
             if ci_prio:
+                self._log_ci(f"p_loss {req_type.name}", 'Con Priorità', ci_prio)
                 plot_data.append({'Categoria': req_type.name.replace('_', ' ').title(), 'Probabilità di Perdita': ci_prio['mean'],
                                   'Errore': ci_prio['half_width'], 'Scenario': 'Con Priorità'})
 
@@ -206,10 +232,7 @@ class SteadyStatePlotter:
         ax.set_ylim(top=max_y_lim * 1.3)
 
         plt.tight_layout(rect=(0, 0, 1, 0.96))
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, "steady_state_loss_by_type_ci.png")
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, "steady_state_loss_by_type_ci.png")
 
 
 
@@ -223,27 +246,17 @@ class SteadyStatePlotter:
         fig, ax = plt.subplots(figsize=(12, 7))
 
         # 1. Itera su ogni tipo di richiesta presente nelle metriche con priorità
-        all_req_types = sorted(self.metrics_prio.response_times_by_req_type.keys(), key=lambda x: x.name)
+        all_req_types = sorted(self.metrics_prio.requests_generated_by_req_type.keys(), key=lambda x: x.name)
 
         for req_type in all_req_types:
-            # 2. Recupera i dati corretti dalla classe MetricsWithPriority
-            response_times = self.metrics_prio.response_times_by_req_type.get(req_type, [])
-            timestamps = self.metrics_prio.completion_timestamps_by_req_type.get(req_type, [])
-
-            # Controlla che i dati siano consistenti
-            if not response_times or len(response_times) != len(timestamps):
+            # 2. Serie cronologica dei tempi di risposta di questo tipo
+            history = self.metrics_prio.get_completion_series('response_time', req_type=req_type)
+            if not history:
                 continue
 
-            # 3. Combina i dati in tuple (timestamp, valore) e ordinali cronologicamente
-            history = sorted(zip(timestamps, response_times), key=lambda x: x[0])
-
-            # Separa di nuovo per il calcolo
-            sorted_timestamps = [t for t, v in history]
-            sorted_values = [v for t, v in history]
-
-            # 4. Calcola e disegna la media cumulativa
-            cumulative_avg = np.cumsum(sorted_values) / np.arange(1, len(sorted_values) + 1)
-            ax.plot(sorted_timestamps, cumulative_avg, label=f'{req_type.name}')
+            # 3. Calcola e disegna la media cumulativa
+            cumulative_avg = np.cumsum(history.values) / np.arange(1, len(history) + 1)
+            ax.plot(*downsample(history.timestamps, cumulative_avg, self.config), label=f'{req_type.name}')
 
         # 5. Estetica del grafico (titoli, etichette, legenda)
         ax.set_title('Analisi della Convergenza per Tipo di Richiesta (Con Priorità)', fontsize=16)
@@ -260,10 +273,7 @@ class SteadyStatePlotter:
             plt.tight_layout()
 
         # Salvataggio
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, "prio_convergence_by_type.png")
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, "prio_convergence_by_type.png")
 
     def plot_convergence_baseline_overall(self, output_dir="plots/transient_analysis"):
         """
@@ -280,13 +290,11 @@ class SteadyStatePlotter:
             return
 
         # 2. Calcola la media cumulativa (CUSUM)
-        timestamps = [t for t, v in all_responses]
-        values = [v for t, v in all_responses]
-        cumulative_avg = np.cumsum(values) / np.arange(1, len(values) + 1)
+        cumulative_avg = np.cumsum(all_responses.values) / np.arange(1, len(all_responses) + 1)
 
         # 3. Disegna il grafico
         fig, ax = plt.subplots(figsize=(12, 7))
-        ax.plot(timestamps, cumulative_avg, color='r', label='Tempo Risposta Medio Cumulativo')
+        ax.plot(*downsample(all_responses.timestamps, cumulative_avg, self.config), color='r', label='Tempo Risposta Medio Cumulativo')
 
         # Estetica
         ax.set_title('Analisi della Convergenza del Tempo di Risposta Medio (Baseline)', fontsize=16)
@@ -301,10 +309,7 @@ class SteadyStatePlotter:
         ax.legend()
 
         plt.tight_layout()
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, "baseline_convergence_overall.png")
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, "baseline_convergence_overall.png")
 
         # Aggiungi questo metodo alla classe Plotter
 
@@ -318,18 +323,15 @@ class SteadyStatePlotter:
         fig, ax = plt.subplots(figsize=(12, 7))
 
         # Itera su ogni tipo di richiesta presente nelle metriche
-        for req_type, history in self.metrics.response_times_history.items():
+        for req_type in self.metrics.requests_generated_data:
+            # Serie cronologica dei tempi di risposta di questo tipo
+            history = self.metrics.get_completion_series('response_time', req_type=req_type)
             if not history:
                 continue
 
-            # Ordina i dati per questo tipo di richiesta
-            history.sort(key=lambda x: x[0])
-            timestamps = [t for t, v in history]
-            values = [v for t, v in history]
-
             # Calcola e disegna la media cumulativa
-            cumulative_avg = np.cumsum(values) / np.arange(1, len(values) + 1)
-            ax.plot(timestamps, cumulative_avg, label=f'{req_type.name}')
+            cumulative_avg = np.cumsum(history.values) / np.arange(1, len(history) + 1)
+            ax.plot(*downsample(history.timestamps, cumulative_avg, self.config), label=f'{req_type.name}')
 
         # Estetica
         ax.set_title('Analisi della Convergenza per Tipo di Richiesta (Baseline)', fontsize=16)
@@ -339,10 +341,7 @@ class SteadyStatePlotter:
         ax.legend(title='Tipo di Richiesta')
 
         plt.tight_layout()
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, "baseline_convergence_by_type.png")
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, "baseline_convergence_by_type.png")
 
     def plot_wait_time_comparison_trend(self, output_dir="plots/comparison"):
         """
@@ -354,28 +353,16 @@ class SteadyStatePlotter:
         fig, ax = plt.subplots(figsize=(12, 7))
 
         # 1. Dati e curva per la Baseline
-        all_waits_baseline = []
-        for history in self.metrics.wait_times_history.values():
-            all_waits_baseline.extend(history)
-        all_waits_baseline.sort(key=lambda x: x[0])
-
+        all_waits_baseline = self.metrics.get_completion_series('wait_time')
         if all_waits_baseline:
-            times_b, values_b = zip(*all_waits_baseline)
-            cusum_b = np.cumsum(values_b) / np.arange(1, len(values_b) + 1)
-            ax.plot(times_b, cusum_b, color='r', label='Senza Priorità')
+            cusum_b = np.cumsum(all_waits_baseline.values) / np.arange(1, len(all_waits_baseline) + 1)
+            ax.plot(*downsample(all_waits_baseline.timestamps, cusum_b, self.config), color='r', label='Senza Priorità')
 
         # 2. Dati e curva per lo scenario con Priorità
-        all_waits_prio = []
-        for prio, history in self.metrics_prio.wait_times_by_priority.items():
-            timestamps = self.metrics_prio.completion_timestamps_by_priority[prio]
-            if len(timestamps) == len(history):
-                all_waits_prio.extend(zip(timestamps, history))
-        all_waits_prio.sort(key=lambda x: x[0])
-
+        all_waits_prio = self.metrics_prio.get_completion_series('wait_time')
         if all_waits_prio:
-            times_p, values_p = zip(*all_waits_prio)
-            cusum_p = np.cumsum(values_p) / np.arange(1, len(values_p) + 1)
-            ax.plot(times_p, cusum_p, color='b', label='Con Priorità')
+            cusum_p = np.cumsum(all_waits_prio.values) / np.arange(1, len(all_waits_prio) + 1)
+            ax.plot(*downsample(all_waits_prio.timestamps, cusum_p, self.config), color='b', label='Con Priorità')
 
         # Estetica
         ax.set_title('Confronto Evoluzione del Tempo di Attesa Medio', fontsize=16)
@@ -385,10 +372,7 @@ class SteadyStatePlotter:
         ax.legend(title='Scenario')
 
         plt.tight_layout()
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, "wait_time_trend_comparison.png")
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, "wait_time_trend_comparison.png")
 
     def plot_times_by_request_type_grid(self, output_dir="plots/comparison"):
         """
@@ -411,38 +395,16 @@ class SteadyStatePlotter:
         for i, req_type in enumerate(all_req_types):
             ax = axes[i]
 
-            # --- Dati Baseline ---
-            # Tempo di risposta
-            resp_b = sorted(self.metrics.response_times_history.get(req_type, []), key=lambda x: x[0])
-            if resp_b:
-                times_rb, values_rb = zip(*resp_b)
-                ax.plot(times_rb, np.cumsum(values_rb) / np.arange(1, len(values_rb)+1),
-                        color='salmon', linestyle='--', label='Risposta (Baseline)')
-
-            # Tempo di attesa
-            wait_b = sorted(self.metrics.wait_times_history.get(req_type, []), key=lambda x: x[0])
-            if wait_b:
-                times_wb, values_wb = zip(*wait_b)
-                ax.plot(times_wb, np.cumsum(values_wb) / np.arange(1, len(values_wb)+1),
-                        color='red', label='Attesa (Baseline)')
-
-            # --- Dati con Priorità ---
-            # Tempo di risposta
-            times_rp = self.metrics_prio.completion_timestamps_by_req_type.get(req_type, [])
-            values_rp = self.metrics_prio.response_times_by_req_type.get(req_type, [])
-            if times_rp and len(times_rp) == len(values_rp):
-                resp_p = sorted(zip(times_rp, values_rp), key=lambda x: x[0])
-                times_rp, values_rp = zip(*resp_p)
-                ax.plot(times_rp, np.cumsum(values_rp) / np.arange(1, len(values_rp)+1),
-                        color='lightblue', linestyle='--', label='Risposta (Priorità)')
-
-            # Tempo di attesa
-            values_wp = self.metrics_prio.wait_times_by_req_type.get(req_type, [])
-            if times_rp and len(times_rp) == len(values_wp):
-                wait_p = sorted(zip(times_rp, values_wp), key=lambda x: x[0])
-                times_wp, values_wp = zip(*wait_p)
-                ax.plot(times_wp, np.cumsum(values_wp) / np.arange(1, len(values_wp)+1),
-                        color='blue', label='Attesa (Priorità)')
+            # (metriche, colonna, stile della curva)
+            curves = [(self.metrics, 'response_time', dict(color='salmon', linestyle='--', label='Risposta (Baseline)')),
+                      (self.metrics, 'wait_time', dict(color='red', label='Attesa (Baseline)')),
+                      (self.metrics_prio, 'response_time', dict(color='lightblue', linestyle='--', label='Risposta (Priorità)')),
+                      (self.metrics_prio, 'wait_time', dict(color='blue', label='Attesa (Priorità)'))]
+            for metrics, column, style in curves:
+                history = metrics.get_completion_series(column, req_type=req_type)
+                if history:
+                    cumulative_avg = np.cumsum(history.values) / np.arange(1, len(history) + 1)
+                    ax.plot(*downsample(history.timestamps, cumulative_avg, self.config), **style)
 
             ax.set_title(req_type.name.replace('_', ' ').title())
             ax.grid(True, linestyle='--', alpha=0.6)
@@ -456,12 +418,48 @@ class SteadyStatePlotter:
         fig.supylabel('Tempo Medio Cumulativo (s)', x=0.02)
 
         plt.tight_layout(rect=(0.03, 0.03, 1, 0.95))
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, "times_grid_comparison.png")
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, "times_grid_comparison.png")
         # Incolla questi metodi dentro la classe SteadyStatePlotter
 
+    def plot_latency_percentiles_by_type(self, output_dir="plots/comparison", filename="latency_percentiles_by_type.png"):
+        """
+        Profilo dei percentili del tempo di risposta per tipo di richiesta: per ogni
+        scenario un segmento dal percentile più basso al più alto configurato, con un
+        marcatore per ciascun percentile (istogrammi logaritmici dell'intero run).
+        """
+        print("Generazione grafico dei percentili del tempo di risposta per tipo...")
+        percentiles = sorted(self.config.LATENCY_PERCENTILES)
+        req_types = sorted(RequestType, key=lambda e: e.name)
+        markers = ['o', 's', '^', 'D', 'v', 'P']
+
+        fig, ax = plt.subplots(figsize=(12, 7))
+        scenarios = [(self.metrics, -0.15, 'r', 'Senza Priorità'), (self.metrics_prio, 0.15, 'b', 'Con Priorità')]
+        for metrics, offset, color, scenario in scenarios:
+            for i, req_type in enumerate(req_types):
+                histogram = metrics.latency_histograms.histogram('response_time', req_type)
+                if not histogram.count:
+                    continue
+                values = histogram.percentiles(percentiles)
+                ax.vlines(i + offset, values[percentiles[0]], values[percentiles[-1]], color=color, linewidth=2,
+                          label=scenario if i == 0 else None)
+                for q, marker in zip(percentiles, markers):
+                    ax.plot(i + offset, values[q], marker=marker, color=color, linestyle='none', markersize=8)
+        # Legenda dei marcatori, in grigio perché valgono per entrambi gli scenari
+        for q, marker in zip(percentiles, markers):
+            ax.plot([], [], marker=marker, color='gray', linestyle='none', markersize=8, label=percentile_label(q))
+
+        ax.set_xticks(range(len(req_types)))
+        ax.set_xticklabels([req_type.name.replace('_', ' ').title() for req_type in req_types])
+        ax.set_yscale('log')
+        ax.set_title('Percentili del Tempo di Risposta per Tipo di Richiesta', fontsize=16)
+        ax.set_xlabel('Tipo di Richiesta')
+        ax.set_ylabel('Tempo di Risposta (s, scala log)')
+        ax.grid(True, which='both', linestyle='--', alpha=0.6)
+        ax.legend()
+
+        plt.tight_layout()
+        self._save_plot(output_dir, filename)
+
     def plot_pod_history_steady_state(self, output_dir, filename="ss_pod_history.png"):
         """
         Plotta l'evoluzione del numero di Pod nel tempo per la simulazione steady-state.
@@ -470,18 +468,21 @@ class SteadyStatePlotter:
         print("Generazione grafico storico dei Pod (Steady-State)...")
         fig, ax = plt.subplots(figsize=(14, 7))
 
+        warmups = {}
         # Scenario Baseline
-        if self.metrics.pod_count_history:
-            times_b, pods_b = zip(*self.metrics.pod_count_history)
-            ax.plot(times_b, pods_b, color='r', label='Senza Priorità', alpha=0.8, linewidth=1.5)
+        pod_history_b = self.metrics.get_system_series('pod_count')
+        if pod_history_b:
+            ax.plot(*downsample(pod_history_b.timestamps, pod_history_b.values, self.config), color='r', label='Senza Priorità', alpha=0.8, linewidth=1.5)
+            warmups['Senza Priorità'] = self._warmup_of(pod_history_b)
 
         # Scenario con Priorità
-        if self.metrics_prio.pod_counts:
-            ax.plot(self.metrics_prio.timestamps, self.metrics_prio.pod_counts, color='b', label='Con Priorità', alpha=0.8, linewidth=1.5)
+        pod_history_p = self.metrics_prio.get_system_series('pod_count')
+        if pod_history_p:
+            ax.plot(*downsample(pod_history_p.timestamps, pod_history_p.values, self.config), color='b', label='Con Priorità', alpha=0.8, linewidth=1.5)
+            warmups['Con Priorità'] = self._warmup_of(pod_history_p)
 
         # Aggiungi una linea verticale per indicare il warm-up period
-        warmup = self.config.WARM_UP_TO_STEADY
-        ax.axvline(x=warmup, color='k', linestyle=':', linewidth=2.5, label=f'Fine Warm-up ({warmup}s)')
+        self._plot_warmup_lines(ax, warmups)
 
         ax.set_title('Evoluzione del Numero di Pod (Simulazione Lunga)', fontsize=16)
         ax.set_xlabel('Tempo di Simulazione (s)')
@@ -491,10 +492,7 @@ class SteadyStatePlotter:
         ax.grid(True, which='both', linestyle='--', alpha=0.6)
 
         plt.tight_layout()
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, filename)
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, filename)
 
     def plot_queue_history_steady_state(self, output_dir, filename="ss_queue_history.png"):
         """
@@ -503,26 +501,29 @@ class SteadyStatePlotter:
         print("Generazione grafico storico della Coda (Steady-State)...")
         fig, ax = plt.subplots(figsize=(14, 7))
 
+        warmups = {}
         # Scenario Baseline
-        if self.metrics.queue_length_history:
-            times_b, queue_b = zip(*self.metrics.queue_length_history)
-            ax.plot(times_b, queue_b, color='r', label='Senza Priorità', alpha=0.7, linewidth=1.5)
+        queue_history_b = self.metrics.get_system_series('queue_length')
+        if queue_history_b:
+            ax.plot(*downsample(queue_history_b.timestamps, queue_history_b.values, self.config), color='r', label='Senza Priorità', alpha=0.7, linewidth=1.5)
             # Media dopo il warm-up
-            steady_queue_b = [q for t, q in self.metrics.queue_length_history if t >= self.config.WARM_UP_TO_STEADY]
-            if steady_queue_b:
+            warmups['Senza Priorità'] = self._warmup_of(queue_history_b)
+            steady_queue_b = queue_history_b.values[queue_history_b.timestamps >= warmups['Senza Priorità']]
+            if len(steady_queue_b):
                 ax.axhline(np.mean(steady_queue_b), color='darkred', linestyle='--', label=f'Media Steady-State (Baseline): {np.mean(steady_queue_b):.2f}')
 
 
         # Scenario con Priorità
-        if self.metrics_prio.queue_lengths:
-            ax.plot(self.metrics_prio.timestamps, self.metrics_prio.queue_lengths, color='b', label='Con Priorità', alpha=0.7, linewidth=1.5)
+        queue_history_p = self.metrics_prio.get_system_series('queue_length')
+        if queue_history_p:
+            ax.plot(*downsample(queue_history_p.timestamps, queue_history_p.values, self.config), color='b', label='Con Priorità', alpha=0.7, linewidth=1.5)
             # Media dopo il warm-up
-            steady_queue_p = [q for t, q in zip(self.metrics_prio.timestamps, self.metrics_prio.queue_lengths) if t >= self.config.WARM_UP_TO_STEADY]
-            if steady_queue_p:
+            warmups['Con Priorità'] = self._warmup_of(queue_history_p)
+            steady_queue_p = queue_history_p.values[queue_history_p.timestamps >= warmups['Con Priorità']]
+            if len(steady_queue_p):
                 ax.axhline(np.mean(steady_queue_p), color='darkblue', linestyle='--', label=f'Media Steady-State (Priorità): {np.mean(steady_queue_p):.2f}')
 
-        warmup = self.config.WARM_UP_TO_STEADY
-        ax.axvline(x=warmup, color='k', linestyle=':', linewidth=2.5, label=f'Fine Warm-up ({warmup}s)')
+        self._plot_warmup_lines(ax, warmups)
 
         ax.set_title('Evoluzione della Lunghezza della Coda (Simulazione Lunga)', fontsize=16)
         ax.set_xlabel('Tempo di Simulazione (s)')
@@ -531,10 +532,7 @@ class SteadyStatePlotter:
         ax.grid(True, which='both', linestyle='--', alpha=0.6)
 
         plt.tight_layout()
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, filename)
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, filename)
 
     def plot_convergence_comparison_overall(self, output_dir, filename="ss_overall_convergence.png"):
         """
@@ -544,22 +542,22 @@ class SteadyStatePlotter:
         print("Generazione grafico di confronto convergenza generale...")
         fig, ax = plt.subplots(figsize=(14, 7))
 
+        warmups = {}
         # Dati Baseline
         all_responses_b = self.metrics.get_all_response_times_with_timestamps()
         if all_responses_b:
-            times_b, values_b = zip(*all_responses_b)
-            cusum_b = np.cumsum(values_b) / np.arange(1, len(values_b) + 1)
-            ax.plot(times_b, cusum_b, color='r', label='Senza Priorità', linewidth=2)
+            cusum_b = np.cumsum(all_responses_b.values) / np.arange(1, len(all_responses_b) + 1)
+            ax.plot(*downsample(all_responses_b.timestamps, cusum_b, self.config), color='r', label='Senza Priorità', linewidth=2)
+            warmups['Senza Priorità'] = self._warmup_of(all_responses_b)
 
         # Dati Priorità
         all_responses_p = self.metrics_prio.get_all_response_times_with_timestamps()
         if all_responses_p:
-            times_p, values_p = zip(*all_responses_p)
-            cusum_p = np.cumsum(values_p) / np.arange(1, len(values_p) + 1)
-            ax.plot(times_p, cusum_p, color='b', label='Con Priorità', linewidth=2)
+            cusum_p = np.cumsum(all_responses_p.values) / np.arange(1, len(all_responses_p) + 1)
+            ax.plot(*downsample(all_responses_p.timestamps, cusum_p, self.config), color='b', label='Con Priorità', linewidth=2)
+            warmups['Con Priorità'] = self._warmup_of(all_responses_p)
 
-        warmup = self.config.WARM_UP_TO_STEADY
-        ax.axvline(x=warmup, color='k', linestyle=':', linewidth=2.5, label=f'Fine Warm-up ({warmup}s)')
+        self._plot_warmup_lines(ax, warmups)
 
         ax.set_title('Confronto Convergenza del Tempo di Risposta Medio Totale', fontsize=16)
         ax.set_xlabel('Tempo di Simulazione (s)')
@@ -568,10 +566,7 @@ class SteadyStatePlotter:
         ax.grid(True, which='both', linestyle='--', alpha=0.6)
 
         plt.tight_layout()
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, filename)
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, filename)
 
     def plot_variance_trend(self, output_dir, filename="ss_variance_trend.png"):
         """
@@ -585,20 +580,22 @@ class SteadyStatePlotter:
         # Dati Baseline
         all_responses_b = self.metrics.get_all_response_times_with_timestamps()
         if len(all_responses_b) > window_size:
-            times_b, values_b = zip(*all_responses_b)
             # Calcola la deviazione standard mobile usando pandas per semplicità
-            moving_std_b = pd.Series(values_b).rolling(window=window_size).std()
-            ax.plot(times_b[window_size-1:], moving_std_b[window_size-1:], color='r', label='Senza Priorità', alpha=0.8)
+            moving_std_b = pd.Series(all_responses_b.values).rolling(window=window_size).std()
+            ax.plot(*downsample(all_responses_b.timestamps[window_size-1:], moving_std_b[window_size-1:], self.config), color='r', label='Senza Priorità', alpha=0.8)
 
         # Dati Priorità
         all_responses_p = self.metrics_prio.get_all_response_times_with_timestamps()
         if len(all_responses_p) > window_size:
-            times_p, values_p = zip(*all_responses_p)
-            moving_std_p = pd.Series(values_p).rolling(window=window_size).std()
-            ax.plot(times_p[window_size-1:], moving_std_p[window_size-1:], color='b', label='Con Priorità', alpha=0.8)
+            moving_std_p = pd.Series(all_responses_p.values).rolling(window=window_size).std()
+            ax.plot(*downsample(all_responses_p.timestamps[window_size-1:], moving_std_p[window_size-1:], self.config), color='b', label='Con Priorità', alpha=0.8)
 
-        warmup = self.config.WARM_UP_TO_STEADY
-        ax.axvline(x=warmup, color='k', linestyle=':', linewidth=2.5, label=f'Fine Warm-up ({warmup}s)')
+        warmups = {}
+        if all_responses_b:
+            warmups['Senza Priorità'] = self._warmup_of(all_responses_b)
+        if all_responses_p:
+            warmups['Con Priorità'] = self._warmup_of(all_responses_p)
+        self._plot_warmup_lines(ax, warmups)
 
         ax.set_title(f'Stabilizzazione della Variabilità (Dev. Std. su Finestra Mobile di {window_size} campioni)', fontsize=16)
         ax.set_xlabel('Tempo di Simulazione (s)')
@@ -608,10 +605,7 @@ class SteadyStatePlotter:
         ax.set_ylim(bottom=0) # La deviazione standard non può essere negativa
 
         plt.tight_layout()
-        os.makedirs(output_dir, exist_ok=True)
-        save_path = os.path.join(output_dir, filename)
-        plt.savefig(save_path, dpi=300)
-        plt.show()
+        self._save_plot(output_dir, filename)
 
 
     def generate_steady_state_report(self, analyzer_baseline, analyzer_prio, warmup, batches, output_dir="plots/steady_state"):
@@ -621,22 +615,33 @@ class SteadyStatePlotter:
         """
         print(f"\n--- Generazione Report Completo Steady-State in '{output_dir}' ---")
 
-        # --- SEZIONE 1: Analisi del Transitorio e Convergenza ---
+        # I grafici sono indipendenti: ognuno viene disegnato in un processo del pool
         transient_output_dir = os.path.join(output_dir, "transient_analysis")
-        print(f"\n--- 1. Analisi del Transitorio (output in '{transient_output_dir}') ---")
-        self.plot_pod_history_steady_state(transient_output_dir)
-        self.plot_queue_history_steady_state(transient_output_dir)
-        self.plot_convergence_comparison_overall(transient_output_dir)
-        self.plot_variance_trend(transient_output_dir)
-        # I grafici di convergenza per tipo sono ancora utili
-        self.plot_convergence_baseline_by_type(transient_output_dir)
-        self.plot_convergence_prio_by_type(transient_output_dir)
-
-
-        # --- SEZIONE 2: Stime a Regime Permanente (Batch Means) ---
-        print(f"\n--- 2. Stime a Regime Permanente (output in '{output_dir}') ---")
-
-        # Calcolo e plot della P_loss aggregata
+        comparison_output_dir = os.path.join(output_dir, "comparison")
+        jobs = [
+            # --- SEZIONE 1: Analisi del Transitorio e Convergenza ---
+            functools.partial(self.plot_pod_history_steady_state, transient_output_dir),
+            functools.partial(self.plot_queue_history_steady_state, transient_output_dir),
+            functools.partial(self.plot_convergence_comparison_overall, transient_output_dir),
+            functools.partial(self.plot_variance_trend, transient_output_dir),
+            # I grafici di convergenza per tipo sono ancora utili
+            functools.partial(self.plot_convergence_baseline_by_type, transient_output_dir),
+            functools.partial(self.plot_convergence_prio_by_type, transient_output_dir),
+            # --- SEZIONE 2: Stime a Regime Permanente (Batch Means) ---
+            functools.partial(self._plot_overall_loss_ci, analyzer_baseline, analyzer_prio, warmup, batches, output_dir),
+            functools.partial(self.plot_steady_state_times_by_type, analyzer_baseline, analyzer_prio, warmup, batches, output_dir),
+            functools.partial(self.plot_steady_state_loss_by_type_ci, analyzer_baseline, analyzer_prio, warmup, batches, output_dir),
+            # --- SEZIONE 3: Confronti Aggiuntivi ---
+            functools.partial(self.plot_wait_time_comparison_trend, output_dir=comparison_output_dir),
+            functools.partial(self.plot_times_by_request_type_grid, output_dir=comparison_output_dir),
+            functools.partial(self.plot_latency_percentiles_by_type, output_dir=comparison_output_dir),
+        ]
+        print(f"Transitorio in '{transient_output_dir}', stime a regime in '{output_dir}', "
+              f"confronti in '{comparison_output_dir}'")
+        render_figures(jobs, self.config.PLOT_WORKERS)
+
+    def _plot_overall_loss_ci(self, analyzer_baseline, analyzer_prio, warmup, batches, output_dir):
+        """Calcolo e plot della P_loss aggregata (Batch Means) dei due scenari."""
         all_outcomes_baseline = self.metrics.get_all_outcomes_as_binary_stream()
         baseline_loss_results = analyzer_baseline.calculate_batch_means_ci(all_outcomes_baseline, warmup, batches) if all_outcomes_baseline else None
 
@@ -644,15 +649,6 @@ class SteadyStatePlotter:
         prio_loss_results = analyzer_prio.calculate_batch_means_ci(all_outcomes_prio, warmup, batches) if all_outcomes_prio else None
 
         if baseline_loss_results and prio_loss_results:
+            self._log_ci("p_loss", 'Senza Priorità', baseline_loss_results)
+            self._log_ci("p_loss", 'Con Priorità', prio_loss_results)
             self.plot_steady_state_loss_ci(baseline_loss_results, prio_loss_results, output_dir, "ss_1_overall_loss_ci.png")
-
-        # Plot dei tempi e delle perdite per tipo
-        self.plot_steady_state_times_by_type(analyzer_baseline, analyzer_prio, warmup, batches, output_dir)
-        self.plot_steady_state_loss_by_type_ci(analyzer_baseline, analyzer_prio, warmup, batches, output_dir)
-
-
-        # --- SEZIONE 3: Confronti Aggiuntivi ---
-        comparison_output_dir = os.path.join(output_dir, "comparison")
-        print(f"\n--- 3. Confronti Aggiuntivi (output in '{comparison_output_dir}') ---")
-        self.plot_wait_time_comparison_trend(output_dir=comparison_output_dir)
-        self.plot_times_by_request_type_grid(output_dir=comparison_output_dir)
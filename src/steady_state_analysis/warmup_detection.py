@@ -0,0 +1,63 @@
+# src/steady_state_analysis/warmup_detection.py - RILEVAMENTO AUTOMATICO DEL TRANSITORIO (MSER-5)
+
+import numpy as np
+
+from src.utils.columnar_store import TimeSeries
+
+WARM_UP_DETECTION_METHODS = ("mser5",)
+
+
+def configured_warmup(config):
+    """
+    Warm-up da passare all'analisi: None se va rilevato per ogni metrica
+    (config.WARM_UP_DETECTION), altrimenti il valore fisso WARM_UP_TO_STEADY.
+    """
+    method = config.WARM_UP_DETECTION
+    if method is None:
+        return config.WARM_UP_TO_STEADY
+    if method not in WARM_UP_DETECTION_METHODS:
+        raise ValueError(f"Metodo di rilevamento del warm-up '{method}' non supportato. "
+                         f"Valori ammessi: {list(WARM_UP_DETECTION_METHODS)} o None")
+    return None
+
+
+def mser_truncation_index(values, batch_size=5, max_fraction=0.5):
+    """
+    Punto di troncamento MSER-m (m = batch_size, MSER-5 di default).
+
+    Le osservazioni vengono raggruppate in batch di m valori; per ogni possibile
+    troncamento d (in batch) si calcola MSER(d) = SSE(d) / (k - d)^2, con SSE(d) la
+    somma degli scarti quadratici delle medie dei batch successivi a d dalla loro media.
+    Tutti i valori di MSER(d) si ottengono in un solo passaggio vettoriale dalle somme
+    cumulate a ritroso. Come d'uso, d è cercato solo nella prima metà della serie
+    (max_fraction), altrimenti la coda di pochi batch avrebbe sempre MSER minimo.
+
+    Returns:
+        int: Numero di osservazioni iniziali da scartare (multiplo di batch_size).
+    """
+    values = np.asarray(values, dtype=float)
+    num_batches = len(values) // batch_size
+    if num_batches < 2:
+        return 0
+
+    batch_means = values[:num_batches * batch_size].reshape(num_batches, batch_size).mean(axis=1)
+    batch_means -= batch_means.mean()   # SSE non cambia, ma si evita la cancellazione numerica
+    suffix_sum = np.cumsum(batch_means[::-1])[::-1]
+    suffix_sum_sq = np.cumsum((batch_means ** 2)[::-1])[::-1]
+    remaining = np.arange(num_batches, 0, -1, dtype=float)
+    mser = (suffix_sum_sq - suffix_sum ** 2 / remaining) / remaining ** 2
+
+    max_truncation = int(num_batches * max_fraction)
+    return int(np.argmin(mser[:max_truncation + 1])) * batch_size
+
+
+def detect_warmup(metric_data, batch_size=5):
+    """
+    Fine del transitorio di una serie (timestamp, valore) in ordine cronologico:
+    il timestamp della prima osservazione mantenuta da MSER-5 (0 se la serie è vuota).
+    """
+    series = TimeSeries.from_pairs(metric_data)
+    if not series:
+        return 0.0
+    truncation = mser_truncation_index(series.values, batch_size)
+    return float(series.timestamps[truncation])
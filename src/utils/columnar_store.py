@@ -0,0 +1,321 @@
+# src/utils/columnar_store.py - ARCHIVIO COLONNARE DELLE METRICHE (ARRAY NUMPY TIPIZZATI)
+
+from collections import defaultdict
+
+import numpy as np
+
+from src.config import RequestType
+
+# Tipo di richiesta e priorità sono salvati come codici interi in colonne int8
+REQ_TYPES = tuple(RequestType)
+REQ_TYPE_CODES = {req_type: code for code, req_type in enumerate(REQ_TYPES)}
+NO_PRIORITY = -1    # Simulazione baseline: nessuna classe di priorità
+
+
+class TypeCounts:
+    """
+    Contatori per tipo di richiesta indicizzati per codice (REQ_TYPE_CODES): l'incremento
+    a ogni richiesta è un accesso a lista invece dell'hash di un enum. as_dict() restituisce
+    la vista {RequestType: conteggio} dei vecchi defaultdict, con i tipi nell'ordine del
+    loro primo conteggio.
+    """
+    __slots__ = ('counts', 'order')
+
+    def __init__(self):
+        self.counts = [0] * len(REQ_TYPES)
+        self.order = []     # Codici nell'ordine del primo conteggio
+
+    def add(self, code):
+        counts = self.counts
+        if not counts[code]:
+            self.order.append(code)
+        counts[code] += 1
+
+    def as_dict(self):
+        counts = self.counts
+        return defaultdict(int, {REQ_TYPES[code]: counts[code] for code in self.order})
+
+COMPLETION_COLUMNS = {"timestamp": np.float64, "response_time": np.float64, "wait_time": np.float64,
+                      "req_type": np.int8, "priority": np.int8}
+EVENT_COLUMNS = {"timestamp": np.float64, "req_type": np.int8, "priority": np.int8}   # Generazioni e timeout
+SYSTEM_COLUMNS = {"timestamp": np.float64, "pod_count": np.int32, "queue_length": np.int32}
+PRIORITY_QUEUE_COLUMNS = {"timestamp": np.float64, "priority": np.int8, "queue_length": np.int32}
+
+
+class TimeSeries:
+    """
+    Serie (timestamp, valore) come due array NumPy allineati. Sostituisce le liste di
+    tuple: l'analisi legge direttamente gli array, mentre iterazione, len() e indici
+    continuano a restituire tuple (timestamp, valore) per il codice che le usa ancora.
+    """
+    __slots__ = ("timestamps", "values")
+
+    def __init__(self, timestamps, values):
+        self.timestamps = timestamps
+        self.values = values
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty(0), np.empty(0))
+
+    @classmethod
+    def from_pairs(cls, metric_data):
+        """Converte una lista di tuple (timestamp, valore); una TimeSeries viene restituita così com'è."""
+        if isinstance(metric_data, cls):
+            return metric_data
+        if not metric_data:
+            return cls.empty()
+        timestamps, values = zip(*metric_data)
+        return cls(np.asarray(timestamps, dtype=float), np.asarray(values))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __bool__(self):
+        return len(self.values) > 0
+
+    def __iter__(self):
+        return zip(self.timestamps.tolist(), self.values.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TimeSeries(self.timestamps[index], self.values[index])
+        return self.timestamps[index].item(), self.values[index].item()
+
+    def sorted(self):
+        """La stessa serie in ordine cronologico (ordinamento stabile, solo se serve)."""
+        timestamps = self.timestamps
+        if len(timestamps) < 2 or not np.any(timestamps[1:] < timestamps[:-1]):
+            return self
+        order = np.argsort(timestamps, kind="stable")
+        return TimeSeries(timestamps[order], self.values[order])
+
+    @classmethod
+    def concatenate(cls, series_list):
+        """Unisce più serie e ordina il risultato per timestamp (a parità, nell'ordine delle serie)."""
+        return cls(np.concatenate([s.timestamps for s in series_list]),
+                   np.concatenate([s.values for s in series_list])).sorted()
+
+
+class ColumnarStore:
+    """
+    Tabella a colonne tipizzate che cresce per append. Le righe vengono accumulate in un
+    piccolo buffer e copiate negli array a blocchi di chunk_size, raddoppiando la capacità
+    quando serve, così l'append resta O(1) ammortizzato. column() restituisce una vista
+    sugli array senza copie.
+    """
+
+    def __init__(self, columns, chunk_size=4096):
+        self.dtypes = dict(columns)
+        self.chunk_size = chunk_size
+        self._arrays = {name: np.empty(chunk_size, dtype=dtype) for name, dtype in self.dtypes.items()}
+        self._size = 0
+        self._pending = []
+        self._index = None
+
+    @classmethod
+    def from_arrays(cls, columns, arrays, chunk_size=4096):
+        """Archivio con le righe già in colonna 'arrays' (stessa lunghezza, nell'ordine di columns)."""
+        store = cls(columns, chunk_size)
+        store.extend(*arrays)
+        return store
+
+    def __len__(self):
+        return self._size + len(self._pending)
+
+    def append(self, row):
+        """Aggiunge una riga: tupla di valori nell'ordine delle colonne."""
+        pending = self._pending
+        pending.append(row)
+        if len(pending) >= self.chunk_size:
+            self._flush()
+
+    def extend(self, *columns):
+        """Aggiunge un blocco di righe già in colonna: un array per colonna, nell'ordine delle colonne."""
+        self._flush()
+        start, end = self._size, self._size + len(columns[0])
+        self._reserve(end)
+        for array, values in zip(self._arrays.values(), columns):
+            array[start:end] = values
+        self._size = end
+
+    def _reserve(self, end):
+        capacity = len(next(iter(self._arrays.values())))
+        if end > capacity:
+            new_capacity = max(end, 2 * capacity)
+            for name, array in self._arrays.items():
+                grown = np.empty(new_capacity, dtype=array.dtype)
+                grown[:self._size] = array[:self._size]
+                self._arrays[name] = grown
+
+    def _flush(self):
+        pending = self._pending
+        if not pending:
+            return
+        start, end = self._size, self._size + len(pending)
+        self._reserve(end)
+        block = np.array(pending, dtype=np.float64)
+        for i, array in enumerate(self._arrays.values()):
+            array[start:end] = block[:, i]
+        self._size = end
+        pending.clear()
+
+    def column(self, name):
+        """Vista (senza copia) sui valori della colonna."""
+        self._flush()
+        return self._arrays[name][:self._size]
+
+    def mask(self, **codes):
+        """Maschera delle righe con colonna == codice per ogni filtro (None = nessun filtro)."""
+        mask = None
+        for name, code in codes.items():
+            if code is None:
+                continue
+            condition = self.column(name) == code
+            mask = condition if mask is None else mask & condition
+        return mask
+
+    def select(self, name, **codes):
+        """Valori della colonna, filtrati per codici (vista se non ci sono filtri)."""
+        column = self.column(name)
+        mask = self.mask(**codes)
+        return column if mask is None else column[mask]
+
+    def series(self, value_column, **codes):
+        """TimeSeries (timestamp, value_column) delle righe selezionate, nell'ordine di registrazione."""
+        mask = self.mask(**codes)
+        timestamps, values = self.column("timestamp"), self.column(value_column)
+        if mask is None:
+            return TimeSeries(timestamps, values)
+        return TimeSeries(timestamps[mask], values[mask])
+
+    def present_codes(self, name):
+        """Codici presenti nella colonna, nell'ordine della loro prima apparizione."""
+        codes, first_index = np.unique(self.column(name), return_index=True)
+        return codes[np.argsort(first_index)].tolist()
+
+    def values_by(self, key_column, value_column, decode):
+        """{chiave: array dei valori} per ogni codice presente; chiavi assenti -> array vuoto."""
+        result = defaultdict(lambda: np.empty(0))
+        for code in self.present_codes(key_column):
+            result[decode(code)] = self.select(value_column, **{key_column: code})
+        return result
+
+    def series_by(self, key_column, value_column, decode):
+        """{chiave: TimeSeries} per ogni codice presente; chiavi assenti -> serie vuota."""
+        result = defaultdict(TimeSeries.empty)
+        for code in self.present_codes(key_column):
+            result[decode(code)] = self.series(value_column, **{key_column: code})
+        return result
+
+    def index(self):
+        """
+        SeriesIndex delle righe registrate finora, costruito alla prima chiamata e
+        ricostruito solo se nel frattempo sono state aggiunte righe.
+        """
+        self._flush()
+        if self._index is None or len(self._index) != self._size:
+            self._index = SeriesIndex({name: self.column(name) for name in self.dtypes})
+        return self._index
+
+    def __getstate__(self):
+        # Si salvano solo le righe occupate, non la capacità libera né l'indice
+        self._flush()
+        state = self.__dict__.copy()
+        state["_arrays"] = {name: array[:self._size].copy() for name, array in self._arrays.items()}
+        state["_pending"] = []
+        state["_index"] = None
+        return state
+
+
+def decode_req_type(code):
+    return REQ_TYPES[code]
+
+
+class SeriesIndex:
+    """
+    Indice in sola lettura di un insieme di colonne allineate: le righe vengono ordinate
+    una volta per timestamp (ordinamento stabile) e, per ogni colonna di codici usata
+    come filtro, raggruppate una volta per codice mantenendo l'ordine cronologico.
+    Da quel momento la serie complessiva e quella di un singolo codice sono viste
+    (slice) sugli array, senza maschere né ordinamenti.
+    """
+
+    def __init__(self, columns):
+        timestamps = columns["timestamp"]
+        if len(timestamps) > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind="stable")
+            columns = {name: array[order] for name, array in columns.items()}
+        self.columns = columns
+        self._groups = {}   # (colonna dei codici, colonna dei valori) -> (timestamp, valori, {codice: slice})
+
+    def __len__(self):
+        return len(self.columns["timestamp"])
+
+    def _grouped(self, key_column, value_column):
+        grouped = self._groups.get((key_column, value_column))
+        if grouped is None:
+            codes = self.columns[key_column]
+            order = np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            present, starts = np.unique(sorted_codes, return_index=True)
+            ends = np.append(starts[1:], len(sorted_codes))
+            slices = {code: slice(start, end) for code, start, end in zip(present.tolist(), starts, ends)}
+            grouped = (self.columns["timestamp"][order], self.columns[value_column][order], slices)
+            self._groups[(key_column, value_column)] = grouped
+        return grouped
+
+    def series(self, value_column, **codes):
+        """TimeSeries cronologica di value_column, filtrata per codici (None = nessun filtro)."""
+        codes = {name: code for name, code in codes.items() if code is not None}
+        timestamps, values = self.columns["timestamp"], self.columns[value_column]
+        if not codes:
+            return TimeSeries(timestamps, values)
+        if len(codes) == 1:
+            (key_column, code), = codes.items()
+            grouped_timestamps, grouped_values, slices = self._grouped(key_column, value_column)
+            selected = slices.get(code)
+            if selected is None:
+                return TimeSeries(timestamps[:0], values[:0])
+            return TimeSeries(grouped_timestamps[selected], grouped_values[selected])
+        # Più filtri insieme (caso raro): maschera sulle righe in ordine cronologico
+        mask = np.logical_and.reduce([self.columns[name] == code for name, code in codes.items()])
+        return TimeSeries(timestamps[mask], values[mask])
+
+
+class OutcomeLog:
+    """
+    Log cronologico unico delle richieste concluse, costruito dagli archivi dei
+    completamenti e dei timeout: outcome vale 0 per ogni completamento e 1 per ogni
+    timeout (a parità di istante i completamenti precedono i timeout). L'indice viene
+    costruito alla prima lettura e ricostruito solo se nel frattempo gli archivi sono
+    cresciuti, quindi dopo la simulazione le serie degli esiti sono viste in O(1).
+    """
+
+    def __init__(self, completions, timeouts):
+        self.completions = completions
+        self.timeouts = timeouts
+        self._index = None
+        self._indexed_sizes = None
+
+    def index(self):
+        sizes = (len(self.completions), len(self.timeouts))
+        if self._index is None or sizes != self._indexed_sizes:
+            served, timed_out = self.completions, self.timeouts
+            columns = {name: np.concatenate([served.column(name), timed_out.column(name)])
+                       for name in ("timestamp", "req_type", "priority")}
+            columns["outcome"] = np.concatenate([np.zeros(sizes[0], dtype=np.int8), np.ones(sizes[1], dtype=np.int8)])
+            self._index = SeriesIndex(columns)
+            self._indexed_sizes = sizes
+        return self._index
+
+    def series(self, **codes):
+        """TimeSeries (istante, esito) delle richieste concluse, filtrate per codici."""
+        return self.index().series("outcome", **codes)
+
+    def __getstate__(self):
+        # L'indice si ricostruisce dagli archivi: non viene salvato
+        state = self.__dict__.copy()
+        state["_index"] = None
+        state["_indexed_sizes"] = None
+        return state
@@ -0,0 +1,228 @@
+# src/utils/latency_histogram.py - ISTOGRAMMI LOGARITMICI DELLE LATENZE (PERCENTILI)
+
+import math
+
+import numpy as np
+
+from src.config import Priority, RequestType
+from src.utils.columnar_store import REQ_TYPE_CODES
+
+_NAN = float('nan')
+
+LATENCY_COLUMNS = ("response_time", "wait_time")
+
+
+def percentile_label(percentile):
+    """Etichetta di un percentile: 50 -> 'p50', 99.9 -> 'p99.9'."""
+    return f"p{percentile:g}"
+
+
+class LogHistogram:
+    """
+    Istogramma a bucket logaritmici in stile HDR: i valori vengono contati in unità di
+    'resolution' secondi e ogni potenza di 2 è divisa in sotto-bucket lineari, quanti
+    servono per 'significant_digits' cifre significative. Il bucket di un valore si
+    calcola in tempo costante e la memoria dipende solo dal rapporto tra valore massimo
+    e risoluzione, non dal numero di osservazioni. I percentili hanno errore relativo
+    al più 10^-significant_digits.
+
+    Istogrammi con la stessa precisione si possono fondere (merge), ad esempio per
+    combinare tipi di richiesta o replicazioni indipendenti.
+    """
+
+    def __init__(self, significant_digits=2, resolution=1e-6):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError(f"significant_digits deve essere tra 1 e 5, ricevuto {significant_digits}")
+        self.significant_digits = significant_digits
+        self.resolution = resolution
+        # Sotto-bucket per potenza di 2: la larghezza relativa di un bucket è <= 2 / 2^bits
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self._half_count = 1 << (self._sub_bucket_bits - 1)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def record_values(self, values):
+        """Conta un array di valori non negativi (in secondi)."""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        low, high = values.min(), values.max()
+        if low < 0:
+            raise ValueError(f"LogHistogram accetta solo valori non negativi, ricevuto {low}")
+        units = (values / self.resolution).astype(np.int64)
+        # frexp restituisce l'esponente e con units = m * 2^e, m in [0.5, 1): e è il numero di bit
+        shift = np.maximum(np.frexp(units)[1] - self._sub_bucket_bits, 0)
+        indices = shift * self._half_count + (units >> shift)
+        self._add_counts(np.bincount(indices))
+        self.min = min(self.min, float(low))
+        self.max = max(self.max, float(high))
+
+    def record(self, value):
+        self.record_values([value])
+
+    def _add_counts(self, counts):
+        if len(counts) > len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(len(counts) - len(self.counts), dtype=np.int64)])
+        self.counts[:len(counts)] += counts
+
+    def _bucket_midpoint(self, index):
+        """Valore rappresentativo (centro) del bucket 'index', in secondi."""
+        shift = max(0, index // self._half_count - 1)
+        lower = (index - shift * self._half_count) << shift
+        return (lower + (1 << shift) / 2) * self.resolution
+
+    def merge(self, other):
+        """Aggiunge a questo istogramma tutte le osservazioni di 'other' (stessa precisione)."""
+        if (other.significant_digits, other.resolution) != (self.significant_digits, self.resolution):
+            raise ValueError("Si possono fondere solo istogrammi con la stessa precisione e risoluzione")
+        self._add_counts(other.counts)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentiles(self, percentiles):
+        """{percentile: valore} per i percentili richiesti (0-100); NaN se l'istogramma è vuoto."""
+        cumulative = np.cumsum(self.counts)
+        count = int(cumulative[-1]) if len(cumulative) else 0
+        if count == 0:
+            return {q: _NAN for q in percentiles}
+        result = {}
+        for q in percentiles:
+            if not 0 <= q <= 100:
+                raise ValueError(f"Percentile fuori da [0, 100]: {q}")
+            rank = max(1, math.ceil(q / 100 * count))
+            index = int(np.searchsorted(cumulative, rank))
+            # Il centro del bucket non può uscire dall'intervallo dei valori osservati
+            result[q] = min(max(self._bucket_midpoint(index), self.min), self.max)
+        return result
+
+    def percentile(self, q):
+        return self.percentiles([q])[q]
+
+
+class LatencyHistograms:
+    """
+    Istogrammi dei tempi di risposta e di attesa, uno per ogni coppia (tipo di richiesta,
+    priorità) osservata, identificata dai codici interi di ColumnarStore (NO_PRIORITY
+    nella simulazione baseline). Quelli per tipo, per priorità o complessivi si
+    ottengono fondendo le celle corrispondenti.
+
+    Come in ColumnarStore, le registrazioni di una cella si accumulano in un piccolo
+    buffer e vengono contate a blocchi di chunk_size con operazioni vettoriali: il costo
+    per richiesta è quello di due append e la memoria resta limitata.
+    """
+
+    def __init__(self, significant_digits=2, resolution=1e-6, chunk_size=4096):
+        self.significant_digits = significant_digits
+        self.resolution = resolution
+        self.chunk_size = chunk_size
+        self._cells = {}      # (codice tipo, priorità) -> {colonna: LogHistogram}
+        self._pending = {}    # (codice tipo, priorità) -> [response_time, wait_time, ...] non ancora contati
+
+    @classmethod
+    def from_config(cls, config_module):
+        return cls(config_module.LATENCY_HISTOGRAM_DIGITS, config_module.LATENCY_HISTOGRAM_RESOLUTION)
+
+    def record(self, req_type_code, priority, response_time, wait_time):
+        pending = self._pending.get((req_type_code, priority))
+        if pending is None:
+            pending = self._pending[(req_type_code, priority)] = []
+        pending.append(response_time)
+        pending.append(wait_time)
+        if len(pending) >= 2 * self.chunk_size:
+            self._flush_cell((req_type_code, priority), pending)
+
+    def _new_cell(self):
+        return {column: LogHistogram(self.significant_digits, self.resolution) for column in LATENCY_COLUMNS}
+
+    def _flush_cell(self, key, pending):
+        cell = self._cells.get(key)
+        if cell is None:
+            cell = self._cells[key] = self._new_cell()
+        block = np.array(pending, dtype=np.float64).reshape(-1, len(LATENCY_COLUMNS))
+        for i, column in enumerate(LATENCY_COLUMNS):
+            cell[column].record_values(block[:, i])
+        pending.clear()
+
+    def _flush(self):
+        for key, pending in self._pending.items():
+            if pending:
+                self._flush_cell(key, pending)
+
+    def histogram(self, column, req_type=None, priority=None):
+        """Istogramma fuso di 'column' sulle celle con il tipo e/o la priorità indicati (None = tutti)."""
+        self._flush()
+        code = None if req_type is None else REQ_TYPE_CODES[req_type]
+        merged = LogHistogram(self.significant_digits, self.resolution)
+        for (cell_code, cell_priority), cell in self._cells.items():
+            if (code is None or cell_code == code) and (priority is None or cell_priority == priority):
+                merged.merge(cell[column])
+        return merged
+
+    def percentiles(self, column, percentiles, req_type=None, priority=None):
+        return self.histogram(column, req_type, priority).percentiles(percentiles)
+
+    def merge(self, other):
+        """Aggiunge le osservazioni di un altro insieme di istogrammi (es. un'altra replicazione)."""
+        self._flush()
+        other._flush()
+        for key, other_cell in other._cells.items():
+            cell = self._cells.get(key)
+            if cell is None:
+                cell = self._cells[key] = self._new_cell()
+            for column in LATENCY_COLUMNS:
+                cell[column].merge(other_cell[column])
+        return self
+
+    @classmethod
+    def merged(cls, histogram_sets):
+        """Nuovo insieme che contiene le osservazioni di tutti quelli in 'histogram_sets'."""
+        histogram_sets = list(histogram_sets)
+        result = cls(histogram_sets[0].significant_digits, histogram_sets[0].resolution)
+        for histograms in histogram_sets:
+            result.merge(histograms)
+        return result
+
+    def __getstate__(self):
+        # Si salvano solo istogrammi già contati, senza buffer
+        self._flush()
+        return self.__dict__.copy()
+
+
+def format_percentiles(values):
+    """Riga leggibile 'p50 0.1234s | p95 ...' da {percentile: valore}."""
+    return " | ".join(f"{percentile_label(q)} {value:.4f}s" for q, value in values.items())
+
+
+def percentile_statistics(histograms, column, percentiles, req_types=(), priorities=()):
+    """
+    Voci del riepilogo scalare per i percentili di una latenza: complessivi
+    ('response_time_p95') e per ogni tipo o priorità indicati ('response_time_p95[LOGIN]').
+    Le chiavi ci sono sempre, con NaN in assenza di osservazioni.
+    """
+    statistics = {}
+    groups = [(None, None, "")]
+    groups += [(req_type, None, f"[{req_type.name}]") for req_type in req_types]
+    groups += [(None, priority, f"[{priority.name}]") for priority in priorities]
+    for req_type, priority, suffix in groups:
+        values = histograms.percentiles(column, percentiles, req_type=req_type, priority=priority)
+        for q, value in values.items():
+            statistics[f"{column}_{percentile_label(q)}{suffix}"] = float(value)
+    return statistics
+
+
+def latency_summary(histograms, percentiles, with_priority=False):
+    """
+    Voci dei percentili del riepilogo scalare delle metriche: tempo di risposta complessivo
+    e per tipo, tempo di attesa complessivo; con with_priority anche entrambi per priorità.
+    """
+    priorities = sorted(Priority) if with_priority else ()
+    statistics = percentile_statistics(histograms, "response_time", percentiles,
+                                       req_types=sorted(RequestType, key=lambda e: e.name), priorities=priorities)
+    statistics.update(percentile_statistics(histograms, "wait_time", percentiles, priorities=priorities))
+    return statistics
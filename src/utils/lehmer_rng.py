@@ -17,6 +17,14 @@ class LehmerRNG:
         self.seed = (self.a * self.seed) % self.m
         return self.seed
 
+    def jump_ahead(self, steps):
+        """
+        Avanza il generatore di 'steps' passi in O(log steps), senza generare i valori
+        intermedi: x_(n+k) = a^k * x_n mod m.
+        """
+        self.seed = (pow(self.a, steps, self.m) * self.seed) % self.m
+        return self.seed
+
     def get_numpy_seeds(self, count=1):
         """
         Restituisce una lista di 'count' seed validi per NumPy,
@@ -28,4 +36,20 @@ class LehmerRNG:
         seeds = []
         for _ in range(count):
             seeds.append(self._next_seed())
-        return seeds
\ No newline at end of file
+        return seeds
+
+    def get_replication_seeds(self, replication_index, count=3, stride=2**20):
+        """
+        Restituisce i 'count' seed NumPy della replicazione 'replication_index'.
+
+        Ogni replicazione usa il tratto della sequenza Lehmer che inizia 'stride' passi
+        dopo quello della precedente: finché stride >= 100 + count (riscaldamento
+        compreso) i tratti non si sovrappongono e i seed sono distinti. La replicazione 0
+        coincide con get_numpy_seeds(count) sul seed di partenza. Lo stato del generatore
+        non viene modificato.
+        """
+        if stride < 100 + count:
+            raise ValueError(f"stride ({stride}) deve essere almeno {100 + count} per evitare sovrapposizioni")
+        replication_rng = LehmerRNG(seed=self.seed)
+        replication_rng.jump_ahead(replication_index * stride)
+        return replication_rng.get_numpy_seeds(count=count)
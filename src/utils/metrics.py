@@ -1,64 +1,108 @@
-from collections import defaultdict
 import numpy as np
+from src import config
 from src.config import RequestType
+from src.utils.columnar_store import (COMPLETION_COLUMNS, EVENT_COLUMNS, NO_PRIORITY, REQ_TYPE_CODES, SYSTEM_COLUMNS,
+                                      ColumnarStore, OutcomeLog, TypeCounts, decode_req_type)
+from src.utils.latency_histogram import LatencyHistograms, format_percentiles, latency_summary
+from src.utils.time_averages import SystemTimeAverages, format_time_averages
 
 
 class Metrics:
     """
     Classe per raccogliere e calcolare le metriche di performance durante la simulazione.
     """
+    SCENARIO = "baseline"   # Etichetta dello scenario (banner del simulatore, record per richiesta)
 
-    def __init__(self):
-        # Le liste ora conterranno tuple (timestamp, valore) per i grafici temporali
-        self.response_times_history = defaultdict(list)
-        self.wait_times_history = defaultdict(list)
+    def __init__(self, config_module=None):
+        config_module = config_module or config
 
-        # Le liste semplici sono ancora utili per calcolare le medie finali e gli istogrammi
-        self.response_times_data = defaultdict(list)
-        self.wait_times_data = defaultdict(list)
+        # Archivi colonnari (array NumPy tipizzati): una riga per evento, con il codice del
+        # tipo di richiesta. Le vecchie liste di tuple sono ora viste calcolate da questi.
+        self.completions = ColumnarStore(COMPLETION_COLUMNS)
+        self.timeouts = ColumnarStore(EVENT_COLUMNS)
+        self.system_samples = ColumnarStore(SYSTEM_COLUMNS)     # Campioni periodici per i grafici
+        # Integrali esatti di coda, pod occupati e pod attivi, aggiornati dal simulatore
+        self.time_averages = SystemTimeAverages()
+        # Completamenti e timeout in un unico log cronologico indicizzato per tipo (e priorità)
+        self.outcomes = OutcomeLog(self.completions, self.timeouts)
 
-        # Metriche a livello di sistema
-        self.pod_count_history = []
-        self.queue_length_history = []
         self.total_requests_generated = 0
         self.total_requests_served = 0
 
         # Timeout
         self.total_timeouts = 0
-        # Un dizionario per contare quante richieste di ogni tipo sono state generate
-        self.requests_generated_data = defaultdict(int)
-        # Un dizionario per contare quante richieste di ogni tipo sono andate in timeout
-        self.requests_timed_out_data = defaultdict(int)
-        self.timeout_history = [] # <-- NUOVO: per salvare i timestamp dei timeout
-
-
-    def record_request_generation(self, req_type: RequestType):
-        self.total_requests_generated += 1
+        # Quante richieste di ogni tipo sono state generate e quante sono andate in timeout,
+        # per codice di tipo (viste per RequestType: requests_generated_data, requests_timed_out_data)
+        self.generated_by_type = TypeCounts()
+        self.timed_out_by_type = TypeCounts()
+
+        # Istogrammi logaritmici dei tempi di risposta e attesa per tipo di richiesta, per i percentili
+        self.latency_percentiles = tuple(config_module.LATENCY_PERCENTILES)
+        self.latency_histograms = LatencyHistograms.from_config(config_module)
+
+    # I metodi di registrazione hanno la stessa firma di MetricsWithPriority, così lo stesso
+    # simulatore può alimentare entrambe: qui la priorità della richiesta viene ignorata.
+    # Il tipo è passato come codice intero (REQ_TYPE_CODES, Request.type_code).
+    def record_request_generation(self, timestamp: float, type_code: int, priority=None):
         """Registra la generazione di una richiesta, catalogandola per tipo."""
-        self.requests_generated_data[req_type] += 1
+        self.total_requests_generated += 1
+        self.generated_by_type.add(type_code)
 
-    def record_request_metrics(self, timestamp, req_type, response_time, wait_time):
+    def record_request_metrics(self, timestamp, type_code, priority, response_time, wait_time):
         """Registra le metriche per una singola richiesta completata."""
-        # Per i grafici temporali
-        self.response_times_history[req_type].append((timestamp, response_time))
-        self.wait_times_history[req_type].append((timestamp, wait_time))
-
-        # Per le statistiche finali e gli istogrammi
-        self.response_times_data[req_type].append(response_time)
-        self.wait_times_data[req_type].append(wait_time)
-
+        self.completions.append((timestamp, response_time, wait_time, type_code, NO_PRIORITY))
+        self.latency_histograms.record(type_code, NO_PRIORITY, response_time, wait_time)
         self.total_requests_served += 1
 
-    def record_system_metrics(self, timestamp, pod_count, queue_length):
+    def record_system_metrics(self, timestamp, pod_count, queue_length, queue_len_per_prio=None):
         """Registra lo stato del sistema a un dato istante."""
-        self.pod_count_history.append((timestamp, pod_count))
-        self.queue_length_history.append((timestamp, queue_length))
+        self.system_samples.append((timestamp, pod_count, queue_length))
 
-    def record_timeout(self, req_type: RequestType, timestamp: float):
+    def record_timeout(self, timestamp: float, type_code: int, priority=None):
         """Registra una richiesta che è andata in timeout."""
-        self.requests_timed_out_data[req_type] += 1
-        self.timeout_history.append((timestamp, req_type)) # <-- NUOVO
-
+        self.timed_out_by_type.add(type_code)
+        self.timeouts.append((timestamp, type_code, NO_PRIORITY))
+
+    # --- Viste con i nomi delle vecchie strutture dati ---
+    @property
+    def requests_generated_data(self):
+        return self.generated_by_type.as_dict()
+
+    @property
+    def requests_timed_out_data(self):
+        return self.timed_out_by_type.as_dict()
+
+    @property
+    def response_times_history(self):
+        """{tipo: TimeSeries (timestamp, tempo di risposta)} per i grafici temporali."""
+        return self.completions.series_by("req_type", "response_time", decode_req_type)
+
+    @property
+    def wait_times_history(self):
+        return self.completions.series_by("req_type", "wait_time", decode_req_type)
+
+    @property
+    def response_times_data(self):
+        """{tipo: array dei tempi di risposta} per le statistiche finali e gli istogrammi."""
+        return self.completions.values_by("req_type", "response_time", decode_req_type)
+
+    @property
+    def wait_times_data(self):
+        return self.completions.values_by("req_type", "wait_time", decode_req_type)
+
+    @property
+    def pod_count_history(self):
+        return self.system_samples.series("pod_count")
+
+    @property
+    def queue_length_history(self):
+        return self.system_samples.series("queue_length")
+
+    @property
+    def timeout_history(self):
+        """Lista di tuple (timestamp, tipo) dei timeout, nell'ordine di registrazione."""
+        return list(zip(self.timeouts.column("timestamp").tolist(),
+                        map(decode_req_type, self.timeouts.column("req_type").tolist())))
 
     def print_summary(self):
         """Stampa un riassunto delle metriche a fine simulazione."""
@@ -67,24 +111,32 @@ class Metrics:
         print(f"Numero totale di richieste servite: {self.total_requests_served}")
 
         print("\n--- Numero di Richieste Servite per Tipo ---")
+        response_times_data = self.response_times_data
     # Itera sui tipi di richiesta in ordine per un output consistente
         for req_type in sorted(RequestType, key=lambda e: e.name):
-            # Usiamo self.response_times_data perché registra solo le richieste completate
-            served_count = len(self.response_times_data.get(req_type, []))
+            # Usiamo response_times_data perché registra solo le richieste completate
+            served_count = len(response_times_data[req_type])
             print(f"- {req_type.name:12}: {served_count}")
 
         print("\n--- Tempo Medio di Risposta per Tipo di Richiesta (s) ---")
         for req_type in sorted(RequestType, key=lambda e: e.name):
-            if self.response_times_data[req_type]:
-                avg_resp_time = np.mean(self.response_times_data[req_type])
+            if len(response_times_data[req_type]):
+                avg_resp_time = np.mean(response_times_data[req_type])
                 print(f"- {req_type.name:12}: {avg_resp_time:.4f}")
 
         print("\n--- Tempo Medio di Attesa per Tipo di Richiesta (s) ---")
+        wait_times_data = self.wait_times_data
         for req_type in sorted(RequestType, key=lambda e: e.name):
-            if self.wait_times_data[req_type]:
-                avg_wait_time = np.mean(self.wait_times_data[req_type])
+            if len(wait_times_data[req_type]):
+                avg_wait_time = np.mean(wait_times_data[req_type])
                 print(f"- {req_type.name:12}: {avg_wait_time:.4f}")
 
+        print("\n--- Percentili del Tempo di Risposta per Tipo di Richiesta ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            histogram = self.latency_histograms.histogram("response_time", req_type)
+            if histogram.count:
+                print(f"- {req_type.name:12}: {format_percentiles(histogram.percentiles(self.latency_percentiles))}")
+
         print("\n--- Analisi dei Timeout per Tipo di Richiesta ---")
         # Itera sui tipi di richiesta in ordine alfabetico per un output consistente
         for req_type in sorted(self.requests_generated_data.keys(), key=lambda e: e.name):
@@ -97,59 +149,70 @@ class Metrics:
             else:
                 print(f"- {req_type.name:12}: 0 generati")
 
+        print("\n--- Medie Temporali Esatte di Coda e Pod ---")
+        print(format_time_averages(self.time_averages.means()))
+
+    def get_summary_statistics(self):
+        """
+        Riassume la simulazione in un dizionario piatto {nome: valore scalare}, usato
+        per confrontare e aggregare replicazioni indipendenti. Le medie senza
+        osservazioni valgono NaN.
+        """
+        all_response_times = self.completions.column("response_time")
+        all_wait_times = self.completions.column("wait_time")
+        total_timed_out = sum(self.requests_timed_out_data.values())
+
+        summary = {
+            "requests_generated": float(self.total_requests_generated),
+            "requests_served": float(self.total_requests_served),
+            "requests_timed_out": float(total_timed_out),
+            "p_loss": total_timed_out / self.total_requests_generated if self.total_requests_generated else float('nan'),
+            "response_time_mean": float(np.mean(all_response_times)) if len(all_response_times) else float('nan'),
+            "wait_time_mean": float(np.mean(all_wait_times)) if len(all_wait_times) else float('nan'),
+        }
+        summary.update(self.time_averages.means())
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            response_times = self.completions.select("response_time", req_type=REQ_TYPE_CODES[req_type])
+            generated_count = self.requests_generated_data.get(req_type, 0)
+            summary[f"response_time_mean[{req_type.name}]"] = float(np.mean(response_times)) if len(response_times) else float('nan')
+            summary[f"p_loss[{req_type.name}]"] = self.requests_timed_out_data.get(req_type, 0) / generated_count if generated_count else float('nan')
+        summary.update(latency_summary(self.latency_histograms, self.latency_percentiles))
+        return summary
+
+    def get_completion_series(self, column, req_type=None, priority=None):
+        """
+        TimeSeries in ordine cronologico di una colonna delle richieste completate
+        ("response_time" o "wait_time"), eventualmente solo per un tipo di richiesta.
+        """
+        if priority is not None:
+            raise ValueError("La simulazione baseline non ha classi di priorità")
+        code = None if req_type is None else REQ_TYPE_CODES[req_type]
+        return self.completions.index().series(column, req_type=code)
+
+    def get_system_series(self, column):
+        """TimeSeries dello stato del sistema: "pod_count" o "queue_length"."""
+        return self.system_samples.series(column)
+
     def get_all_response_times_with_timestamps(self):
         """
-        Appiattisce i dati dei tempi di risposta da tutti i tipi di richiesta
-        in un'unica lista di tuple (timestamp, valore), ordinata per timestamp.
+        Tempi di risposta di tutti i tipi di richiesta come un'unica serie
+        (timestamp, valore), ordinata per timestamp.
         Questo è un prerequisito per l'analisi Batch Means.
 
         Returns:
-            list: Una lista di tuple (timestamp, response_time) ordinata.
+            TimeSeries: La serie (timestamp, response_time) ordinata.
         """
-        # 1. self.response_times_history è un dizionario dove le chiavi sono RequestType
-        #    e i valori sono liste di tuple (timestamp, valore).
-        #    Dobbiamo solo unire tutte queste liste in una sola.
-        all_data = []
-        for req_type_history in self.response_times_history.values():
-            all_data.extend(req_type_history)
-
-        # 2. Ordina la lista combinata in base al timestamp, che è il primo
-        #    elemento (indice 0) di ogni tupla. Questo è fondamentale per
-        #    l'analisi temporale e per la rimozione corretta del warm-up.
-        all_data.sort(key=lambda x: x[0])
-
-        return all_data
+        return self.get_completion_series("response_time")
 
     def get_all_outcomes_as_binary_stream(self):
         """
-        Crea una lista cronologica di tutti gli esiti (servito o perso),
+        Crea una serie cronologica di tutti gli esiti (servito o perso),
         rappresentati come 0 (servito) e 1 (perso/timeout).
         """
-        # Richieste servite (esito = 0)
-        serviced = []
-        for req_type, history in self.response_times_history.items():
-            serviced.extend([(timestamp, 0) for timestamp, _ in history])
-
-        # Richieste perse (esito = 1)
-        timed_out = [(timestamp, 1) for timestamp, _ in self.timeout_history]
-
-        all_outcomes = serviced + timed_out
-        all_outcomes.sort(key=lambda x: x[0])
-        return all_outcomes
+        return self.outcomes.series()
 
     def get_outcomes_by_type_as_binary_stream(self, req_type_to_filter: RequestType):
         """
-        Crea una lista cronologica di esiti (0=servito, 1=perso) per un TIPO di richiesta specifico.
+        Crea una serie cronologica di esiti (0=servito, 1=perso) per un TIPO di richiesta specifico.
         """
-        # Richieste servite di questo tipo
-        serviced_history = self.response_times_history.get(req_type_to_filter, [])
-        serviced = [(timestamp, 0) for timestamp, _ in serviced_history]
-
-        # Richieste perse di questo tipo
-        # Assumendo che timeout_history contenga tuple (timestamp, req_type)
-        timed_out_history = self.timeout_history
-        timed_out = [(timestamp, 1) for timestamp, req_type in timed_out_history if req_type == req_type_to_filter]
-
-        all_outcomes = serviced + timed_out
-        all_outcomes.sort(key=lambda x: x[0])
-        return all_outcomes
+        return self.outcomes.series(req_type=REQ_TYPE_CODES[req_type_to_filter])
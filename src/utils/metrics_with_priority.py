@@ -1,102 +1,162 @@
-import pandas as pd
+import importlib
+
 from collections import defaultdict
 import numpy as np
 
 from src.config import Priority, RequestType
-from src.model.request import PriorityRequest
+from src.utils.columnar_store import (COMPLETION_COLUMNS, EVENT_COLUMNS, PRIORITY_QUEUE_COLUMNS, REQ_TYPE_CODES,
+                                      SYSTEM_COLUMNS, ColumnarStore, OutcomeLog, TypeCounts, decode_req_type)
+from src.utils.latency_histogram import LatencyHistograms, format_percentiles, latency_summary
+from src.utils.time_averages import SystemTimeAverages, format_time_averages
 
 class MetricsWithPriority:
     """
     Raccoglie e calcola le metriche di performance per la simulazione
     con code di priorità, disaggregando i risultati per classe di priorità.
     """
+    SCENARIO = "priority"   # Etichetta dello scenario (banner del simulatore, record per richiesta)
+
     def __init__(self, config_module):
         self.config = config_module
 
-        # Metriche di sistema (uguali alla baseline)
-        self.timestamps = []
-        self.pod_counts = []
-        self.queue_lengths = []  # Lunghezza totale di tutte le code
-        self.request_generation_timestamps = []
-        self.queue_lengths_per_priority = defaultdict(list)
+        # Archivi colonnari (array NumPy tipizzati): una riga per evento, con i codici del
+        # tipo di richiesta e della priorità. Le vecchie liste sono ora viste calcolate da questi.
+        self.completions = ColumnarStore(COMPLETION_COLUMNS)
+        self.timeouts = ColumnarStore(EVENT_COLUMNS)
+        self.generations = ColumnarStore(EVENT_COLUMNS)
+        self.system_samples = ColumnarStore(SYSTEM_COLUMNS)     # Campioni periodici per i grafici
+        self.priority_queue_samples = ColumnarStore(PRIORITY_QUEUE_COLUMNS)
+        # Integrali esatti di coda, pod occupati e pod attivi, aggiornati dal simulatore
+        self.time_averages = SystemTimeAverages()
+        # Completamenti e timeout in un unico log cronologico indicizzato per tipo (e priorità)
+        self.outcomes = OutcomeLog(self.completions, self.timeouts)
 
         # --- MODIFICA CHIAVE: Metriche per Priorità e TIMEOUT---
-        # Usiamo defaultdict per creare automaticamente una lista per una nuova priorità
+        # Usiamo defaultdict per creare automaticamente un contatore per una nuova priorità
         # quando vi accediamo per la prima volta. La chiave sarà l'enum Priority.
         self.requests_completed_by_priority = defaultdict(int)
         self.requests_generated_by_priority = defaultdict(int)
         self.requests_timed_out_by_priority = defaultdict(int)
-        self.requests_timed_out_by_req_type = defaultdict(int)
-        self.requests_generated_by_req_type = defaultdict(int)
-        self.timeout_history = [] # <-- NUOVO
-
-        self.response_times_by_priority = defaultdict(list)
-        self.wait_times_by_priority = defaultdict(list)
-
-        # Per i grafici temporali, potremmo volerli separati
-        self.completion_timestamps_by_priority = defaultdict(list)
-        self.completion_timestamps_by_req_type = defaultdict(list)
-        self.response_times_at_completion_by_priority = defaultdict(list)
-        # -----------------------------------------------
-
-        # --- AGGIUNTA: Strutture dati per tracciare per tipo di richiesta ---
-        self.response_times_by_req_type = defaultdict(list)
-        self.wait_times_by_req_type = defaultdict(list)
-        # -----------------------------------------------------------------
-
-    def record_request_generation(self, timestamp: float, priority: Priority, req_type: RequestType):
+        # Per tipo i contatori sono indicizzati per codice (viste per RequestType:
+        # requests_timed_out_by_req_type, requests_generated_by_req_type)
+        self.timed_out_by_type = TypeCounts()
+        self.generated_by_type = TypeCounts()
+
+        # Istogrammi logaritmici dei tempi di risposta e attesa per (tipo, priorità), per i percentili
+        self.latency_percentiles = tuple(config_module.LATENCY_PERCENTILES)
+        self.latency_histograms = LatencyHistograms.from_config(config_module)
+
+    def __getstate__(self):
+        # Un modulo non è serializzabile con pickle: si salva solo il suo nome
+        state = self.__dict__.copy()
+        state["config"] = self.config.__name__
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.config = importlib.import_module(state["config"])
+
+    # Il tipo è passato come codice intero (REQ_TYPE_CODES, Request.type_code)
+    def record_request_generation(self, timestamp: float, type_code: int, priority: Priority):
         """Registra il timestamp di quando una richiesta è generata."""
-        self.request_generation_timestamps.append(timestamp)
+        self.generations.append((timestamp, type_code, priority))
         self.requests_generated_by_priority[priority] += 1
-        # Usa il parametro 'req_type' invece della variabile inesistente 'request'
-        self.requests_generated_by_req_type[req_type] += 1
+        self.generated_by_type.add(type_code)
 
-    def record_system_metrics(self, timestamp, pod_count, queue_len, queue_len_per_prio: dict):
+    def record_system_metrics(self, timestamp, pod_count, queue_len, queue_len_per_prio: dict = None):
         """Registra lo stato del sistema a intervalli regolari."""
-        self.timestamps.append(timestamp)
-        self.pod_counts.append(pod_count)
-        self.queue_lengths.append(queue_len)
+        self.system_samples.append((timestamp, pod_count, queue_len))
 
         # --- logica per salvare i nuovi dati --- #
         if queue_len_per_prio:
             for prio, length in queue_len_per_prio.items():
-                self.queue_lengths_per_priority[prio].append(length)
+                self.priority_queue_samples.append((timestamp, prio, length))
 
-    def record_request_metrics(self, completion_time: float, request: PriorityRequest,
+    def record_request_metrics(self, completion_time: float, type_code: int, priority: Priority,
                                response_time: float, wait_time: float):
         """
         Registra le metriche di una singola richiesta completata,
         catalogandole in base alla sua priorità e al suo tipo.
         """
-        prio = request.priority
-        req_type = request.req_type
+        self.requests_completed_by_priority[priority] += 1
+        self.completions.append((completion_time, response_time, wait_time, type_code, priority))
+        self.latency_histograms.record(type_code, priority, response_time, wait_time)
+
+    def record_timeout(self, timestamp: float, type_code: int, priority: Priority):
+        """Registra una richiesta che è andata in timeout (se implementato)."""
+        self.requests_timed_out_by_priority[priority] += 1
+        self.timed_out_by_type.add(type_code)
+        self.timeouts.append((timestamp, type_code, priority))
 
-        # Incrementa i contatori e registra i dati per Priorità
-        self.requests_completed_by_priority[prio] += 1
-        self.response_times_by_priority[prio].append(response_time)
-        self.wait_times_by_priority[prio].append(wait_time)
-        self.completion_timestamps_by_priority[prio].append(completion_time)
-        self.completion_timestamps_by_req_type[req_type].append(completion_time)
-        self.response_times_at_completion_by_priority[prio].append(response_time)
+    # --- Viste con i nomi delle vecchie strutture dati (array NumPy) ---
+    @property
+    def requests_generated_by_req_type(self):
+        return self.generated_by_type.as_dict()
 
-        # --- AGGIUNTA: Registra gli stessi dati anche per Tipo di Richiesta ---
-        self.response_times_by_req_type[req_type].append(response_time)
-        self.wait_times_by_req_type[req_type].append(wait_time)
+    @property
+    def requests_timed_out_by_req_type(self):
+        return self.timed_out_by_type.as_dict()
 
-        # ------------------------------------------------------------------
+    @property
+    def timestamps(self):
+        return self.system_samples.column("timestamp")
 
-    def record_timeout(self, request: PriorityRequest, timestamp: float):
-        """Registra una richiesta che è andata in timeout (se implementato)."""
-        self.requests_timed_out_by_priority[request.priority] += 1
-        self.requests_timed_out_by_req_type[request.req_type] += 1
-        self.timeout_history.append((timestamp, request.req_type))   # <-- NUOVO
+    @property
+    def pod_counts(self):
+        return self.system_samples.column("pod_count")
+
+    @property
+    def queue_lengths(self):
+        """Lunghezza totale di tutte le code."""
+        return self.system_samples.column("queue_length")
+
+    @property
+    def request_generation_timestamps(self):
+        return self.generations.column("timestamp")
+
+    @property
+    def queue_lengths_per_priority(self):
+        """{priorità: lunghezze della coda}, solo negli istanti in cui la priorità era in coda."""
+        return self.priority_queue_samples.values_by("priority", "queue_length", Priority)
+
+    @property
+    def response_times_by_priority(self):
+        return self.completions.values_by("priority", "response_time", Priority)
+
+    response_times_at_completion_by_priority = response_times_by_priority
+
+    @property
+    def wait_times_by_priority(self):
+        return self.completions.values_by("priority", "wait_time", Priority)
+
+    @property
+    def completion_timestamps_by_priority(self):
+        return self.completions.values_by("priority", "timestamp", Priority)
+
+    @property
+    def completion_timestamps_by_req_type(self):
+        return self.completions.values_by("req_type", "timestamp", decode_req_type)
+
+    @property
+    def response_times_by_req_type(self):
+        return self.completions.values_by("req_type", "response_time", decode_req_type)
 
+    @property
+    def wait_times_by_req_type(self):
+        return self.completions.values_by("req_type", "wait_time", decode_req_type)
+
+    @property
+    def timeout_history(self):
+        """Lista di tuple (timestamp, tipo) dei timeout, nell'ordine di registrazione."""
+        return list(zip(self.timeouts.column("timestamp").tolist(),
+                        map(decode_req_type, self.timeouts.column("req_type").tolist())))
 
     def to_dataframe(self):
         """
         Converte le metriche di sistema in un DataFrame pandas per un'analisi più semplice.
         Potrebbe essere esteso per includere anche le metriche per priorità.
         """
+        import pandas as pd     # Solo per l'analisi: la simulazione non carica pandas
         return pd.DataFrame({
             'Timestamp': self.timestamps,
             'PodCount': self.pod_counts,
@@ -116,10 +176,15 @@ class MetricsWithPriority:
         print(f"Richieste totali perse (timeout): {total_timeouts}")
         print(f"Richieste rimaste in coda alla fine: {total_generated - total_completed - total_timeouts}")
 
+        response_times_by_priority = self.response_times_by_priority
+        wait_times_by_priority = self.wait_times_by_priority
+        response_times_by_req_type = self.response_times_by_req_type
+        wait_times_by_req_type = self.wait_times_by_req_type
+
         print("\n--- Numero di Richieste Servite per Tipo ---")
         for req_type in sorted(RequestType, key=lambda e: e.name):
-            # Usiamo self.response_times_by_req_type che registra solo le richieste completate
-            served_count = len(self.response_times_by_req_type.get(req_type, []))
+            # Usiamo response_times_by_req_type che registra solo le richieste completate
+            served_count = len(response_times_by_req_type[req_type])
             print(f"- {req_type.name:12}: {served_count}")
 
         # --- STAMPA PER PRIORITÀ (INVARIATA) ---
@@ -137,14 +202,16 @@ class MetricsWithPriority:
             print(f"  - Richieste Generate: {generated_count}")
             print(f"  - Richieste Servite: {num_completed}")
 
-            if self.response_times_by_priority[prio]:
-                avg_response_time = np.mean(self.response_times_by_priority[prio])
-                avg_wait_time = np.mean(self.wait_times_by_priority[prio])
-                max_response_time = max(self.response_times_by_priority[prio])
+            if len(response_times_by_priority[prio]):
+                avg_response_time = np.mean(response_times_by_priority[prio])
+                avg_wait_time = np.mean(wait_times_by_priority[prio])
+                max_response_time = np.max(response_times_by_priority[prio])
 
                 print(f"  - Tempo di Risposta Medio: {avg_response_time:.4f}s")
                 print(f"  - Tempo di Attesa Medio:   {avg_wait_time:.4f}s")
                 print(f"  - Tempo di Risposta Massimo: {max_response_time:.4f}s")
+                response_percentiles = self.latency_histograms.percentiles("response_time", self.latency_percentiles, priority=prio)
+                print(f"  - Percentili Tempo di Risposta: {format_percentiles(response_percentiles)}")
 
             # --- P_LOSS ---
             if generated_count > 0:
@@ -155,68 +222,88 @@ class MetricsWithPriority:
         print("\n\n--- Dettaglio per Tipo di Richiesta (per Confronto Diretto con Baseline) ---")
         print("\n--- Tempo Medio di Risposta per Tipo di Richiesta (s) ---")
         for req_type in sorted(RequestType, key=lambda e: e.name):
-            if self.response_times_by_req_type[req_type]:
-                avg_resp_time = np.mean(self.response_times_by_req_type[req_type])
+            if len(response_times_by_req_type[req_type]):
+                avg_resp_time = np.mean(response_times_by_req_type[req_type])
                 print(f"- {req_type.name:12}: {avg_resp_time:.4f}")
 
         print("\n--- Tempo Medio di Attesa per Tipo di Richiesta (s) ---")
         for req_type in sorted(RequestType, key=lambda e: e.name):
-            if self.wait_times_by_req_type[req_type]:
-                avg_wait_time = np.mean(self.wait_times_by_req_type[req_type])
+            if len(wait_times_by_req_type[req_type]):
+                avg_wait_time = np.mean(wait_times_by_req_type[req_type])
                 print(f"- {req_type.name:12}: {avg_wait_time:.4f}")
+
+        print("\n--- Percentili del Tempo di Risposta per Tipo di Richiesta ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            histogram = self.latency_histograms.histogram("response_time", req_type)
+            if histogram.count:
+                print(f"- {req_type.name:12}: {format_percentiles(histogram.percentiles(self.latency_percentiles))}")
         # -------------------------------------------------------------
 
+        print("\n--- Medie Temporali Esatte di Coda e Pod ---")
+        print(format_time_averages(self.time_averages.means()))
+
+    def get_summary_statistics(self):
+        """
+        Riassume la simulazione in un dizionario piatto {nome: valore scalare}, usato
+        per confrontare e aggregare replicazioni indipendenti. Contiene le stesse chiavi
+        di Metrics.get_summary_statistics più il dettaglio per priorità.
+        """
+        all_response_times = self.completions.column("response_time")
+        all_wait_times = self.completions.column("wait_time")
+        total_generated = len(self.generations)
+        total_timed_out = sum(self.requests_timed_out_by_priority.values())
+
+        summary = {
+            "requests_generated": float(total_generated),
+            "requests_served": float(sum(self.requests_completed_by_priority.values())),
+            "requests_timed_out": float(total_timed_out),
+            "p_loss": total_timed_out / total_generated if total_generated else float('nan'),
+            "response_time_mean": float(np.mean(all_response_times)) if len(all_response_times) else float('nan'),
+            "wait_time_mean": float(np.mean(all_wait_times)) if len(all_wait_times) else float('nan'),
+        }
+        summary.update(self.time_averages.means())
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            response_times = self.completions.select("response_time", req_type=REQ_TYPE_CODES[req_type])
+            generated_count = self.requests_generated_by_req_type.get(req_type, 0)
+            summary[f"response_time_mean[{req_type.name}]"] = float(np.mean(response_times)) if len(response_times) else float('nan')
+            summary[f"p_loss[{req_type.name}]"] = self.requests_timed_out_by_req_type.get(req_type, 0) / generated_count if generated_count else float('nan')
+        for prio in sorted(Priority):
+            response_times = self.completions.select("response_time", priority=prio)
+            generated_count = self.requests_generated_by_priority.get(prio, 0)
+            summary[f"response_time_mean[{prio.name}]"] = float(np.mean(response_times)) if len(response_times) else float('nan')
+            summary[f"p_loss[{prio.name}]"] = self.requests_timed_out_by_priority.get(prio, 0) / generated_count if generated_count else float('nan')
+        summary.update(latency_summary(self.latency_histograms, self.latency_percentiles, with_priority=True))
+        return summary
+
+    def get_completion_series(self, column, req_type=None, priority=None):
+        """
+        TimeSeries in ordine cronologico di una colonna delle richieste completate
+        ("response_time" o "wait_time"), eventualmente solo per un tipo e/o una priorità.
+        """
+        code = None if req_type is None else REQ_TYPE_CODES[req_type]
+        return self.completions.index().series(column, req_type=code, priority=priority)
+
+    def get_system_series(self, column):
+        """TimeSeries dello stato del sistema: "pod_count" o "queue_length"."""
+        return self.system_samples.series(column)
+
     def get_all_response_times_with_timestamps(self):
         """
-        Appiattisce i dati dei tempi di risposta da tutte le priorità
-        in un'unica lista di tuple (timestamp, valore), ordinata per timestamp.
+        Tempi di risposta di tutte le priorità come un'unica serie
+        (timestamp, valore), ordinata per timestamp.
         Necessario per l'analisi Batch Means.
         """
-        all_data = []
-        for prio, times in self.response_times_by_priority.items():
-            timestamps = self.completion_timestamps_by_priority[prio]
-            # Si assicura che le lunghezze corrispondano
-            if len(timestamps) == len(times):
-                all_data.extend(zip(timestamps, times))
-
-        # Ordina per timestamp, che è il primo elemento della tupla
-        all_data.sort(key=lambda x: x[0])
-        return all_data
+        return self.get_completion_series("response_time")
 
     def get_all_outcomes_as_binary_stream(self):
         """
-        Crea una lista cronologica di tutti gli esiti (servito o perso),
+        Crea una serie cronologica di tutti gli esiti (servito o perso),
         rappresentati come 0 (servito) e 1 (perso/timeout).
         """
-        # 1. Raccogliamo i timestamp di tutte le richieste servite.
-        serviced = []
-        for req_type, timestamps in self.completion_timestamps_by_req_type.items():
-            # Per ogni timestamp di completamento, registriamo un successo (0).
-            serviced.extend([(timestamp, 0) for timestamp in timestamps])
-
-        # 2. Raccogliamo i timestamp delle richieste perse.
-        #    `self.timeout_history` salva tuple (timestamp, request).
-        timed_out = [(timestamp, 1) for timestamp, _ in self.timeout_history]
-
-        # 3. Combiniamo e ordiniamo cronologicamente.
-        all_outcomes = serviced + timed_out
-        all_outcomes.sort(key=lambda x: x[0])
-
-        return all_outcomes
+        return self.outcomes.series()
 
     def get_outcomes_by_type_as_binary_stream(self, req_type_to_filter: RequestType):
         """
-        Crea una lista cronologica di esiti (0=servito, 1=perso) per un TIPO di richiesta specifico.
+        Crea una serie cronologica di esiti (0=servito, 1=perso) per un TIPO di richiesta specifico.
         """
-        # Richieste servite di questo tipo
-        serviced_timestamps = self.completion_timestamps_by_req_type.get(req_type_to_filter, [])
-        serviced = [(timestamp, 0) for timestamp in serviced_timestamps]
-
-        # Richieste perse di questo tipo
-        # Assumendo che timeout_history contenga tuple (timestamp, request_object)
-        timed_out_history = self.timeout_history
-        timed_out = [(timestamp, 1) for timestamp, req_type in timed_out_history if req_type == req_type_to_filter]
-
-        all_outcomes = serviced + timed_out
-        all_outcomes.sort(key=lambda x: x[0])
-        return all_outcomes
+        return self.outcomes.series(req_type=REQ_TYPE_CODES[req_type_to_filter])
@@ -0,0 +1,179 @@
+# src/utils/request_records.py - RECORD PER RICHIESTA SALVATI SU DISCO A BLOCCHI COLONNARI
+
+import glob
+import json
+import os
+import tempfile
+from enum import IntEnum
+
+import numpy as np
+
+from src.utils.columnar_store import NO_PRIORITY, REQ_TYPE_CODES, TimeSeries
+
+_NAN = float('nan')
+
+
+class Outcome(IntEnum):
+    """Esito di una richiesta nei record."""
+    COMPLETED = 0       # Servita: start e completion sono inizio e fine del servizio
+    TIMED_OUT = 1       # Scaduta in coda: completion è la scadenza, start è NaN e pod è -1
+
+
+# Un record per ogni richiesta conclusa, nell'ordine in cui viene registrata dal simulatore.
+# Tipo di richiesta e priorità usano gli stessi codici interi di ColumnarStore.
+RECORD_FIELDS = [('request_id', '<i8'), ('arrival', '<f8'), ('start', '<f8'), ('completion', '<f8'),
+                 ('req_type', 'i1'), ('priority', 'i1'), ('pod', '<i4'), ('outcome', 'i1')]
+RECORD_DTYPE = np.dtype(RECORD_FIELDS)
+
+_MANIFEST = "manifest.json"
+_CHUNK_PATTERN = "chunk_{:06d}.npy"
+
+
+class RequestRecordSink:
+    """
+    Sink dei record per richiesta: le righe si accumulano in un buffer di al più
+    chunk_size elementi e ogni buffer pieno diventa un file .npy (array strutturato
+    con i campi di RECORD_FIELDS) nella directory del run. La memoria usata non
+    dipende dalla durata della simulazione.
+
+    Il sink non tiene file aperti tra una scrittura e l'altra, quindi viaggia nei
+    checkpoint del motore nativo: alla ripresa i blocchi successivi al salvataggio
+    vengono riscritti con lo stesso contenuto. close() scrive l'ultimo blocco
+    parziale e il manifest letto da RequestRecords.
+    """
+
+    def __init__(self, directory, chunk_size=65536):
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size deve essere >= 1, ricevuto {chunk_size}")
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.num_chunks = 0
+        self.num_records = 0
+        self._pending = []
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config_module, label):
+        """
+        Sink in una nuova directory '<label>_XXXX' dentro REQUEST_RECORDS_DIR,
+        o None se i record per richiesta sono disattivati.
+        """
+        if not config_module.REQUEST_RECORDS_ENABLED:
+            return None
+        os.makedirs(config_module.REQUEST_RECORDS_DIR, exist_ok=True)
+        directory = tempfile.mkdtemp(prefix=f"{label}_", dir=config_module.REQUEST_RECORDS_DIR)
+        return cls(directory, config_module.REQUEST_RECORDS_CHUNK_SIZE)
+
+    def record(self, request, start, completion, pod_id, outcome):
+        """Registra l'esito di una richiesta (Request o PriorityRequest)."""
+        priority = getattr(request, 'priority', None)
+        pending = self._pending
+        pending.append((request.request_id, request.arrival_time, start, completion, request.type_code,
+                        NO_PRIORITY if priority is None else priority, pod_id, outcome))
+        if len(pending) >= self.chunk_size:
+            self._flush()
+
+    def record_completion(self, request, start, completion, pod_id):
+        self.record(request, start, completion, pod_id, Outcome.COMPLETED)
+
+    def record_timeout(self, request, deadline):
+        self.record(request, _NAN, deadline, -1, Outcome.TIMED_OUT)
+
+    def _flush(self):
+        pending = self._pending
+        if not pending:
+            return
+        chunk = np.array(pending, dtype=RECORD_DTYPE)
+        np.save(os.path.join(self.directory, _CHUNK_PATTERN.format(self.num_chunks)), chunk)
+        self.num_chunks += 1
+        self.num_records += len(chunk)
+        pending.clear()
+
+    def close(self):
+        """Scrive il blocco parziale e il manifest; il sink può essere chiuso più volte."""
+        self._flush()
+        manifest = {"fields": RECORD_FIELDS, "chunk_size": self.chunk_size,
+                    "num_chunks": self.num_chunks, "num_records": self.num_records}
+        with open(os.path.join(self.directory, _MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+
+class RequestRecords:
+    """
+    Lettura dei record scritti da un RequestRecordSink. I blocchi vengono aperti solo
+    quando servono, in memory-map (mmap=True) oppure caricati uno alla volta: le
+    selezioni leggono blocco per blocco e tengono in memoria solo le colonne richieste.
+
+    Se il manifest manca (run interrotto) si leggono tutti i blocchi presenti.
+    """
+
+    def __init__(self, directory, mmap=True):
+        self.directory = directory
+        self.mmap_mode = 'r' if mmap else None
+        manifest_path = os.path.join(directory, _MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.paths = [os.path.join(directory, _CHUNK_PATTERN.format(i)) for i in range(manifest["num_chunks"])]
+            self._num_records = manifest["num_records"]
+        else:
+            self.paths = sorted(glob.glob(os.path.join(directory, _CHUNK_PATTERN.replace("{:06d}", "*"))))
+            self._num_records = None
+
+    def __len__(self):
+        if self._num_records is None:
+            self._num_records = sum(len(chunk) for chunk in self.chunks())
+        return self._num_records
+
+    def chunks(self):
+        """Generatore degli array strutturati dei blocchi, in ordine di scrittura."""
+        for path in self.paths:
+            chunk = np.load(path, mmap_mode=self.mmap_mode)
+            if chunk.dtype != RECORD_DTYPE:
+                raise ValueError(f"Formato dei record non riconosciuto in {path}: {chunk.dtype}")
+            yield chunk
+
+    def columns(self, names, req_type=None, priority=None, outcome=None):
+        """
+        {nome: array} dei campi 'names' (anche derivati, vedi _field) per i record con il
+        tipo, la priorità e l'esito indicati (None = nessun filtro).
+        """
+        codes = {"req_type": None if req_type is None else REQ_TYPE_CODES[req_type],
+                 "priority": None if priority is None else int(priority),
+                 "outcome": None if outcome is None else int(outcome)}
+        parts = {name: [] for name in names}
+        for chunk in self.chunks():
+            mask = None
+            for field, code in codes.items():
+                if code is None:
+                    continue
+                condition = chunk[field] == code
+                mask = condition if mask is None else mask & condition
+            for name in names:
+                values = _field(chunk, name)
+                parts[name].append(np.asarray(values if mask is None else values[mask]))
+        return {name: np.concatenate(arrays) if arrays else np.empty(0, dtype=_field_dtype(name))
+                for name, arrays in parts.items()}
+
+    def series(self, value, req_type=None, priority=None):
+        """
+        TimeSeries in ordine di completamento per l'analisi steady-state, come quelle delle metriche:
+        'response_time' e 'wait_time' delle richieste servite, 'outcome' di tutte le richieste
+        concluse (0 servita, 1 scaduta, all'istante di completamento o di scadenza).
+        """
+        outcome = None if value == "outcome" else Outcome.COMPLETED
+        data = self.columns(["completion", value], req_type, priority, outcome)
+        return TimeSeries(data["completion"], data[value]).sorted()
+
+
+def _field(chunk, name):
+    """Campo di un blocco, oppure latenza derivata dagli istanti."""
+    if name == "response_time":
+        return chunk["completion"] - chunk["arrival"]
+    if name == "wait_time":
+        return chunk["start"] - chunk["arrival"]
+    return chunk[name]
+
+
+def _field_dtype(name):
+    return np.float64 if name in ("response_time", "wait_time") else RECORD_DTYPE[name]
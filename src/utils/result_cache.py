@@ -0,0 +1,198 @@
+# src/utils/result_cache.py - CACHE SU DISCO DEI RISULTATI DELLE SIMULAZIONI
+
+import argparse
+import hashlib
+import os
+import pickle
+import sys
+import types
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+
+# Parametri di config che non influenzano i risultati di una simulazione: logging, cache e
+# checkpoint, parametri usati solo dalle analisi (batch means, intervalli di confidenza,
+# transitorio, percentili ricalcolati dagli istogrammi) e motore (la classe è già nella chiave)
+CACHE_IGNORED_SETTINGS = {
+    "LOG_LEVEL", "LOG_COMPONENTS", "LOG_FILE", "EVENT_TRACE_FILE",
+    "NUM_BATCHES", "CONFIDENCE_LEVEL", "WARM_UP_TO_STEADY", "WARM_UP_DETECTION",
+    "BATCH_MEANS_AUTO_SIZE", "BATCH_MEANS_OVERLAPPING", "BATCH_MEANS_MAX_BATCHES",
+    "BATCH_MEANS_MAX_LAG1_AUTOCORRELATION", "LATENCY_PERCENTILES", "SIMULATION_ENGINE",
+    "RESULT_CACHE_ENABLED", "RESULT_CACHE_DIR", "RESULT_CACHE_MAX_BYTES",
+    "STEADY_ENABLED", "REPLICATIONS_ENABLED", "SWEEP_ENABLED",
+    "CHECKPOINT_ENABLED", "CHECKPOINT_DIR", "CHECKPOINT_INTERVAL",
+    "SEQUENTIAL_STOPPING_ENABLED", "SEQUENTIAL_METRICS", "SEQUENTIAL_TARGET_RELATIVE_HALF_WIDTH",
+    "SEQUENTIAL_CHECK_INTERVAL", "SEQUENTIAL_MAX_WALL_TIME",
+    "PLOT_DPI", "PLOT_FORMAT", "PLOT_WORKERS", "PLOT_DOWNSAMPLING", "PLOT_MAX_POINTS",
+}
+
+# Codice che determina i risultati: modificare questi file invalida la cache.
+# Analisi, grafici e main.py sono esclusi apposta, così cambiare lo stile dei grafici non fa ri-simulare.
+SIMULATION_SOURCE_DIRS = ("simulation", "service", "model", "controller", "utils")
+
+_SRC_ROOT = Path(__file__).resolve().parent.parent
+_code_version = None
+
+
+def code_version():
+    """Hash dei sorgenti della simulazione (calcolato una sola volta per processo)."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        for directory in SIMULATION_SOURCE_DIRS:
+            for path in sorted((_SRC_ROOT / directory).rglob("*.py")):
+                digest.update(str(path.relative_to(_SRC_ROOT)).encode())
+                digest.update(path.read_bytes())
+        digest.update(np.__version__.encode())   # Gli algoritmi dei Generator possono cambiare tra versioni
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def _canonical(value):
+    """Rappresentazione testuale stabile (indipendente da indirizzi di memoria e ordine dei dict)."""
+    if isinstance(value, Enum):
+        return f"{type(value).__name__}.{value.name}"
+    if isinstance(value, dict):
+        return "{" + ",".join(sorted(f"{_canonical(k)}:{_canonical(v)}" for k, v in value.items())) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_canonical(v) for v in value) + "]"
+    if isinstance(value, types.CodeType):
+        return f"code({value.co_code.hex()},{_canonical(value.co_consts)},{','.join(value.co_names)})"
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if isinstance(value, types.FunctionType):
+        # Le lambda degli scenari sono identificate dal loro codice, costanti e variabili catturate
+        closure = [cell.cell_contents for cell in value.__closure__ or ()]
+        return f"fn({_canonical(value.__code__)},{_canonical(closure)},{_canonical(value.__defaults__ or ())})"
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return repr(value)
+    if hasattr(value, "__dict__"):
+        return f"{type(value).__qualname__}({_canonical(vars(value))})"
+    return repr(value)
+
+
+def config_fingerprint(config_module):
+    """Valori effettivi dei parametri (nomi MAIUSCOLI) di config che influenzano la simulazione."""
+    settings = {name: value for name, value in vars(config_module).items()
+                if name.isupper() and name not in CACHE_IGNORED_SETTINGS}
+    return _canonical(settings)
+
+
+class ResultCache:
+    """
+    Cache su disco indirizzata per contenuto: la chiave è l'hash di configurazione
+    effettiva, scenario (funzione lambda), seed, classe del simulatore, durata e
+    versione del codice di simulazione. Ogni voce è un file pickle; quando la
+    dimensione totale supera max_bytes vengono eliminate le voci usate meno di
+    recente (la data di modifica del file viene aggiornata a ogni lettura).
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config_module):
+        """Restituisce la cache configurata, o None se disabilitata."""
+        if not config_module.RESULT_CACHE_ENABLED:
+            return None
+        return cls(config_module.RESULT_CACHE_DIR, config_module.RESULT_CACHE_MAX_BYTES)
+
+    @staticmethod
+    def make_key(config_module, simulator_class, seeds, lambda_function, simulation_time, kind="metrics",
+                 scenario=None):
+        # 'scenario' distingue le esecuzioni della stessa classe (metriche e disciplina di coda)
+        parts = [
+            kind,
+            code_version(),
+            config_fingerprint(config_module),
+            _canonical(simulator_class),
+            _canonical(scenario),
+            _canonical(list(seeds)),
+            _canonical(lambda_function),
+            repr(float(simulation_time)),
+        ]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key):
+        """Restituisce il valore in cache, o None se assente (o illeggibile)."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Voce corrotta o scritta da una versione incompatibile: la si scarta
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)   # Aggiorna l'ordine LRU
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)   # Scrittura atomica: più processi possono condividere la cache
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for path in self.cache_dir.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue   # Eliminata nel frattempo da un altro processo
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Elimina le voci meno recenti finché la dimensione totale non rientra in max_bytes."""
+        entries = self._entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    def invalidate(self):
+        """Svuota la cache e restituisce il numero di voci eliminate."""
+        entries = self._entries()
+        for _, _, path in entries:
+            path.unlink(missing_ok=True)
+        return len(entries)
+
+    def stats(self):
+        entries = self._entries()
+        return {"entries": len(entries), "total_bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes, "cache_dir": str(self.cache_dir)}
+
+
+def main(argv=None):
+    """Riga di comando: python -m src.utils.result_cache {invalidate,stats} [--dir DIR]"""
+    from src import config
+
+    parser = argparse.ArgumentParser(description="Gestione della cache dei risultati di simulazione")
+    parser.add_argument("command", choices=["invalidate", "stats"])
+    parser.add_argument("--dir", default=config.RESULT_CACHE_DIR, help="Cartella della cache")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.dir, config.RESULT_CACHE_MAX_BYTES)
+    if args.command == "invalidate":
+        print(f"Eliminate {cache.invalidate()} voci da {cache.cache_dir}")
+    else:
+        stats = cache.stats()
+        print(f"{stats['entries']} voci, {stats['total_bytes'] / 1024**2:.1f} MB "
+              f"su {stats['max_bytes'] / 1024**2:.0f} MB in {stats['cache_dir']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
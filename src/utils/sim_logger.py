@@ -0,0 +1,122 @@
+# src/utils/sim_logger.py - LOGGING A LIVELLI E TRACCIA BINARIA DEGLI EVENTI
+
+import struct
+import sys
+from enum import IntEnum
+
+
+class LogLevel(IntEnum):
+    DEBUG = 10      # Un messaggio per ogni evento: richieste generate, servite, scadute
+    INFO = 20       # Avvio/arresto dei pod, scaling e decisioni dell'HPA
+    OFF = 100       # Nessun messaggio (default)
+
+
+# Componenti del modello abilitabili singolarmente tramite config.LOG_COMPONENTS
+COMPONENTS = ("generator", "pod", "watcher", "simulator", "hpa")
+
+
+class ComponentLogger:
+    """
+    Logger di un singolo componente.
+
+    I flag is_debug/is_info sono calcolati una sola volta alla creazione: il chiamante
+    li controlla PRIMA di costruire la f-string, quindi un livello disabilitato non
+    costa alcuna formattazione ma solo la lettura di un attributo.
+    """
+    __slots__ = ('name', 'is_debug', 'is_info', '_write')
+
+    def __init__(self, name, level, write):
+        self.name = name
+        self.is_debug = level <= LogLevel.DEBUG
+        self.is_info = level <= LogLevel.INFO
+        self._write = write
+
+    def emit(self, message):
+        self._write(message + "\n")
+
+
+class TraceEvent(IntEnum):
+    """Codici degli eventi registrati nella traccia binaria."""
+    RUN_START = 0
+    GENERATED = 1           # value = tipo di richiesta
+    SERVICE_START = 2       # value = tempo di attesa
+    SERVICE_END = 3         # value = tempo di risposta
+    TIMEOUT = 4
+    DISCARDED = 5           # Richiesta scaduta scartata da un pod
+    POD_START = 6
+    POD_STOP = 7
+    HPA_DECISION = 8        # value = repliche desiderate (limitate)
+
+
+# Record a lunghezza fissa: tempo, evento, id richiesta, id pod, valore (little-endian, senza padding)
+TRACE_RECORD = struct.Struct('<dBqid')
+TRACE_FIELDS = [('time', '<f8'), ('event', 'u1'), ('request_id', '<i8'), ('pod_id', '<i4'), ('value', '<f8')]
+
+
+class EventTrace:
+    """
+    Sink binario degli eventi per il debug: ogni evento è un record di
+    TRACE_RECORD.size byte, senza alcuna formattazione testuale.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'ab')
+        self._pack = TRACE_RECORD.pack
+
+    def record(self, time, event, request_id=-1, pod_id=-1, value=0.0):
+        self._file.write(self._pack(time, event, request_id, pod_id, value))
+
+    def close(self):
+        self._file.close()
+
+
+def read_trace(path):
+    """Legge una traccia binaria come array strutturato NumPy (campi di TRACE_FIELDS)."""
+    import numpy as np
+    return np.fromfile(path, dtype=np.dtype(TRACE_FIELDS))
+
+
+def _stdout_write(text):
+    # sys.stdout viene letto a ogni chiamata, così il log segue eventuali redirect
+    sys.stdout.write(text)
+
+
+class SimLogger:
+    """
+    Punto di accesso al logging della simulazione: un livello globale, un flag
+    per componente, uno stream testuale (stdout o file) e la traccia binaria opzionale.
+    """
+
+    def __init__(self, level=LogLevel.OFF, components=None, stream=None, trace_path=None):
+        self.level = LogLevel[level] if isinstance(level, str) else LogLevel(level)
+        self.components = dict.fromkeys(COMPONENTS, True)
+        if components:
+            self.components.update(components)
+        self._own_stream = False
+        if isinstance(stream, str):
+            stream = open(stream, 'a', encoding='utf-8')
+            self._own_stream = True
+        self.stream = stream
+        self.trace = EventTrace(trace_path) if trace_path else None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(level=config.LOG_LEVEL, components=config.LOG_COMPONENTS,
+                   stream=config.LOG_FILE, trace_path=config.EVENT_TRACE_FILE)
+
+    def component(self, name):
+        if name not in self.components:
+            raise ValueError(f"Componente di log sconosciuto: '{name}'. Validi: {list(self.components)}")
+        level = self.level if self.components[name] else LogLevel.OFF
+        write = self.stream.write if self.stream is not None else _stdout_write
+        return ComponentLogger(name, level, write)
+
+    def close(self):
+        """Svuota i buffer e chiude i file aperti dal logger (stdout non viene chiuso)."""
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+        if self._own_stream:
+            self.stream.close()
+        else:
+            (self.stream or sys.stdout).flush()
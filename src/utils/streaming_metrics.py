@@ -0,0 +1,411 @@
+# src/utils/streaming_metrics.py - METRICHE IN MODALITÀ STREAMING (MEMORIA COSTANTE PER SERIE)
+
+from collections import defaultdict
+
+import numpy as np
+
+from src import config
+from src.config import Priority, RequestType
+from src.utils.metrics import Metrics
+from src.utils.metrics_with_priority import MetricsWithPriority
+from src.utils.columnar_store import NO_PRIORITY, TimeSeries, TypeCounts, decode_req_type
+from src.utils.latency_histogram import LatencyHistograms, format_percentiles, latency_summary
+from src.utils.streaming_stats import StreamingSeries
+from src.utils.time_averages import SystemTimeAverages, format_time_averages
+
+_NAN = float('nan')
+
+
+def _series_dict(series_by_key):
+    """Serie di medie dei batch per chiave, al posto delle serie grezze."""
+    result = defaultdict(TimeSeries.empty)
+    for key, series in series_by_key.items():
+        result[key] = series.series()
+    return result
+
+
+def _values_dict(series_by_key):
+    result = defaultdict(lambda: np.empty(0))
+    for key, series in series_by_key.items():
+        result[key] = series.series().values
+    return result
+
+
+def _timestamps_dict(series_by_key):
+    result = defaultdict(lambda: np.empty(0))
+    for key, series in series_by_key.items():
+        result[key] = series.series().timestamps
+    return result
+
+
+def _mean(stats):
+    return float(stats.mean) if stats.count else _NAN
+
+
+class _StreamingMixin:
+    """
+    Al posto delle liste grezze si mantengono, per ogni serie, un accumulatore di Welford
+    (conteggio, media, varianza, min, max) e lo stato dei Batch Means a batch dinamici
+    (al più max_batches medie di batch di uguale dimensione): la memoria non cresce con
+    la durata della simulazione.
+
+    Gli attributi letti dal report steady-state (storie dei tempi, esiti 0/1, pod e coda)
+    restano disponibili con gli stessi nomi ma contengono le serie delle medie dei batch,
+    con il timestamp di fine batch: SteadyStateAnalyzer e SteadyStatePlotter funzionano
+    senza modifiche, con warm-up e Batch Means calcolati alla granularità dei batch.
+    Finché una serie ha meno di max_batches osservazioni i batch hanno dimensione 1 e la
+    serie coincide con quella grezza.
+    """
+
+    def _init_streaming(self, config_module, max_batches):
+        self.max_batches = max_batches
+        # Gli istogrammi dei percentili sono già a memoria costante: restano identici
+        self.latency_percentiles = tuple(config_module.LATENCY_PERCENTILES)
+        self.latency_histograms = LatencyHistograms.from_config(config_module)
+        self.all_response_series = self._new_series()
+        self.all_wait_series = self._new_series()
+        self.all_outcome_series = self._new_series()
+        self.outcome_series_by_req_type = {}
+        self.pod_count_series = self._new_series()
+        self.queue_length_series = self._new_series()
+        # Gli integrali esatti di coda e pod sono già a memoria costante
+        self.time_averages = SystemTimeAverages()
+
+    def _new_series(self):
+        return StreamingSeries(self.max_batches)
+
+    def _series(self, series_by_key, key):
+        series = series_by_key.get(key)
+        if series is None:
+            series = series_by_key[key] = self._new_series()
+        return series
+
+    def _record_outcome(self, timestamp, req_type, outcome):
+        self.all_outcome_series.add(timestamp, outcome)
+        self._series(self.outcome_series_by_req_type, req_type).add(timestamp, outcome)
+
+    # --- Interfaccia comune letta dall'analisi steady-state ---
+
+    def get_completion_series(self, column, req_type=None, priority=None):
+        kind = {"response_time": "response", "wait_time": "wait"}[column]
+        if req_type is not None and priority is not None:
+            raise ValueError("In modalità streaming le serie sono per tipo o per priorità, non per entrambi")
+        if req_type is None and priority is None:
+            return getattr(self, f"all_{kind}_series").series()
+        if req_type is not None:
+            series = getattr(self, f"{kind}_series_by_req_type").get(req_type)
+        else:
+            series_by_priority = getattr(self, f"{kind}_series_by_priority", None)
+            if series_by_priority is None:
+                raise ValueError("La simulazione baseline non ha classi di priorità")
+            series = series_by_priority.get(priority)
+        return series.series() if series is not None else TimeSeries.empty()
+
+    def get_system_series(self, column):
+        return {"pod_count": self.pod_count_series, "queue_length": self.queue_length_series}[column].series()
+
+    def get_all_response_times_with_timestamps(self):
+        return self.all_response_series.series()
+
+    def get_all_outcomes_as_binary_stream(self):
+        return self.all_outcome_series.series()
+
+    def get_outcomes_by_type_as_binary_stream(self, req_type_to_filter: RequestType):
+        series = self.outcome_series_by_req_type.get(req_type_to_filter)
+        return series.series() if series is not None else TimeSeries.empty()
+
+
+class StreamingMetrics(_StreamingMixin, Metrics):
+    """Metrics della simulazione baseline in modalità streaming (vedi _StreamingMixin)."""
+
+    def __init__(self, max_batches=1024, config_module=None):
+        self.total_requests_generated = 0
+        self.total_requests_served = 0
+        self.total_timeouts = 0
+        self.generated_by_type = TypeCounts()
+        self.timed_out_by_type = TypeCounts()
+        self.response_series_by_req_type = {}
+        self.wait_series_by_req_type = {}
+        self._init_streaming(config_module or config, max_batches)
+
+    def record_request_metrics(self, timestamp, type_code, priority, response_time, wait_time):
+        req_type = decode_req_type(type_code)
+        self._series(self.response_series_by_req_type, req_type).add(timestamp, response_time)
+        self._series(self.wait_series_by_req_type, req_type).add(timestamp, wait_time)
+        self.all_response_series.add(timestamp, response_time)
+        self.all_wait_series.add(timestamp, wait_time)
+        self.latency_histograms.record(type_code, NO_PRIORITY, response_time, wait_time)
+        self._record_outcome(timestamp, req_type, 0)
+        self.total_requests_served += 1
+
+    def record_system_metrics(self, timestamp, pod_count, queue_length, queue_len_per_prio=None):
+        self.pod_count_series.add(timestamp, pod_count)
+        self.queue_length_series.add(timestamp, queue_length)
+
+    def record_timeout(self, timestamp: float, type_code: int, priority=None):
+        self.timed_out_by_type.add(type_code)
+        self._record_outcome(timestamp, decode_req_type(type_code), 1)
+
+    @property
+    def response_times_history(self):
+        return _series_dict(self.response_series_by_req_type)
+
+    @property
+    def wait_times_history(self):
+        return _series_dict(self.wait_series_by_req_type)
+
+    @property
+    def pod_count_history(self):
+        return self.pod_count_series.series()
+
+    @property
+    def queue_length_history(self):
+        return self.queue_length_series.series()
+
+    def print_summary(self):
+        """Stampa lo stesso riepilogo di Metrics.print_summary, calcolato dagli accumulatori."""
+        print("\n--- Riepilogo Metriche di Performance (Simulazione Baseline, streaming) ---")
+        print(f"Numero totale di richieste generate: {self.total_requests_generated}")
+        print(f"Numero totale di richieste servite: {self.total_requests_served}")
+
+        print("\n--- Numero di Richieste Servite per Tipo ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            series = self.response_series_by_req_type.get(req_type)
+            print(f"- {req_type.name:12}: {series.stats.count if series else 0}")
+
+        print("\n--- Tempo Medio di Risposta per Tipo di Richiesta (s) ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            if req_type in self.response_series_by_req_type:
+                print(f"- {req_type.name:12}: {self.response_series_by_req_type[req_type].stats.mean:.4f}")
+
+        print("\n--- Tempo Medio di Attesa per Tipo di Richiesta (s) ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            if req_type in self.wait_series_by_req_type:
+                print(f"- {req_type.name:12}: {self.wait_series_by_req_type[req_type].stats.mean:.4f}")
+
+        print("\n--- Percentili del Tempo di Risposta per Tipo di Richiesta ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            histogram = self.latency_histograms.histogram("response_time", req_type)
+            if histogram.count:
+                print(f"- {req_type.name:12}: {format_percentiles(histogram.percentiles(self.latency_percentiles))}")
+
+        print("\n--- Analisi dei Timeout per Tipo di Richiesta ---")
+        for req_type in sorted(self.requests_generated_data.keys(), key=lambda e: e.name):
+            generated_count = self.requests_generated_data[req_type]
+            timed_out_count = self.requests_timed_out_data[req_type]
+
+            if generated_count > 0:
+                p_loss_type = timed_out_count / generated_count
+                print(f"- {req_type.name:12}: {timed_out_count} persi su {generated_count} -> P_loss = {p_loss_type:.2%}")
+            else:
+                print(f"- {req_type.name:12}: 0 generati")
+
+        print("\n--- Medie Temporali Esatte di Coda e Pod ---")
+        print(format_time_averages(self.time_averages.means()))
+
+    def get_summary_statistics(self):
+        total_timed_out = sum(self.requests_timed_out_data.values())
+        summary = {
+            "requests_generated": float(self.total_requests_generated),
+            "requests_served": float(self.total_requests_served),
+            "requests_timed_out": float(total_timed_out),
+            "p_loss": total_timed_out / self.total_requests_generated if self.total_requests_generated else _NAN,
+            "response_time_mean": _mean(self.all_response_series.stats),
+            "wait_time_mean": _mean(self.all_wait_series.stats),
+        }
+        summary.update(self.time_averages.means())
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            series = self.response_series_by_req_type.get(req_type)
+            generated_count = self.requests_generated_data.get(req_type, 0)
+            summary[f"response_time_mean[{req_type.name}]"] = _mean(series.stats) if series else _NAN
+            summary[f"p_loss[{req_type.name}]"] = self.requests_timed_out_data.get(req_type, 0) / generated_count if generated_count else _NAN
+        summary.update(latency_summary(self.latency_histograms, self.latency_percentiles))
+        return summary
+
+
+class StreamingMetricsWithPriority(_StreamingMixin, MetricsWithPriority):
+    """MetricsWithPriority in modalità streaming (vedi _StreamingMixin)."""
+
+    def __init__(self, config_module, max_batches=1024):
+        self.config = config_module
+        self.total_requests_generated = 0
+        self.requests_completed_by_priority = defaultdict(int)
+        self.requests_generated_by_priority = defaultdict(int)
+        self.requests_timed_out_by_priority = defaultdict(int)
+        self.timed_out_by_type = TypeCounts()
+        self.generated_by_type = TypeCounts()
+        self.response_series_by_priority = {}
+        self.wait_series_by_priority = {}
+        self.response_series_by_req_type = {}
+        self.wait_series_by_req_type = {}
+        self.queue_length_series_by_priority = {}
+        self._init_streaming(config_module, max_batches)
+
+    def record_request_generation(self, timestamp: float, type_code: int, priority: Priority):
+        self.total_requests_generated += 1
+        self.requests_generated_by_priority[priority] += 1
+        self.generated_by_type.add(type_code)
+
+    def record_system_metrics(self, timestamp, pod_count, queue_len, queue_len_per_prio: dict = None):
+        self.pod_count_series.add(timestamp, pod_count)
+        self.queue_length_series.add(timestamp, queue_len)
+        if queue_len_per_prio:
+            for prio, length in queue_len_per_prio.items():
+                self._series(self.queue_length_series_by_priority, prio).add(timestamp, length)
+
+    def record_request_metrics(self, completion_time, type_code, priority, response_time, wait_time):
+        req_type = decode_req_type(type_code)
+        self.requests_completed_by_priority[priority] += 1
+        self._series(self.response_series_by_priority, priority).add(completion_time, response_time)
+        self._series(self.wait_series_by_priority, priority).add(completion_time, wait_time)
+        self._series(self.response_series_by_req_type, req_type).add(completion_time, response_time)
+        self._series(self.wait_series_by_req_type, req_type).add(completion_time, wait_time)
+        self.all_response_series.add(completion_time, response_time)
+        self.all_wait_series.add(completion_time, wait_time)
+        self.latency_histograms.record(type_code, priority, response_time, wait_time)
+        self._record_outcome(completion_time, req_type, 0)
+
+    def record_timeout(self, timestamp: float, type_code: int, priority: Priority):
+        self.requests_timed_out_by_priority[priority] += 1
+        self.timed_out_by_type.add(type_code)
+        self._record_outcome(timestamp, decode_req_type(type_code), 1)
+
+    # Serie di sistema: pod e coda sono registrati insieme, quindi condividono i timestamp
+    @property
+    def timestamps(self):
+        return self.pod_count_series.series().timestamps
+
+    @property
+    def pod_counts(self):
+        return self.pod_count_series.series().values
+
+    @property
+    def queue_lengths(self):
+        return self.queue_length_series.series().values
+
+    @property
+    def queue_lengths_per_priority(self):
+        return _values_dict(self.queue_length_series_by_priority)
+
+    @property
+    def response_times_by_priority(self):
+        return _values_dict(self.response_series_by_priority)
+
+    response_times_at_completion_by_priority = response_times_by_priority
+
+    @property
+    def wait_times_by_priority(self):
+        return _values_dict(self.wait_series_by_priority)
+
+    @property
+    def completion_timestamps_by_priority(self):
+        return _timestamps_dict(self.response_series_by_priority)
+
+    @property
+    def response_times_by_req_type(self):
+        return _values_dict(self.response_series_by_req_type)
+
+    @property
+    def wait_times_by_req_type(self):
+        return _values_dict(self.wait_series_by_req_type)
+
+    @property
+    def completion_timestamps_by_req_type(self):
+        return _timestamps_dict(self.response_series_by_req_type)
+
+    def print_summary(self):
+        """Stampa lo stesso riepilogo di MetricsWithPriority.print_summary, calcolato dagli accumulatori."""
+        print("\n--- Riepilogo Metriche di Performance (con Priorità, streaming) ---")
+
+        total_generated = self.total_requests_generated
+        total_completed = sum(self.requests_completed_by_priority.values())
+        total_timeouts = sum(self.requests_timed_out_by_priority.values())
+
+        print(f"Richieste totali generate: {total_generated}")
+        print(f"Richieste totali completate: {total_completed}")
+        print(f"Richieste totali perse (timeout): {total_timeouts}")
+        print(f"Richieste rimaste in coda alla fine: {total_generated - total_completed - total_timeouts}")
+
+        print("\n--- Numero di Richieste Servite per Tipo ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            series = self.response_series_by_req_type.get(req_type)
+            print(f"- {req_type.name:12}: {series.stats.count if series else 0}")
+
+        print("\n--- Dettaglio per Classe di Priorità ---")
+        for prio in sorted(Priority):
+            num_completed = self.requests_completed_by_priority[prio]
+            generated_count = self.requests_generated_by_priority[prio]
+            num_timeouts = self.requests_timed_out_by_priority[prio]
+
+            if generated_count == 0:
+                print(f"\nClasse di Priorità: {prio.name} - Nessuna richiesta generata.")
+                continue
+
+            print(f"\nClasse di Priorità: {prio.name}")
+            print(f"  - Richieste Generate: {generated_count}")
+            print(f"  - Richieste Servite: {num_completed}")
+
+            if prio in self.response_series_by_priority:
+                response_stats = self.response_series_by_priority[prio].stats
+                print(f"  - Tempo di Risposta Medio: {response_stats.mean:.4f}s")
+                print(f"  - Tempo di Attesa Medio:   {self.wait_series_by_priority[prio].stats.mean:.4f}s")
+                print(f"  - Tempo di Risposta Massimo: {response_stats.max:.4f}s")
+                response_percentiles = self.latency_histograms.percentiles("response_time", self.latency_percentiles, priority=prio)
+                print(f"  - Percentili Tempo di Risposta: {format_percentiles(response_percentiles)}")
+
+            print(f"  - P_loss Specifica:   {num_timeouts / generated_count:.2%}")
+
+        print("\n\n--- Dettaglio per Tipo di Richiesta (per Confronto Diretto con Baseline) ---")
+        print("\n--- Tempo Medio di Risposta per Tipo di Richiesta (s) ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            if req_type in self.response_series_by_req_type:
+                print(f"- {req_type.name:12}: {self.response_series_by_req_type[req_type].stats.mean:.4f}")
+
+        print("\n--- Tempo Medio di Attesa per Tipo di Richiesta (s) ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            if req_type in self.wait_series_by_req_type:
+                print(f"- {req_type.name:12}: {self.wait_series_by_req_type[req_type].stats.mean:.4f}")
+
+        print("\n--- Percentili del Tempo di Risposta per Tipo di Richiesta ---")
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            histogram = self.latency_histograms.histogram("response_time", req_type)
+            if histogram.count:
+                print(f"- {req_type.name:12}: {format_percentiles(histogram.percentiles(self.latency_percentiles))}")
+
+        print("\n--- Medie Temporali Esatte di Coda e Pod ---")
+        print(format_time_averages(self.time_averages.means()))
+
+    def get_summary_statistics(self):
+        total_generated = self.total_requests_generated
+        total_timed_out = sum(self.requests_timed_out_by_priority.values())
+
+        summary = {
+            "requests_generated": float(total_generated),
+            "requests_served": float(sum(self.requests_completed_by_priority.values())),
+            "requests_timed_out": float(total_timed_out),
+            "p_loss": total_timed_out / total_generated if total_generated else _NAN,
+            "response_time_mean": _mean(self.all_response_series.stats),
+            "wait_time_mean": _mean(self.all_wait_series.stats),
+        }
+        summary.update(self.time_averages.means())
+        for req_type in sorted(RequestType, key=lambda e: e.name):
+            series = self.response_series_by_req_type.get(req_type)
+            generated_count = self.requests_generated_by_req_type.get(req_type, 0)
+            summary[f"response_time_mean[{req_type.name}]"] = _mean(series.stats) if series else _NAN
+            summary[f"p_loss[{req_type.name}]"] = self.requests_timed_out_by_req_type.get(req_type, 0) / generated_count if generated_count else _NAN
+        for prio in sorted(Priority):
+            series = self.response_series_by_priority.get(prio)
+            generated_count = self.requests_generated_by_priority.get(prio, 0)
+            summary[f"response_time_mean[{prio.name}]"] = _mean(series.stats) if series else _NAN
+            summary[f"p_loss[{prio.name}]"] = self.requests_timed_out_by_priority.get(prio, 0) / generated_count if generated_count else _NAN
+        summary.update(latency_summary(self.latency_histograms, self.latency_percentiles, with_priority=True))
+        return summary
+
+
+def make_metrics(config_module, with_priority=False):
+    """Metriche per un run: in modalità streaming se config.METRICS_STREAMING, altrimenti con le liste complete."""
+    if config_module.METRICS_STREAMING:
+        max_batches = config_module.METRICS_STREAMING_MAX_BATCHES
+        return (StreamingMetricsWithPriority(config_module, max_batches) if with_priority
+                else StreamingMetrics(max_batches, config_module))
+    return MetricsWithPriority(config_module) if with_priority else Metrics(config_module)
@@ -0,0 +1,117 @@
+# src/utils/streaming_stats.py - ACCUMULATORI ONLINE A MEMORIA COSTANTE
+
+import math
+
+import numpy as np
+
+from src.utils.columnar_store import TimeSeries
+
+
+class RunningStats:
+    """
+    Conteggio, media e varianza (algoritmo di Welford), minimo e massimo di una serie,
+    aggiornati un valore alla volta. Due accumulatori si possono fondere (formula di
+    Chan et al.), ad esempio per combinare i tipi di richiesta o più replicazioni.
+    """
+    __slots__ = ('count', 'mean', '_m2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Aggiunge a questo accumulatore tutte le osservazioni di 'other'."""
+        if other.count == 0:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Varianza campionaria (diviso n-1), NaN con meno di due osservazioni."""
+        return self._m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class StreamingBatchMeans:
+    """
+    Stato dei Batch Means a memoria costante (batch dinamici): si mantengono al più
+    max_batches batch completi, tutti della stessa dimensione. Quando sono pieni,
+    i batch adiacenti vengono fusi a coppie e la dimensione raddoppia, quindi il
+    numero di batch resta tra max_batches/2 e max_batches per qualsiasi durata.
+    Ogni batch ricorda l'istante più recente visto fino alla sua chiusura, così i
+    timestamp dei batch restano ordinati anche se le osservazioni arrivano con
+    qualche istante fuori ordine (es. timeout registrati alla loro scadenza).
+    """
+    __slots__ = ('max_batches', 'batch_size', 'end_times', 'sums', '_partial_sum', '_partial_count', '_last_time')
+
+    def __init__(self, max_batches=1024):
+        if max_batches < 2 or max_batches % 2:
+            raise ValueError(f"max_batches deve essere un numero pari >= 2, ricevuto {max_batches}")
+        self.max_batches = max_batches
+        self.batch_size = 1
+        self.end_times = []
+        self.sums = []
+        self._partial_sum = 0.0
+        self._partial_count = 0
+        self._last_time = -math.inf
+
+    def add(self, timestamp, value):
+        if timestamp > self._last_time:
+            self._last_time = timestamp
+        self._partial_sum += value
+        self._partial_count += 1
+        if self._partial_count == self.batch_size:
+            self.end_times.append(self._last_time)
+            self.sums.append(self._partial_sum)
+            self._partial_sum = 0.0
+            self._partial_count = 0
+            if len(self.sums) == self.max_batches:
+                self._collapse()
+
+    def _collapse(self):
+        self.sums = [first + second for first, second in zip(self.sums[0::2], self.sums[1::2])]
+        self.end_times = self.end_times[1::2]
+        self.batch_size *= 2
+
+    def series(self):
+        """Medie dei batch completi come TimeSeries (timestamp, media), in ordine cronologico."""
+        return TimeSeries(np.array(self.end_times, dtype=float), np.array(self.sums, dtype=float) / self.batch_size)
+
+
+class StreamingSeries:
+    """Statistiche complessive e stato dei Batch Means di una serie (timestamp, valore)."""
+    __slots__ = ('stats', 'batches')
+
+    def __init__(self, max_batches=1024):
+        self.stats = RunningStats()
+        self.batches = StreamingBatchMeans(max_batches)
+
+    def add(self, timestamp, value):
+        self.stats.add(value)
+        self.batches.add(timestamp, value)
+
+    def series(self):
+        return self.batches.series()
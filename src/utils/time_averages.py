@@ -0,0 +1,100 @@
+# src/utils/time_averages.py - MEDIE TEMPORALI ESATTE DI CODA E POD (INTEGRALI AD EVENTI)
+
+import math
+
+_NAN = float('nan')
+
+
+class TimeWeightedValue:
+    """
+    Integrale nel tempo di una grandezza a gradini (richieste in coda, pod occupati,
+    pod attivi), aggiornato a ogni cambio di valore: tra due aggiornamenti la grandezza
+    è costante, quindi l'area sotto la curva è esatta e non dipende da un campionamento.
+    """
+    __slots__ = ('value', 'last_time', 'area')
+
+    def __init__(self, value=0, start_time=0.0):
+        self.value = value
+        self.last_time = start_time
+        self.area = 0.0
+
+    def update(self, now, value):
+        """Registra che da 'now' la grandezza vale 'value'."""
+        self.area += self.value * (now - self.last_time)
+        self.last_time = now
+        self.value = value
+
+    def add_area(self, area):
+        """Aggiunge un'area calcolata in blocco (percorsi senza eventi, es. LindleySimulator)."""
+        self.area += area
+
+    def integral(self, until):
+        """Area sotto la curva fino all'istante 'until' (non precedente all'ultimo aggiornamento)."""
+        return self.area + self.value * (until - self.last_time)
+
+
+class SystemTimeAverages:
+    """
+    Integrali esatti della lunghezza della coda, dei pod occupati (richieste in servizio)
+    e dei pod attivi, aggiornati dai simulatori a ogni cambio di stato. Alla fine del run
+    (close) danno le medie temporali su [start_time, end_time]:
+        Lq = coda media, L = Lq + pod occupati medi, utilizzo = area occupati / area attivi,
+    da confrontare con la legge di Little (L = lambda * W, Lq = lambda * Wq).
+    La coda conta le richieste fisicamente presenti, comprese quelle scadute e non
+    ancora eliminate (EVICT_EXPIRED_REQUESTS = False), come i campioni per i grafici;
+    con l'eliminazione attiva una richiesta scaduta esce dalla coda alla sua scadenza
+    (record_eviction), come in LindleySimulator.
+    """
+    __slots__ = ('queue', 'busy', 'pods', 'start_time', 'end_time')
+
+    def __init__(self, start_time=0.0):
+        self.queue = TimeWeightedValue(0, start_time)
+        self.busy = TimeWeightedValue(0, start_time)
+        self.pods = TimeWeightedValue(0, start_time)
+        self.start_time = start_time
+        self.end_time = None
+
+    def record_eviction(self, now, queue_length, removed):
+        """
+        Registra l'eliminazione delle richieste scadute 'removed', fatta al tempo 'now'
+        (al primo evento dopo la scadenza): l'area accumulata da ciascuna dopo la propria
+        scadenza (arrival_time + timeout) viene tolta, così l'uscita dalla coda è esatta.
+        """
+        self.queue.update(now, queue_length)
+        self.queue.area -= sum(now - (r.arrival_time + r.timeout) for r in removed)
+
+    def close(self, now):
+        """Fissa la fine dell'intervallo di osservazione (fine della simulazione)."""
+        self.end_time = now
+
+    def means(self):
+        """Medie temporali {nome: valore} con i nomi di get_summary_statistics; NaN se il run non è chiuso."""
+        span = (self.end_time - self.start_time) if self.end_time is not None else 0.0
+        if not span > 0:
+            return dict.fromkeys(("queue_length_mean", "busy_pods_mean", "system_length_mean",
+                                  "pod_count_mean", "utilization"), _NAN)
+        queue_area = self.queue.integral(self.end_time)
+        busy_area = self.busy.integral(self.end_time)
+        pods_area = self.pods.integral(self.end_time)
+        return {
+            "queue_length_mean": queue_area / span,
+            "busy_pods_mean": busy_area / span,
+            "system_length_mean": (queue_area + busy_area) / span,
+            "pod_count_mean": pods_area / span,
+            "utilization": busy_area / pods_area if pods_area > 0 else _NAN,
+        }
+
+
+def format_time_averages(means):
+    """Riga di testo con le medie temporali di SystemTimeAverages.means()."""
+    return (f"Lq (coda) = {means['queue_length_mean']:.4f}, L (sistema) = {means['system_length_mean']:.4f}, "
+            f"pod occupati = {means['busy_pods_mean']:.4f}, pod attivi = {means['pod_count_mean']:.4f}, "
+            f"utilizzo = {means['utilization']:.2%}")
+
+
+def system_sample_interval(config_module):
+    """Intervallo (s) del campionamento di pod e coda per i grafici, validato."""
+    interval = config_module.SYSTEM_SAMPLE_INTERVAL
+    if not (isinstance(interval, (int, float)) and math.isfinite(interval) and interval > 0):
+        raise ValueError(f"SYSTEM_SAMPLE_INTERVAL deve essere un numero positivo (trovato {interval!r})")
+    return interval
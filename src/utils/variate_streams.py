@@ -0,0 +1,131 @@
+# src/utils/variate_streams.py - STREAM DI VARIABILI ALEATORIE CAMPIONATE A BLOCCHI
+
+from bisect import bisect_right
+from itertools import accumulate
+
+import numpy as np
+
+
+class BlockStream:
+    """
+    Restituisce uno alla volta i valori di un campionamento NumPy a blocchi.
+
+    'draw(size=n)' produce n valori con una sola chiamata a NumPy; i valori vengono
+    convertiti in float Python (tolist) così il consumo costa solo un indice.
+    'draw' deve essere serializzabile con pickle (metodo di un Generator o partial,
+    non una lambda) perché lo stream fa parte dei checkpoint della simulazione.
+    """
+    __slots__ = ('_draw', '_block_size', '_buffer', '_pos')
+
+    def __init__(self, draw, block_size):
+        self._draw = draw
+        self._block_size = max(1, int(block_size))
+        self._buffer = []
+        self._pos = 0
+
+    def next(self):
+        pos = self._pos
+        if pos == len(self._buffer):
+            self._buffer = self._draw(size=self._block_size).tolist()
+            pos = 0
+        self._pos = pos + 1
+        return self._buffer[pos]
+
+    def take(self, n):
+        """
+        I prossimi n valori come array NumPy: stessi valori, e stesso stato del generatore,
+        di n chiamate a next(). L'ultimo blocco campionato resta nel buffer.
+        """
+        buffered = self._buffer[self._pos:self._pos + n]
+        self._pos += len(buffered)
+        missing = n - len(buffered)
+        if missing == 0:
+            return np.array(buffered, dtype=float)
+        block_size = self._block_size
+        drawn = self._draw_blocks(-(-missing // block_size))
+        self._buffer = drawn[len(drawn) - block_size:].tolist()
+        self._pos = block_size - (len(drawn) - missing)
+        return np.concatenate((np.array(buffered, dtype=float), drawn[:missing]))
+
+    def unread(self, values):
+        """Rimette in testa allo stream i valori restituiti da take(), nello stesso ordine."""
+        self._buffer = np.asarray(values, dtype=float).tolist() + self._buffer[self._pos:]
+        self._pos = 0
+
+    def _draw_blocks(self, count):
+        # Un blocco per chiamata, come next(): non tutte le distribuzioni producono la
+        # stessa sequenza se campionate con una sola chiamata più grande
+        return np.concatenate([self._draw(size=self._block_size) for _ in range(count)])
+
+
+class ExponentialStream(BlockStream):
+    """
+    Inter-arrivi esponenziali da un buffer di esponenziali standard.
+
+    rng.exponential(scale) di NumPy è definito come scale * esponenziale standard,
+    quindi la sequenza prodotta è identica, valore per valore, a quella delle
+    chiamate singole sullo stesso Generator.
+    """
+    __slots__ = ()
+
+    def __init__(self, rng, block_size):
+        super().__init__(rng.standard_exponential, block_size)
+
+    def _draw_blocks(self, count):
+        # Le esponenziali standard non dipendono da come la sequenza è divisa in blocchi
+        return self._draw(size=count * self._block_size)
+
+    def exponential(self, scale):
+        # Corpo di next() ripetuto: una chiamata in meno per arrivo
+        pos = self._pos
+        if pos == len(self._buffer):
+            self._buffer = self._draw(size=self._block_size).tolist()
+            pos = 0
+        self._pos = pos + 1
+        return scale * self._buffer[pos]
+
+
+def cumulative_table(p):
+    """
+    Tabella cumulativa delle probabilità p normalizzata sull'ultimo elemento, calcolata
+    come rng.choice(a, p=p): bisect_right su questa tabella di un'uniforme in [0, 1)
+    (l'equivalente scalare di searchsorted con side='right') sceglie lo stesso elemento.
+    """
+    cdf = list(accumulate(p))
+    total = cdf[-1]
+    return [c / total for c in cdf]
+
+
+class ChoiceStream(BlockStream):
+    """
+    Scelta pesata da un buffer di uniformi in [0, 1).
+
+    Replica l'algoritmo di rng.choice(a, p=p) (cumsum, normalizzazione sull'ultimo
+    elemento, searchsorted con side='right'), quindi a parità di Generator sceglie
+    esattamente gli stessi elementi delle chiamate singole.
+    """
+    __slots__ = ()
+
+    def __init__(self, rng, block_size):
+        super().__init__(rng.random, block_size)
+
+    def _draw_blocks(self, count):
+        # Come per le esponenziali: le uniformi non dipendono dalla divisione in blocchi
+        return self._draw(size=count * self._block_size)
+
+    def choice(self, options, p):
+        return options[bisect_right(cumulative_table(p), self.next())]
+
+    def choice_from_table(self, options, cdf):
+        """Come choice, ma con la tabella cumulativa già calcolata (cumulative_table)."""
+        return options[bisect_right(cdf, self.next())]
+
+    def index_from_table(self, cdf):
+        """Come choice_from_table, ma restituisce l'indice dell'elemento scelto."""
+        # Corpo di next() ripetuto: una chiamata in meno per arrivo
+        pos = self._pos
+        if pos == len(self._buffer):
+            self._buffer = self._draw(size=self._block_size).tolist()
+            pos = 0
+        self._pos = pos + 1
+        return bisect_right(cdf, self._buffer[pos])